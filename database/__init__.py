@@ -7,13 +7,20 @@ Database Layer - 数据访问层
 - dual_advisory_repository: 双周期决策数据访问  
 - pipeline_repository: 管道步骤数据访问
 - migrations: 数据库迁移
+- query_cache: 查询结果缓存
+- writer: 后台单写线程
+- async_database: asyncio 接口
 """
 
+from .codecs import register_adapters
 from .connection import DatabaseConnection
 from .advisory_repository import AdvisoryRepository
 from .dual_advisory_repository import DualAdvisoryRepository
 from .pipeline_repository import PipelineRepository
 from .migrations import DatabaseMigrations
+from .query_cache import QueryCache
+from .writer import WriterLoop
+from .async_database import AsyncL1Database
 
 __all__ = [
     'DatabaseConnection',
@@ -21,8 +28,14 @@ __all__ = [
     'DualAdvisoryRepository',
     'PipelineRepository',
     'DatabaseMigrations',
+    'QueryCache',
+    'WriterLoop',
+    'AsyncL1Database',
 ]
 
+# datetime / 枚举 直接作为SQL参数绑定（见 codecs.register_adapters）
+register_adapters()
+
 
 class L1DatabaseModular:
     """
@@ -31,25 +44,69 @@ class L1DatabaseModular:
     聚合所有Repository，提供统一接口
     """
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, drop_legacy_full_json: bool = False,
+                 query_cache_ttl: float = 30):
         """
         初始化数据库
         
         Args:
             db_path: 数据库文件路径
+            drop_legacy_full_json: 是否删除双周期表中旧的 full_json 列
+            query_cache_ttl: 历史/统计查询结果缓存有效期（秒），0 表示不缓存
         """
         # 创建连接管理器
         self.connection = DatabaseConnection(db_path)
         self.db_path = self.connection.db_path
         
         # 初始化表结构
-        migrations = DatabaseMigrations(self.connection)
-        migrations.init_all_tables()
+        self.migrations = DatabaseMigrations(self.connection, drop_legacy_full_json)
+        self.migrations.init_all_tables()
+        
+        # 查询结果缓存（写入时按symbol失效）
+        self.query_cache = QueryCache(default_ttl=query_cache_ttl) if query_cache_ttl > 0 else None
         
         # 创建各Repository
-        self.advisory = AdvisoryRepository(self.connection)
-        self.dual_advisory = DualAdvisoryRepository(self.connection)
+        self.advisory = AdvisoryRepository(self.connection, query_cache=self.query_cache)
+        self.dual_advisory = DualAdvisoryRepository(
+            self.connection, self.migrations.legacy_full_json, query_cache=self.query_cache
+        )
         self.pipeline = PipelineRepository(self.connection)
+        
+        # 后台写线程（start_writer 启动后 save_async 才走队列）
+        self.writer = None
+    
+    def start_writer(self, **kwargs) -> WriterLoop:
+        """
+        启动后台写线程，之后 advisory/dual_advisory 的 save_async 经队列攒批写入
+        
+        Args:
+            **kwargs: 传给 WriterLoop（max_queue / max_batch / flush_size / flush_interval）
+        """
+        if self.writer is None:
+            self.writer = WriterLoop(
+                self.connection,
+                {'advisory': self.advisory, 'dual_advisory': self.dual_advisory},
+                **kwargs
+            )
+            self.writer.start()
+            self.advisory.writer = self.writer
+            self.dual_advisory.writer = self.writer
+        return self.writer
+    
+    def transaction(self):
+        """
+        跨多次保存的写事务（一次COMMIT）
+        
+        Example:
+            with db.transaction():
+                advisory_id = db.save_advisory_result(symbol, result)
+                db.save_pipeline_steps(advisory_id, symbol, steps)
+        """
+        return self.connection.transaction()
+    
+    def maintenance(self, vacuum_pages: int = 1000):
+        """定期维护：回收空闲页并刷新查询规划统计（见 DatabaseMigrations.maintenance）"""
+        self.migrations.maintenance(vacuum_pages)
     
     # ========================================
     # 向后兼容方法（兼容旧API）
@@ -67,14 +124,68 @@ class L1DatabaseModular:
         """兼容旧API：保存管道步骤"""
         return self.pipeline.save(advisory_id, symbol, steps)
     
+    def save_advisory_with_steps(self, symbol: str, result, steps: list) -> int:
+        """
+        在同一个写事务中保存决策结果及其管道步骤（一次COMMIT）
+        
+        任一步骤写入失败时整体回滚（决策记录也不保留），异常向上抛出
+        
+        Returns:
+            int: 决策记录ID
+        """
+        with self.transaction():
+            advisory_id = self.advisory.save(symbol, result)
+            self.pipeline.save(advisory_id, symbol, steps)
+        return advisory_id
+    
     def get_advisory_history(self, symbol: str, hours: int = 24, limit: int = 1000):
         """兼容旧API：获取单周期历史"""
         return self.advisory.get_history(symbol, hours, limit)
     
     def get_dual_advisory_history(self, symbol: str, hours: int = 24, limit: int = 1000):
-        """兼容旧API：获取双周期历史"""
-        return self.dual_advisory.get_history(symbol, hours, limit)
+        """兼容旧API：获取双周期历史（返回普通dict，可直接JSON序列化）"""
+        return [dict(row) for row in self.dual_advisory.get_history(symbol, hours, limit)]
+    
+    def get_history_advisory(self, symbol: str, hours: int = 24, limit: int = 1000):
+        """兼容旧API：获取单周期历史（history_routes 使用）"""
+        return self.advisory.get_history(symbol, hours, limit)
+    
+    def get_decision_stats(self, symbol: str, hours: int = 24):
+        """兼容旧API：获取单周期决策统计"""
+        return self.advisory.get_stats(symbol, hours)
+    
+    def get_dual_decision_stats(self, symbol: str):
+        """兼容旧API：获取双周期决策统计"""
+        return self.dual_advisory.get_stats(symbol)
+    
+    def cleanup_old_records(self, days: int = 1) -> int:
+        """
+        兼容旧API：清理N天前的单周期/双周期/管道记录（单个写事务，任一清理失败则整体回滚并抛出），
+        之后刷新查询规划统计并截断删除产生的WAL（空闲页由 maintenance 回收）
+        
+        Returns:
+            int: 删除的记录总数
+        """
+        with self.connection.transaction():
+            deleted = (
+                self.advisory.cleanup_old(days)
+                + self.dual_advisory.cleanup_old(days)
+                + self.pipeline.cleanup_old(days)
+            )
+        if deleted:
+            self.migrations.optimize()
+            self.migrations.checkpoint()
+        return deleted
+    
+    def archive_old_records(self, hours: int = 6) -> int:
+        """将N小时前的单周期决策从热表移入冷表（见 AdvisoryRepository.archive）"""
+        return self.advisory.archive(hours)
     
     def close(self):
-        """关闭数据库连接"""
+        """关闭数据库连接（先写完后台写线程中的请求）"""
+        if self.writer is not None:
+            self.writer.stop()
+            self.advisory.writer = None
+            self.dual_advisory.writer = None
+            self.writer = None
         self.connection.close()
@@ -2,28 +2,301 @@
 Advisory Repository - L1单周期决策数据访问
 """
 
-import json
-from typing import List, Optional, Dict
+import threading
+from concurrent.futures import Future
+from itertools import chain, islice
+from operator import attrgetter
+from typing import List, Optional, Dict, Tuple
 from datetime import datetime, timedelta
 from models.advisory_result import AdvisoryResult
 from models.enums import Decision, Confidence, TradeQuality, MarketRegime, SystemState, ExecutionPermission
-from models.reason_tags import ReasonTag
+from .query_cache import cached
+from .codecs import (
+    decode_enum, enum_value_map,
+    encode_reason_tags, reason_tags_order, load_reason_tags, load_reason_tag_values, to_epoch_us, sqlite_now
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# ========================================
+# SQL语句（模块级常量：同一字符串对象在连接的语句缓存中命中，免重复prepare）
+# ========================================
+
+_SQL_INSERT_ADVISORY_HEAD = '''
+    INSERT INTO l1_advisory_results
+    (symbol, timestamp, ts_us, decision, confidence, market_regime, system_state,
+     risk_exposure_allowed, trade_quality, reason_tags, reason_tags_mask,
+     execution_permission, executable, signal_decision, price, created_at)
+    VALUES '''
+
+# 单行占位符（16个参数）
+_ADVISORY_ROW_VALUES = '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+
+_SQL_INSERT_ADVISORY = _SQL_INSERT_ADVISORY_HEAD + _ADVISORY_ROW_VALUES
+
+# 批量写入：每条多行INSERT的行数（16 × 50 = 800 个参数，低于SQLite默认上限999）
+BATCH_CHUNK_SIZE = 50
+
+_SQL_INSERT_ADVISORY_CHUNK = _SQL_INSERT_ADVISORY_HEAD + ', '.join([_ADVISORY_ROW_VALUES] * BATCH_CHUNK_SIZE)
+
+# 冷热分离：最近的记录在热表，archive() 把超出热数据窗口的记录整体移入冷表（表结构相同）。
+# 热表保持小而紧凑：写入时B树更浅、页缓存命中率更高；读取时两表各取前N条，按时间合并。
+HOT_TABLE = 'l1_advisory_results'
+COLD_TABLE = 'l1_advisory_results_cold'
+
+
+def _merge_hot_cold(arm: str, columns: str) -> str:
+    """
+    热表与冷表各取前 LIMIT 条（arm 为含 {table} 占位的单表查询，须选出 ts_us 与 id），
+    合并后按 (ts_us, id) 从新到旧取前 LIMIT 条
+    
+    archive 按 ts_us 移动记录，之后补写的记录可能早于冷表中最新的记录，
+    冷表记录不一定都早于热表：不能先查热表、不足再用冷表补齐
+    """
+    return f'''
+    SELECT {columns} FROM (
+        SELECT * FROM ({arm.format(table=HOT_TABLE)})
+        UNION ALL
+        SELECT * FROM ({arm.format(table=COLD_TABLE)})
+    )
+    ORDER BY ts_us DESC, id DESC
+    LIMIT ?
+'''
+
+
+_LATEST_COLUMNS = '''decision, confidence, market_regime, system_state,
+           risk_exposure_allowed, trade_quality, reason_tags_mask, reason_tags,
+           execution_permission, executable, signal_decision, timestamp'''
+
+_SELECT_LATEST_FROM = f'''
+    SELECT {_LATEST_COLUMNS}, ts_us, id
+    FROM {{table}}
+    WHERE symbol = ?
+    ORDER BY ts_us DESC
+    LIMIT 1
+'''
+
+# 参数：(symbol, symbol, 1)
+_SQL_SELECT_LATEST = _merge_hot_cold(_SELECT_LATEST_FROM, _LATEST_COLUMNS)
+
+# 只取最新决策：(symbol, ts_us DESC, decision, ...) 覆盖索引上的一次查找，不回表
+_SELECT_LATEST_DECISION_FROM = '''
+    SELECT decision, ts_us, id
+    FROM {table}
+    WHERE symbol = ?
+    ORDER BY ts_us DESC
+    LIMIT 1
+'''
+
+# 参数：(symbol, symbol, 1)
+_SQL_SELECT_LATEST_DECISION = _merge_hot_cold(_SELECT_LATEST_DECISION_FROM, 'decision')
+
+# 历史查询返回的列（顺序同 _history_dicts 的解包）
+_HISTORY_COLUMNS = '''decision, confidence, market_regime, system_state,
+           risk_exposure_allowed, trade_quality, reason_tags_mask, reason_tags,
+           execution_permission, executable, signal_decision, timestamp, price'''
+
+_SELECT_HISTORY_FROM = f'''
+    SELECT {_HISTORY_COLUMNS}, ts_us, id
+    FROM {{table}}
+    WHERE symbol = ? AND ts_us >= ?
+    ORDER BY ts_us DESC
+    LIMIT ?
+'''
+
+# 参数：(symbol, cutoff, limit, symbol, cutoff, limit, limit)
+_SQL_SELECT_HISTORY = _merge_hot_cold(_SELECT_HISTORY_FROM, _HISTORY_COLUMNS)
+
+# 键集分页：游标为上一页最后一行的 (ts_us, id)，按行值比较在复合索引上直接定位，
+# 代价与页深度无关（OFFSET 需先跳过前面所有行）
+_SELECT_HISTORY_PAGE_FROM = f'''
+    SELECT {_HISTORY_COLUMNS}, ts_us, id
+    FROM {{table}}
+    WHERE symbol = ? AND ts_us >= ? AND (ts_us, id) < (?, ?)
+    ORDER BY ts_us DESC, id DESC
+    LIMIT ?
+'''
+
+# 参数：(symbol, cutoff, ts_us, id, limit) × 2 + (limit,)；末两列为 ts_us, id
+_SQL_SELECT_HISTORY_PAGE = _merge_hot_cold(_SELECT_HISTORY_PAGE_FROM, '*')
+
+# 第一页的游标（大于任何 (ts_us, id)）
+_FIRST_PAGE = (2 ** 63 - 1, 0)
+
+# 历史决策连同管道步骤一次查询取回（替代逐条查询步骤的 N+1）：
+# 先在子查询中合并热表/冷表并按 LIMIT 取决策，再按步骤表主键 (advisory_id, step_number) 连接
+# 参数同 _SQL_SELECT_HISTORY
+_SQL_SELECT_HISTORY_WITH_STEPS = f'''
+    SELECT a.decision, a.confidence, a.market_regime, a.system_state,
+           a.risk_exposure_allowed, a.trade_quality, a.reason_tags_mask, a.reason_tags,
+           a.execution_permission, a.executable, a.signal_decision, a.timestamp, a.price, a.id,
+           s.step_number, s.step_name, s.status, s.message, s.result, s.timestamp
+    FROM ({_merge_hot_cold(_SELECT_HISTORY_FROM, '*')}) AS a
+    LEFT JOIN l1_pipeline_steps AS s ON s.advisory_id = a.id
+    ORDER BY a.ts_us DESC, a.id DESC, s.step_number ASC
+'''
+
+# 归档：显式列出全部列（含id，管道步骤的 advisory_id 仍可关联）
+_ARCHIVE_COLUMNS = '''
+    id, symbol, timestamp, ts_us, decision, confidence, market_regime, system_state,
+    risk_exposure_allowed, trade_quality, reason_tags, reason_tags_mask,
+    execution_permission, executable, signal_decision, price, created_at'''
+
+_SQL_ARCHIVE_COPY = f'''
+    INSERT INTO {COLD_TABLE} ({_ARCHIVE_COLUMNS})
+    SELECT {_ARCHIVE_COLUMNS} FROM {HOT_TABLE}
+    WHERE ts_us < ?
+'''
+
+# 归档前补齐 ts_us：绕过Repository写入（如外部脚本）的行可能缺少 ts_us，
+# 否则 ts_us < ? 永不成立，这些行永远留在热表（走 idx_l1_ts_us，只读取 NULL 行）
+_SQL_SELECT_MISSING_TS_US = f'''
+    SELECT id, timestamp FROM {HOT_TABLE}
+    WHERE ts_us IS NULL
+'''
+
+_SQL_UPDATE_TS_US = f'''
+    UPDATE {HOT_TABLE} SET ts_us = ?
+    WHERE id = ?
+'''
+
+_SQL_DELETE_BEFORE = f'''
+    DELETE FROM {HOT_TABLE}
+    WHERE ts_us < ?
+'''
+
+_SQL_DELETE_COLD_BEFORE = f'''
+    DELETE FROM {COLD_TABLE}
+    WHERE ts_us < ?
+'''
+
+# 一次查询取得 决策×置信度 的联合分布（热表+冷表），再在Python中汇总总数与各维度计数
+_SQL_STATS = f'''
+    SELECT decision, confidence, COUNT(*) FROM (
+        SELECT decision, confidence FROM {HOT_TABLE}
+        WHERE symbol = ? AND ts_us >= ?
+        UNION ALL
+        SELECT decision, confidence FROM {COLD_TABLE}
+        WHERE symbol = ? AND ts_us >= ?
+    )
+    GROUP BY decision, confidence
+'''
+
+
+# 编码 → .value 查表（get_history逐行解码用；dict.get为C实现，未识别的旧TEXT值原样返回）
+_DECISION_VALUES = enum_value_map(Decision)
+_CONFIDENCE_VALUES = enum_value_map(Confidence)
+_REGIME_VALUES = enum_value_map(MarketRegime)
+_STATE_VALUES = enum_value_map(SystemState)
+_QUALITY_VALUES = enum_value_map(TradeQuality)
+_PERMISSION_VALUES = enum_value_map(ExecutionPermission)
+
+
+# 一次C调用取出写入所需的全部字段（顺序同 _to_row 的解包）
+_ADVISORY_FIELDS = attrgetter(
+    'timestamp', 'decision', 'confidence', 'market_regime', 'system_state',
+    'risk_exposure_allowed', 'trade_quality', 'reason_tags', 'execution_permission',
+    'executable', 'signal_decision', 'price'
+)
+
+
+def _to_row(symbol: str, result: AdvisoryResult, created_at: str) -> tuple:
+    """
+    AdvisoryResult → INSERT参数（顺序同 _ADVISORY_ROW_VALUES）
+    
+    datetime与枚举直接绑定，由 codecs.register_adapters 注册的适配器转换；
+    created_at 由调用方预先算好（同一批次共用），不再由列默认值逐行求值
+    """
+    (timestamp, decision, confidence, regime, state, risk_allowed, quality,
+     reason_tags, permission, executable, signal, price) = _ADVISORY_FIELDS(result)
+    tags_mask = encode_reason_tags(reason_tags)
+    return (
+        symbol,
+        timestamp,
+        to_epoch_us(timestamp),
+        decision,
+        confidence,
+        regime,
+        state,
+        risk_allowed,
+        quality,
+        reason_tags_order(reason_tags, tags_mask),
+        tags_mask,
+        permission,
+        executable,
+        signal,
+        price,
+        created_at
+    )
+
+
+def _history_dicts(rows) -> List[dict]:
+    """
+    历史查询行（列顺序同 _HISTORY_COLUMNS）→ 对外的dict列表
+    
+    布尔列为 NOT NULL / DEFAULT 0 的 0/1 整数：`!= 0` 是解释器内联的整数比较，
+    省去每行两次 bool() 调用（不用 PARSE_DECLTYPES 转换器：转换器按列值逐个回调Python）
+    """
+    return [
+        {
+            'decision': _DECISION_VALUES.get(decision, decision),
+            'confidence': _CONFIDENCE_VALUES.get(confidence, confidence),
+            'market_regime': _REGIME_VALUES.get(regime, regime),
+            'system_state': _STATE_VALUES.get(state, state),
+            'risk_exposure_allowed': risk_allowed != 0,
+            'trade_quality': _QUALITY_VALUES.get(quality, quality),
+            'reason_tags': load_reason_tag_values(tags_mask, tags_json),
+            'execution_permission': _PERMISSION_VALUES.get(permission, permission) or 'allow',
+            'executable': executable != 0,
+            'signal_decision': _DECISION_VALUES.get(signal, signal),
+            'timestamp': timestamp,
+            'price': price
+        }
+        for (decision, confidence, regime, state, risk_allowed, quality, tags_mask, tags_json,
+             permission, executable, signal, timestamp, price) in rows
+    ]
+
+
 class AdvisoryRepository:
     """L1单周期决策数据访问"""
     
-    def __init__(self, connection):
+    def __init__(self, connection, query_cache=None):
         """
         初始化Repository
         
         Args:
             connection: DatabaseConnection实例
+            query_cache: QueryCache实例（None则不缓存查询结果）
         """
         self.connection = connection
+        self.query_cache = query_cache
+        self.writer = None  # WriterLoop（由 L1DatabaseModular.start_writer 设置）
+        
+        # symbol → 本进程最近一次已提交写入的决策（get_latest 直接返回，免查询）
+        self._latest: Dict[str, AdvisoryResult] = {}
+        self._latest_lock = threading.Lock()
+    
+    def _invalidate(self, symbol: str):
+        """写入后使该 symbol 的缓存查询结果失效（并入外层事务时推迟到其提交之后）"""
+        if self.query_cache is not None:
+            self.connection.after_commit(lambda: self.query_cache.invalidate(symbol))
+    
+    def _remember_latest(self, conn, symbol: str, result: AdvisoryResult):
+        """
+        写入后更新最新决策
+        
+        写入并入外层事务（尚未提交、可能回滚）时只移除该 symbol，
+        get_latest 回退到查询；时间戳更早的补写不覆盖已有的更新结果
+        """
+        with self._latest_lock:
+            if conn.in_transaction:
+                self._latest.pop(symbol, None)
+                return
+            current = self._latest.get(symbol)
+            if current is None or result.timestamp >= current.timestamp:
+                self._latest[symbol] = result
     
     def save(self, symbol: str, result: AdvisoryResult) -> int:
         """
@@ -37,34 +310,17 @@ class AdvisoryRepository:
             int: 插入记录的ID
         """
         try:
-            with self.connection.connect() as conn:
+            with self.connection.write() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    INSERT INTO l1_advisory_results 
-                    (symbol, timestamp, decision, confidence, market_regime, system_state, 
-                     risk_exposure_allowed, trade_quality, reason_tags, execution_permission, executable, signal_decision, price)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    symbol,
-                    result.timestamp.isoformat(),
-                    result.decision.value,
-                    result.confidence.value,
-                    result.market_regime.value,
-                    result.system_state.value,
-                    1 if result.risk_exposure_allowed else 0,
-                    result.trade_quality.value,
-                    json.dumps([tag.value for tag in result.reason_tags]),
-                    result.execution_permission.value,
-                    1 if result.executable else 0,
-                    result.signal_decision.value if result.signal_decision else None,
-                    result.price
-                ))
+                cursor.execute(_SQL_INSERT_ADVISORY, _to_row(symbol, result, sqlite_now()))
                 
-                conn.commit()
                 record_id = cursor.lastrowid
-                logger.info(f"Saved advisory result for {symbol}: {result.decision.value} (id={record_id})")
-                return record_id
+            
+            self._remember_latest(conn, symbol, result)
+            self._invalidate(symbol)
+            logger.info(f"Saved advisory result for {symbol}: {result.decision.value} (id={record_id})")
+            return record_id
         
         except Exception as e:
             logger.error(f"Error saving advisory result: {e}")
@@ -74,40 +330,39 @@ class AdvisoryRepository:
         """
         获取指定币种的最新决策
         
+        本进程写入过的 symbol 直接返回内存中的结果（与保存时为同一对象，调用方不应修改）；
+        未命中（冷启动/其他进程写入）时查询数据库
+        
         Args:
             symbol: 交易对符号
         
         Returns:
             AdvisoryResult或None
         """
+        latest = self._latest.get(symbol)
+        if latest is not None:
+            return latest
+        
         try:
-            with self.connection.connect() as conn:
+            with self.connection.read() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    SELECT decision, confidence, market_regime, system_state,
-                           risk_exposure_allowed, trade_quality, reason_tags, 
-                           execution_permission, executable, signal_decision, timestamp
-                    FROM l1_advisory_results
-                    WHERE symbol = ?
-                    ORDER BY timestamp DESC
-                    LIMIT 1
-                ''', (symbol,))
-                
+                cursor.execute(_SQL_SELECT_LATEST, (symbol, symbol, 1))
                 row = cursor.fetchone()
+                
                 if row:
                     return AdvisoryResult(
-                        decision=Decision(row[0]),
-                        confidence=Confidence(row[1]),
-                        market_regime=MarketRegime(row[2]),
-                        system_state=SystemState(row[3]),
-                        risk_exposure_allowed=bool(row[4]),
-                        trade_quality=TradeQuality(row[5]),
-                        reason_tags=[ReasonTag(tag) for tag in json.loads(row[6])],
-                        execution_permission=ExecutionPermission(row[7] or 'allow'),
-                        executable=bool(row[8]),
-                        signal_decision=Decision(row[9]) if row[9] else None,
-                        timestamp=datetime.fromisoformat(row[10])
+                        decision=decode_enum(Decision, row[0]),
+                        confidence=decode_enum(Confidence, row[1]),
+                        market_regime=decode_enum(MarketRegime, row[2]),
+                        system_state=decode_enum(SystemState, row[3]),
+                        risk_exposure_allowed=row[4] != 0,
+                        trade_quality=decode_enum(TradeQuality, row[5]),
+                        reason_tags=load_reason_tags(row[6], row[7]),
+                        execution_permission=decode_enum(ExecutionPermission, row[8]) or ExecutionPermission.ALLOW,
+                        executable=row[9] != 0,
+                        signal_decision=decode_enum(Decision, row[10]),
+                        timestamp=datetime.fromisoformat(row[11])
                     )
                 return None
         
@@ -115,6 +370,35 @@ class AdvisoryRepository:
             logger.error(f"Error getting latest advisory: {e}")
             return None
     
+    def get_latest_decision(self, symbol: str) -> Optional[str]:
+        """
+        获取指定币种最新决策的 decision 值（如 'long'）
+        
+        只需要决策方向时使用：不构造 AdvisoryResult、不解码其余枚举和reason_tags
+        
+        Args:
+            symbol: 交易对符号
+        
+        Returns:
+            str或None
+        """
+        latest = self._latest.get(symbol)
+        if latest is not None:
+            return latest.decision.value
+        
+        try:
+            with self.connection.read() as conn:
+                row = conn.execute(_SQL_SELECT_LATEST_DECISION, (symbol, symbol, 1)).fetchone()
+            
+            if row is None:
+                return None
+            return _DECISION_VALUES.get(row[0], row[0])
+        
+        except Exception as e:
+            logger.error(f"Error getting latest decision: {e}")
+            return None
+    
+    @cached()
     def get_history(
         self, 
         symbol: str, 
@@ -130,40 +414,18 @@ class AdvisoryRepository:
             limit: 最大返回条数（默认100条）
         
         Returns:
-            List[dict]: 历史决策列表
+            List[dict]: 历史决策列表（列表为新对象；各行dict可能来自查询缓存、与其他调用方共享，不应修改）
         """
         try:
-            cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
+            cutoff_time = to_epoch_us(datetime.now() - timedelta(hours=hours))
             
-            with self.connection.connect() as conn:
+            with self.connection.read() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    SELECT decision, confidence, market_regime, system_state,
-                           risk_exposure_allowed, trade_quality, reason_tags, 
-                           execution_permission, executable, signal_decision, timestamp, price
-                    FROM l1_advisory_results
-                    WHERE symbol = ? AND timestamp >= ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                ''', (symbol, cutoff_time, limit))
+                cursor.execute(_SQL_SELECT_HISTORY, (symbol, cutoff_time, limit, symbol, cutoff_time, limit, limit))
+                rows = cursor.fetchall()
                 
-                results = []
-                for row in cursor.fetchall():
-                    results.append({
-                        'decision': row[0],
-                        'confidence': row[1],
-                        'market_regime': row[2],
-                        'system_state': row[3],
-                        'risk_exposure_allowed': bool(row[4]),
-                        'trade_quality': row[5],
-                        'reason_tags': json.loads(row[6]),
-                        'execution_permission': row[7] or 'allow',
-                        'executable': bool(row[8]),
-                        'signal_decision': row[9],
-                        'timestamp': row[10],
-                        'price': row[11] if len(row) > 11 else None
-                    })
+                results = _history_dicts(rows)
                 
                 logger.info(f"Retrieved {len(results)} history records for {symbol}")
                 return results
@@ -172,6 +434,88 @@ class AdvisoryRepository:
             logger.error(f"Error getting history advisory: {e}")
             return []
     
+    def get_history_page(
+        self,
+        symbol: str,
+        hours: int = 48,
+        limit: int = 100,
+        cursor: Optional[Tuple[int, int]] = None
+    ) -> Tuple[List[dict], Optional[Tuple[int, int]]]:
+        """
+        分页获取历史决策（从新到旧，键集分页）
+        
+        Args:
+            symbol: 交易对符号
+            hours: 回溯小时数
+            limit: 每页条数
+            cursor: 上一页返回的游标，None 表示第一页
+        
+        Returns:
+            (本页历史决策列表, 下一页游标)；没有更多记录时游标为None
+        """
+        try:
+            cutoff_time = to_epoch_us(datetime.now() - timedelta(hours=hours))
+            ts_us, record_id = cursor or _FIRST_PAGE
+            
+            with self.connection.read() as conn:
+                page = (symbol, cutoff_time, ts_us, record_id, limit)
+                rows = conn.execute(_SQL_SELECT_HISTORY_PAGE, page + page + (limit,)).fetchall()
+            
+            next_cursor = rows[-1][-2:] if len(rows) == limit else None
+            return _history_dicts([row[:-2] for row in rows]), next_cursor
+        
+        except Exception as e:
+            logger.error(f"Error getting history page: {e}")
+            return [], None
+    
+    def get_history_with_steps(self, symbol: str, hours: int = 48, limit: int = 100) -> List[dict]:
+        """
+        获取历史决策及各自的管道步骤（一次连接查询，不逐条查询步骤）
+        
+        Args:
+            symbol: 交易对符号
+            hours: 回溯小时数
+            limit: 最大返回决策条数
+        
+        Returns:
+            List[dict]: 同 get_history，另含 'id' 与 'steps'（同 PipelineRepository.get 的步骤列表）
+        """
+        try:
+            cutoff_time = to_epoch_us(datetime.now() - timedelta(hours=hours))
+            
+            with self.connection.read() as conn:
+                rows = conn.execute(
+                    _SQL_SELECT_HISTORY_WITH_STEPS, (symbol, cutoff_time, limit, symbol, cutoff_time, limit, limit)
+                ).fetchall()
+            
+            # 按决策分组（同一决策的行相邻）
+            results = []
+            current_id = None
+            for row in rows:
+                if row[13] != current_id:
+                    current_id = row[13]
+                    record = _history_dicts([row[:13]])[0]
+                    record['id'] = current_id
+                    record['steps'] = steps = []
+                    results.append(record)
+                if row[14] is not None:
+                    step, name, status, message, result, timestamp = row[14:]
+                    steps.append({
+                        'step': step,
+                        'name': name,
+                        'status': status,
+                        'message': message,
+                        'result': result,
+                        'timestamp': timestamp
+                    })
+            
+            return results
+        
+        except Exception as e:
+            logger.error(f"Error getting history with steps: {e}")
+            return []
+    
+    @cached()
     def get_stats(
         self, 
         symbol: str, 
@@ -185,51 +529,54 @@ class AdvisoryRepository:
             hours: 统计时间范围（小时）
         
         Returns:
-            dict: 统计信息
+            dict: 统计信息（新的dict对象，可修改）
         """
         try:
-            cutoff_time = (datetime.now() - timedelta(hours=hours)).isoformat()
+            cutoff_time = to_epoch_us(datetime.now() - timedelta(hours=hours))
             
-            with self.connection.connect() as conn:
-                cursor = conn.cursor()
-                
-                # 总决策数
-                cursor.execute('''
-                    SELECT COUNT(*) FROM l1_advisory_results
-                    WHERE symbol = ? AND timestamp >= ?
-                ''', (symbol, cutoff_time))
-                total = cursor.fetchone()[0]
-                
-                # 按决策类型统计
-                cursor.execute('''
-                    SELECT decision, COUNT(*) FROM l1_advisory_results
-                    WHERE symbol = ? AND timestamp >= ?
-                    GROUP BY decision
-                ''', (symbol, cutoff_time))
-                decision_counts = {row[0]: row[1] for row in cursor.fetchall()}
-                
-                # 按置信度统计
-                cursor.execute('''
-                    SELECT confidence, COUNT(*) FROM l1_advisory_results
-                    WHERE symbol = ? AND timestamp >= ?
-                    GROUP BY confidence
-                ''', (symbol, cutoff_time))
-                confidence_counts = {row[0]: row[1] for row in cursor.fetchall()}
-                
-                return {
-                    'total': total,
-                    'long': decision_counts.get('long', 0),
-                    'short': decision_counts.get('short', 0),
-                    'no_trade': decision_counts.get('no_trade', 0),
-                    'high_confidence': confidence_counts.get('high', 0),
-                    'medium_confidence': confidence_counts.get('medium', 0),
-                    'low_confidence': confidence_counts.get('low', 0)
-                }
+            with self.connection.read() as conn:
+                rows = conn.execute(_SQL_STATS, (symbol, cutoff_time, symbol, cutoff_time)).fetchall()
+            
+            total = 0
+            decision_counts: Dict[str, int] = {}
+            confidence_counts: Dict[str, int] = {}
+            for decision, confidence, count in rows:
+                total += count
+                decision = _DECISION_VALUES.get(decision, decision)
+                decision_counts[decision] = decision_counts.get(decision, 0) + count
+                confidence = _CONFIDENCE_VALUES.get(confidence, confidence)
+                confidence_counts[confidence] = confidence_counts.get(confidence, 0) + count
+            
+            return {
+                'total': total,
+                'long': decision_counts.get('long', 0),
+                'short': decision_counts.get('short', 0),
+                'no_trade': decision_counts.get('no_trade', 0),
+                'high_confidence': confidence_counts.get('high', 0),
+                'medium_confidence': confidence_counts.get('medium', 0),
+                'low_confidence': confidence_counts.get('low', 0)
+            }
         
         except Exception as e:
             logger.error(f"Error getting decision stats: {e}")
             return {}
     
+    def save_async(self, symbol: str, result) -> Future:
+        """
+        异步保存决策结果（经后台写线程攒批写入，不返回记录ID）
+        
+        未启动写线程时退化为同步 save
+        
+        Returns:
+            Future: 写入提交后完成；需要确认落盘的调用方可 future.result()
+        """
+        if self.writer is None:
+            self.save(symbol, result)
+            future = Future()
+            future.set_result(None)
+            return future
+        return self.writer.submit('advisory', symbol, result)
+    
     def save_batch(self, results: List[tuple]) -> int:
         """
         批量保存决策结果（提高写入性能）
@@ -238,42 +585,114 @@ class AdvisoryRepository:
             results: 元组列表，每个元组为 (symbol, result)
         
         Returns:
-            int: 成功保存的记录数
+            int: 保存的记录数
+        
+        出错时记录日志并重新抛出：单独调用时整批回滚；并入外层事务时由外层回滚
+        （WriterLoop 以SAVEPOINT撤销该批已写入的块）
         """
         try:
-            with self.connection.connect() as conn:
+            created_at = sqlite_now()
+            # 逐块从生成器取行，同一时刻只物化一块参数（不先构造整批的行列表）
+            rows = (_to_row(symbol, result, created_at) for symbol, result in results)
+            
+            with self.connection.write() as conn:
                 cursor = conn.cursor()
                 
-                data = []
-                for symbol, result in results:
-                    data.append((
-                        symbol,
-                        result.timestamp.isoformat(),
-                        result.decision.value,
-                        result.confidence.value,
-                        result.market_regime.value,
-                        result.system_state.value,
-                        1 if result.risk_exposure_allowed else 0,
-                        result.trade_quality.value,
-                        json.dumps([tag.value for tag in result.reason_tags]),
-                        result.execution_permission.value,
-                        1 if result.executable else 0,
-                        result.signal_decision.value if result.signal_decision else None,
-                        result.price
-                    ))
-                
-                cursor.executemany('''
-                    INSERT INTO l1_advisory_results 
-                    (symbol, timestamp, decision, confidence, market_regime, system_state, 
-                     risk_exposure_allowed, trade_quality, reason_tags, execution_permission, executable, signal_decision, price)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', data)
-                
-                conn.commit()
-                count = len(data)
-                logger.info(f"Batch saved {count} advisory results")
-                return count
+                while True:
+                    chunk = tuple(islice(rows, BATCH_CHUNK_SIZE))
+                    if len(chunk) < BATCH_CHUNK_SIZE:
+                        # 余下不足一块的行复用单行语句
+                        cursor.executemany(_SQL_INSERT_ADVISORY, chunk)
+                        break
+                    # 整块：多行VALUES，每块一次execute
+                    cursor.execute(_SQL_INSERT_ADVISORY_CHUNK, tuple(chain.from_iterable(chunk)))
+            
+            for symbol, result in results:
+                self._remember_latest(conn, symbol, result)
+            
+            for symbol in {symbol for symbol, _ in results}:
+                self._invalidate(symbol)
+            
+            count = len(results)
+            logger.info(f"Batch saved {count} advisory results")
+            return count
         
         except Exception as e:
             logger.error(f"Error batch saving advisory results: {e}")
-            return 0
+            raise
+    
+    def cleanup_old(self, days: int = 7) -> int:
+        """
+        清理N天前的旧决策记录（热表与冷表）
+        
+        Args:
+            days: 保留天数
+        
+        Returns:
+            int: 删除的记录数
+        """
+        try:
+            cutoff_us = to_epoch_us(datetime.now() - timedelta(days=days))
+            
+            with self.connection.write() as conn:
+                deleted_count = (
+                    conn.execute(_SQL_DELETE_BEFORE, (cutoff_us,)).rowcount
+                    + conn.execute(_SQL_DELETE_COLD_BEFORE, (cutoff_us,)).rowcount
+                )
+            
+            if deleted_count:
+                with self._latest_lock:
+                    for symbol, result in list(self._latest.items()):
+                        if to_epoch_us(result.timestamp) < cutoff_us:
+                            del self._latest[symbol]
+                if self.query_cache is not None:
+                    self.connection.after_commit(self.query_cache.clear)
+            
+            logger.info(f"Cleaned up {deleted_count} old advisory results (older than {days} days)")
+            return deleted_count
+        
+        except Exception as e:
+            logger.error(f"Error cleaning up advisory results: {e}")
+            raise
+    
+    def archive(self, hours: int = 6) -> int:
+        """
+        将N小时前的记录从热表移入冷表（单个写事务：补齐 ts_us、复制后删除）
+        
+        Args:
+            hours: 热表保留的小时数
+        
+        Returns:
+            int: 归档的记录数
+        """
+        try:
+            cutoff_us = to_epoch_us(datetime.now() - timedelta(hours=hours))
+            
+            with self.connection.write() as conn:
+                self._backfill_ts_us(conn)
+                archived_count = conn.execute(_SQL_ARCHIVE_COPY, (cutoff_us,)).rowcount
+                conn.execute(_SQL_DELETE_BEFORE, (cutoff_us,))
+            
+            logger.info(f"Archived {archived_count} advisory results to cold storage (older than {hours} hours)")
+            return archived_count
+        
+        except Exception as e:
+            logger.error(f"Error archiving advisory results: {e}")
+            raise
+    
+    @staticmethod
+    def _backfill_ts_us(conn):
+        """
+        由TEXT timestamp补齐热表中缺失的 ts_us（与写入路径相同的本地时区解释）
+        
+        无法解析的时间戳保持 NULL 并记录警告（此类行不会被归档或清理）
+        """
+        updates = []
+        for row_id, timestamp in conn.execute(_SQL_SELECT_MISSING_TS_US).fetchall():
+            try:
+                updates.append((to_epoch_us(datetime.fromisoformat(timestamp)), row_id))
+            except (TypeError, ValueError):
+                logger.warning(f"{HOT_TABLE} id={row_id}: unparsable timestamp {timestamp!r}, not archived")
+        if updates:
+            conn.executemany(_SQL_UPDATE_TS_US, updates)
+            logger.info(f"Backfilled ts_us for {len(updates)} advisory results before archiving")
@@ -0,0 +1,99 @@
+"""
+Async Database - asyncio 接口
+
+包装 L1DatabaseModular，供 asyncio 调用方使用（不阻塞事件循环）：
+- 读操作在读线程池中执行，WAL模式下多个读取可并行（线程数 = 读连接池容量）
+- 写操作在单一写线程中执行，与SQLite单写者模型一致，写请求在线程内排队而不争抢写锁
+- SQL、连接池、缓存均复用同步实现，不另起一套连接
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncL1Database:
+    """L1数据库的 asyncio 包装"""
+
+    def __init__(self, db):
+        """
+        Args:
+            db: L1DatabaseModular实例（close 时一并关闭）
+        """
+        self.db = db
+        self._read_executor = ThreadPoolExecutor(
+            max_workers=db.connection.pool_size, thread_name_prefix='l1-db-read'
+        )
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='l1-db-write')
+
+    async def _run(self, executor, method, *args):
+        """在指定线程池中执行同步方法"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(method, *args))
+
+    def _read(self, method, *args):
+        """读操作：读线程池"""
+        return self._run(self._read_executor, method, *args)
+
+    def _write(self, method, *args):
+        """写操作：单一写线程"""
+        return self._run(self._write_executor, method, *args)
+
+    # ========================================
+    # 写入
+    # ========================================
+
+    async def save_advisory_result(self, symbol: str, result) -> int:
+        """保存单周期决策结果，返回记录ID"""
+        return await self._write(self.db.advisory.save, symbol, result)
+
+    async def save_dual_advisory_result(self, symbol: str, result) -> int:
+        """保存双周期决策结果，返回记录ID"""
+        return await self._write(self.db.dual_advisory.save, symbol, result)
+
+    async def save_advisory_with_steps(self, symbol: str, result, steps: list) -> int:
+        """在同一事务中保存决策及其管道步骤，返回决策记录ID"""
+        return await self._write(self.db.save_advisory_with_steps, symbol, result, steps)
+
+    # ========================================
+    # 查询
+    # ========================================
+
+    async def get_latest_advisory(self, symbol: str):
+        """获取最新单周期决策（AdvisoryResult或None）"""
+        return await self._read(self.db.advisory.get_latest, symbol)
+
+    async def get_latest_decision(self, symbol: str) -> Optional[str]:
+        """获取最新单周期决策的 decision 值"""
+        return await self._read(self.db.advisory.get_latest_decision, symbol)
+
+    async def get_advisory_history(self, symbol: str, hours: int = 24, limit: int = 1000) -> List[dict]:
+        """获取单周期历史"""
+        return await self._read(self.db.advisory.get_history, symbol, hours, limit)
+
+    async def get_dual_advisory_history(self, symbol: str, hours: int = 24, limit: int = 1000) -> List[dict]:
+        """获取双周期历史（普通dict，可直接JSON序列化）"""
+        return await self._read(self.db.get_dual_advisory_history, symbol, hours, limit)
+
+    async def get_decision_stats(self, symbol: str, hours: int = 24) -> Dict:
+        """获取单周期决策统计"""
+        return await self._read(self.db.advisory.get_stats, symbol, hours)
+
+    async def get_pipeline_steps(self, advisory_id: int) -> List[dict]:
+        """获取指定决策的管道步骤"""
+        return await self._read(self.db.pipeline.get, advisory_id)
+
+    async def close(self):
+        """等待进行中的操作完成后关闭线程池与数据库"""
+        await asyncio.get_running_loop().run_in_executor(None, self._shutdown)
+
+    def _shutdown(self):
+        """关闭线程池（先写完已排队的写操作）与数据库"""
+        self._write_executor.shutdown(wait=True)
+        self._read_executor.shutdown(wait=True)
+        self.db.close()
+        logger.info("AsyncL1Database closed")
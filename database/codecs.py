@@ -0,0 +1,260 @@
+"""
+Database Codecs - 存储编解码
+
+- reason_tags: 以INTEGER位掩码存储（位序号见 models.reason_tags.REASON_TAG_BITS）；
+  位掩码只记录集合，原始顺序与按位序号解码的结果不同时另存为JSON文本（见 reason_tags_order）
+- JSON: 优先使用orjson（C实现），未安装时回退到标准库json
+- 时间戳: 以INTEGER微秒（ts_us）存储，用于范围过滤与排序
+- 枚举: 以INTEGER编码存储（编码见 models.enums.ENUM_STORAGE_CODES）
+"""
+
+import json
+import logging
+import sqlite3
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from models.enums import ENUM_STORAGE_CODES
+from models.reason_tags import ReasonTag, REASON_TAG_BITS
+
+logger = logging.getLogger(__name__)
+
+# 可选依赖：orjson
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.warning("orjson not installed, falling back to stdlib json")
+
+
+# 位序号 → ReasonTag（按位序号升序，解码时顺序稳定）
+_TAGS_BY_BIT = [tag for tag, _ in sorted(REASON_TAG_BITS.items(), key=lambda item: item[1])]
+_BITS_BY_TAG_INDEX = [REASON_TAG_BITS[tag] for tag in _TAGS_BY_BIT]
+
+# ReasonTag → 该标签的位值（编码时一次查表，免逐个移位）
+_MASK_BY_TAG = {tag: 1 << bit for tag, bit in REASON_TAG_BITS.items()}
+
+# 解码缓存容量：实际出现的标签组合数量有限，远小于此值
+_DECODE_CACHE_SIZE = 4096
+
+
+# 枚举成员 → 编码（各枚举类合并为一张表）
+_CODE_BY_MEMBER = {
+    member: code
+    for codes in ENUM_STORAGE_CODES.values()
+    for member, code in codes.items()
+}
+
+# 枚举类 → 按编码索引的成员列表
+_MEMBERS_BY_CODE = {
+    enum_cls: [member for member, _ in sorted(codes.items(), key=lambda item: item[1])]
+    for enum_cls, codes in ENUM_STORAGE_CODES.items()
+}
+
+# 枚举类 → {编码: .value 字符串}
+_VALUE_BY_CODE = {
+    enum_cls: {code: member.value for member, code in codes.items()}
+    for enum_cls, codes in ENUM_STORAGE_CODES.items()
+}
+
+
+def register_adapters():
+    """
+    注册sqlite3绑定参数适配器（进程级，幂等）
+    
+    - datetime → isoformat() 文本（与TEXT timestamp列格式一致）
+    - 已编码的枚举类 → INTEGER编码
+    
+    适配器均为C实现的可调用对象（方法描述符 / dict.__getitem__），
+    绑定参数时无需在Python侧逐个转换
+    """
+    sqlite3.register_adapter(datetime, datetime.isoformat)
+    for enum_cls in ENUM_STORAGE_CODES:
+        sqlite3.register_adapter(enum_cls, _CODE_BY_MEMBER.__getitem__)
+
+
+def json_dumps(obj) -> str:
+    """序列化为JSON文本"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj)
+
+
+def json_loads(text):
+    """解析JSON文本"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def to_epoch_us(dt: datetime) -> int:
+    """
+    datetime → 纪元微秒（整数运算，不经浮点，微秒部分精确）
+    
+    朴素datetime按本地时区解释（与 datetime.timestamp() 一致）
+    """
+    return int(dt.replace(microsecond=0).timestamp()) * 1_000_000 + dt.microsecond
+
+
+def sqlite_now() -> str:
+    """
+    当前UTC时间，格式同 SQLite 的 datetime('now')（YYYY-MM-DD HH:MM:SS）
+    
+    created_at 由应用显式绑定，每次保存/每个批次只计算一次
+    """
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def encode_enum(member) -> Optional[int]:
+    """枚举成员 → INTEGER编码（None原样返回）"""
+    if member is None:
+        return None
+    return _CODE_BY_MEMBER[member]
+
+
+def decode_enum(enum_cls, code):
+    """
+    INTEGER编码 → 枚举成员
+    
+    迁移时无法识别的旧TEXT值会原样保留在列中，此处按 .value 解析
+    """
+    if code is None:
+        return None
+    if code.__class__ is int:
+        return _MEMBERS_BY_CODE[enum_cls][code]
+    return enum_cls(code)
+
+
+def enum_value(enum_cls, code) -> Optional[str]:
+    """
+    INTEGER编码 → 枚举的 .value 字符串（供API输出，不构造枚举成员）
+    
+    迁移时无法识别的旧TEXT值原样返回
+    """
+    return _VALUE_BY_CODE[enum_cls].get(code, code)
+
+
+def enum_value_map(enum_cls) -> Dict[int, str]:
+    """
+    取得 {编码: .value} 查表（批量解码时用 map.get(code, code) 代替逐个调用 enum_value）
+    
+    返回的字典为共享对象，调用方不可修改
+    """
+    return _VALUE_BY_CODE[enum_cls]
+
+
+def encode_reason_tags(reason_tags: Iterable[ReasonTag]) -> int:
+    """
+    将reason_tags编码为位掩码
+
+    Args:
+        reason_tags: ReasonTag列表
+
+    Returns:
+        int: 位掩码（重复标签只记一次）
+    """
+    mask = 0
+    for tag in reason_tags:
+        mask |= _MASK_BY_TAG[tag]
+    return mask
+
+
+def reason_tags_order(reason_tags: Iterable[ReasonTag], mask: int) -> str:
+    """
+    位掩码之外需另存的reason_tags原始顺序
+    
+    管道按判断先后追加标签，顺序有意义；常见情况下原列表与按位序号解码的结果相同，
+    此时返回 ''（不额外占用存储），否则返回标签 .value 的JSON数组
+    
+    Args:
+        reason_tags: ReasonTag列表
+        mask: encode_reason_tags(reason_tags) 的结果
+    
+    Returns:
+        str: '' 或 JSON数组文本（由 load_reason_tags 优先读取）
+    """
+    tags = tuple(reason_tags)
+    if tags == _decode_mask(mask):
+        return ''
+    return json_dumps([tag.value for tag in tags])
+
+
+@lru_cache(maxsize=_DECODE_CACHE_SIZE)
+def _decode_mask(mask: int) -> Tuple[ReasonTag, ...]:
+    """位掩码 → 标签元组（按掩码缓存）"""
+    return tuple(
+        tag for tag, bit in zip(_TAGS_BY_BIT, _BITS_BY_TAG_INDEX)
+        if mask >> bit & 1
+    )
+
+
+@lru_cache(maxsize=_DECODE_CACHE_SIZE)
+def _decode_mask_values(mask: int) -> Tuple[str, ...]:
+    """位掩码 → 标签 .value 元组（按掩码缓存）"""
+    return tuple(tag.value for tag in _decode_mask(mask))
+
+
+def decode_reason_tags(mask: int) -> List[ReasonTag]:
+    """
+    将位掩码解码为reason_tags（按位序号升序）
+
+    Args:
+        mask: 位掩码
+
+    Returns:
+        List[ReasonTag]: 标签列表
+    """
+    return list(_decode_mask(mask))
+
+
+def decode_reason_tag_values(mask: int) -> List[str]:
+    """
+    将位掩码解码为标签 .value 列表（供API输出，不逐行构造）
+    
+    Args:
+        mask: 位掩码
+    
+    Returns:
+        List[str]: 标签值列表（按位序号升序）
+    """
+    return list(_decode_mask_values(mask))
+
+
+def load_reason_tags(mask: Optional[int], tags_json: Optional[str]) -> List[ReasonTag]:
+    """
+    读取一行记录的reason_tags
+
+    有JSON文本时按其顺序返回（位掩码列出现之前写入的旧数据，或原始顺序与位序号不同，
+    见 reason_tags_order），否则解码位掩码
+
+    Args:
+        mask: 位掩码列
+        tags_json: 对应的JSON文本列（'' / NULL 表示按位序号）
+
+    Returns:
+        List[ReasonTag]: 标签列表
+    """
+    if tags_json:
+        return [ReasonTag(tag) for tag in json_loads(tags_json)]
+    if mask is not None:
+        return decode_reason_tags(mask)
+    return []
+
+
+def load_reason_tag_values(mask: Optional[int], tags_json: Optional[str]) -> List[str]:
+    """
+    同 load_reason_tags，但返回标签 .value 列表
+    
+    Args:
+        mask: 位掩码列
+        tags_json: 对应的JSON文本列（'' / NULL 表示按位序号）
+    
+    Returns:
+        List[str]: 标签值列表
+    """
+    if tags_json:
+        return [ReasonTag(tag).value for tag in json_loads(tags_json)]
+    if mask is not None:
+        return decode_reason_tag_values(mask)
+    return []
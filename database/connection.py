@@ -1,37 +1,223 @@
 """
 Database Connection - 数据库连接管理
+
+连接池模型（1 writer + N readers）：
+- write(): 单一写连接，由锁串行化，退出时自动commit/rollback
+- read(): 读连接池（LIFO复用），保留每个连接的页缓存
+
+连接配置：
+- journal_mode=WAL 持久保存在数据库文件中，由 DatabaseMigrations 在初始化时设置一次
+- 其余PRAGMA只对当前连接生效，每个新连接由 _configure() 设置
+
+事务模型：
+- 连接以 autocommit 模式打开（isolation_level=None），sqlite3模块不再隐式BEGIN
+- transaction(): 显式 BEGIN IMMEDIATE / COMMIT / ROLLBACK，可嵌套，
+  嵌套的 write()/transaction() 并入最外层事务（多次保存只fsync一次）
+- after_commit(): 提交后回调（如查询缓存失效），事务中登记、最外层COMMIT后执行，ROLLBACK时丢弃
 """
 
 import sqlite3
 import os
+import queue
+from pathlib import Path
+import threading
 import logging
+from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
+# 每个连接的语句缓存容量（sqlite3默认128）
+STATEMENT_CACHE_SIZE = 256
+
+# 等待其他进程释放锁的时间（秒，传给 sqlite3.connect 的 timeout，即 busy_timeout）
+BUSY_TIMEOUT = 5.0
+
+# 每个连接的PRAGMA
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous = NORMAL',    # WAL模式下提交不再fsync主库文件，崩溃仍不损坏数据库
+    'PRAGMA wal_autocheckpoint = 1000',  # WAL超过1000页时由提交的连接做被动checkpoint
+    'PRAGMA temp_store = MEMORY',     # 排序/临时B树放内存
+    'PRAGMA mmap_size = 268435456',   # 256MB内存映射读取
+    'PRAGMA cache_size = -65536',     # 64MB页缓存
+)
+
 
 class DatabaseConnection:
-    """数据库连接管理器"""
-    
-    def __init__(self, db_path: str = None):
+    """数据库连接管理器（带连接池）"""
+
+    def __init__(self, db_path: str = None, pool_size: int = 8):
         """
         初始化数据库连接
-        
+
         Args:
             db_path: 数据库文件路径，默认为 data/db/l1_advisory.db
+            pool_size: 读连接池容量（超出部分用完即关闭）
         """
         if db_path is None:
             base_dir = os.path.dirname(os.path.dirname(__file__))
             db_dir = os.path.join(base_dir, 'data', 'db')
             os.makedirs(db_dir, exist_ok=True)
             db_path = os.path.join(db_dir, 'l1_advisory.db')
-        
+
         self.db_path = db_path
-        logger.info(f"DatabaseConnection initialized: {self.db_path}")
+        self.pool_size = pool_size
+
+        # 读连接池（LIFO：最近归还的连接页缓存最热）
+        self._read_pool = queue.LifoQueue(maxsize=pool_size)
+
+        # 单一写连接（SQLite同一时刻只允许一个写者）
+        self._writer_conn = None
+        self._writer_lock = threading.RLock()
+        # 当前事务提交后执行的回调（持有 _writer_lock 时访问）
+        self._after_commit = []
+
+        logger.info(f"DatabaseConnection initialized: {self.db_path} (read pool={pool_size})")
+
+    def connect(self, read_only: bool = False):
+        """
+        创建新的数据库连接（未池化，供连接池内部及一次性任务使用）
+        
+        Args:
+            read_only: 以 mode=ro URI 打开（文件级只读；内存数据库不支持，忽略）
+        """
+        uri = read_only and self.db_path != ':memory:'
+        target = Path(os.path.abspath(self.db_path)).as_uri() + '?mode=ro' if uri else self.db_path
+        
+        conn = sqlite3.connect(
+            target,
+            timeout=BUSY_TIMEOUT,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            uri=uri
+        )
+        self._configure(conn)
+        return conn
     
-    def connect(self):
-        """创建新的数据库连接"""
-        return sqlite3.connect(self.db_path)
+    @staticmethod
+    def _configure(conn):
+        """设置连接级PRAGMA"""
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+
+    def _connect_reader(self):
+        """
+        创建读连接：autocommit模式下只执行SELECT，从不开启事务；
+        以 mode=ro 打开并设置 query_only，池中连接不会意外写入（写入须走 write()）。
+        WAL模式下各读连接与写连接互不阻塞，多线程可并行读取
+        """
+        conn = self.connect(read_only=True)
+        conn.execute('PRAGMA query_only = ON')
+        return conn
+    
+    @contextmanager
+    def read(self):
+        """
+        借出一个读连接（用于SELECT，不开启事务，无需commit）
+
+        池为空时临时创建新连接；归还时池已满则直接关闭
+        """
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect_reader()
+
+        try:
+            yield conn
+        finally:
+            try:
+                self._read_pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def _writer(self):
+        """
+        返回长期持有的写连接（首次调用时创建，close() 后再次调用重新创建）
+        
+        调用方须持有 _writer_lock
+        """
+        if self._writer_conn is None:
+            self._writer_conn = self.connect()
+        return self._writer_conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        在写连接上开启显式事务（BEGIN IMMEDIATE）
+        
+        已处于事务中（嵌套调用）时直接复用外层事务，由最外层负责COMMIT/ROLLBACK
+        
+        Example:
+            with connection.transaction():
+                advisory_repo.save(...)
+                pipeline_repo.save(...)
+        """
+        with self._writer_lock:
+            conn = self._writer()
+            
+            if conn.in_transaction:
+                yield conn
+                return
+            
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                conn.execute('COMMIT')
+            except BaseException:
+                self._after_commit.clear()
+                conn.execute('ROLLBACK')
+                raise
+            
+            callbacks, self._after_commit = self._after_commit, []
+            for callback in callbacks:
+                callback()
+    
+    def after_commit(self, callback):
+        """
+        登记写入提交后的回调（如查询缓存失效）
+        
+        处于外层事务中时推迟到最外层COMMIT之后执行（回滚则丢弃），
+        否则写入已提交，立即执行。提交前失效会让事务未结束时的读取把旧结果重新写入缓存
+        """
+        with self._writer_lock:
+            if self._writer_conn is not None and self._writer_conn.in_transaction:
+                self._after_commit.append(callback)
+                return
+        callback()
+    
+    @contextmanager
+    def autocommit(self):
+        """
+        借出写连接但不开启事务（用于不能在事务内执行的PRAGMA，如 auto_vacuum）
+        
+        持有写锁期间独占写连接；不得在 transaction() 内调用
+        """
+        with self._writer_lock:
+            conn = self._writer()
+            if conn.in_transaction:
+                raise RuntimeError("autocommit() cannot be used inside a transaction")
+            yield conn
+    
+    @contextmanager
+    def write(self):
+        """
+        借出写连接（用于INSERT/UPDATE/DELETE/DDL）
+        
+        持有写锁期间独占写连接；正常退出commit，异常时rollback；
+        在 transaction() 内调用时并入外层事务
+        """
+        with self.transaction() as conn:
+            yield conn
     
     def close(self):
-        """预留方法（实际使用with语句管理连接）"""
-        pass
+        """关闭读连接池中的连接及写连接"""
+        while True:
+            try:
+                self._read_pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+        with self._writer_lock:
+            if self._writer_conn is not None:
+                self._writer_conn.close()
+                self._writer_conn = None
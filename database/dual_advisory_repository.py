@@ -2,26 +2,153 @@
 Dual Advisory Repository - 双周期决策数据访问
 """
 
-import json
 import sqlite3
+from collections.abc import Mapping
+from concurrent.futures import Future
 from typing import List, Dict
 from datetime import datetime, timedelta
+from models.enums import (
+    Timeframe, Decision, Confidence, MarketRegime, TradeQuality,
+    ExecutionPermission, AlignmentType, ConflictResolution
+)
+from .query_cache import cached
+from .codecs import (
+    json_dumps, json_loads, enum_value,
+    encode_reason_tags, reason_tags_order, load_reason_tag_values, to_epoch_us, sqlite_now
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# ========================================
+# SQL语句（模块级常量：同一字符串对象在连接的语句缓存中命中，免重复prepare）
+# ========================================
+
+# 双周期表的类型化列（写入与读取共用，顺序一致）
+_DUAL_COLUMNS = '''
+        symbol, timestamp, ts_us, price,
+        short_term_decision, short_term_confidence, short_term_executable,
+        short_term_regime, short_term_quality,
+        short_term_label, short_term_permission, short_term_tags_mask, short_term_tags, short_term_metrics,
+        medium_term_decision, medium_term_confidence, medium_term_executable,
+        medium_term_regime, medium_term_quality,
+        medium_term_label, medium_term_permission, medium_term_tags_mask, medium_term_tags, medium_term_metrics,
+        alignment_type, is_aligned, has_conflict,
+        recommended_action, recommended_confidence,
+        conflict_resolution, resolution_reason, recommendation_notes,
+        risk_exposure_allowed, global_risk_mask, global_risk_tags, combined_executable'''
+
+# 写入时在类型化列之后追加 created_at（由应用绑定，不读回）
+_DUAL_PLACEHOLDERS = ', '.join(['?'] * 37)
+
+_SQL_INSERT_DUAL = f'''
+    INSERT INTO l1_dual_advisory_results ({_DUAL_COLUMNS}, created_at
+    ) VALUES ({_DUAL_PLACEHOLDERS})
+'''
+
+# 旧库保留了 full_json 列（NOT NULL）时写入空串占位
+_SQL_INSERT_DUAL_LEGACY = f'''
+    INSERT INTO l1_dual_advisory_results ({_DUAL_COLUMNS}, created_at, full_json
+    ) VALUES ({_DUAL_PLACEHOLDERS}, '')
+'''
+
+_SQL_SELECT_DUAL_HISTORY = f'''
+    SELECT {_DUAL_COLUMNS}
+    FROM l1_dual_advisory_results
+    WHERE symbol = ? AND ts_us >= ?
+    ORDER BY ts_us DESC
+    LIMIT ?
+'''
+
+_SQL_DELETE_DUAL_BEFORE = '''
+    DELETE FROM l1_dual_advisory_results
+    WHERE ts_us < ?
+'''
+
+# 一次扫描取得三个维度的联合分布，再在Python中分别汇总
+_SQL_DUAL_STATS = '''
+    SELECT alignment_type, short_term_decision, medium_term_decision, COUNT(*)
+    FROM l1_dual_advisory_results
+    WHERE symbol = ?
+    GROUP BY alignment_type, short_term_decision, medium_term_decision
+'''
+
+
+def _to_row(symbol: str, result, created_at: str) -> tuple:
+    """
+    DualTimeframeResult → INSERT参数（顺序同 _DUAL_COLUMNS，末尾为 created_at）
+    
+    datetime与枚举直接绑定，由 codecs.register_adapters 注册的适配器转换
+    """
+    short = result.short_term
+    medium = result.medium_term
+    align = result.alignment
+    short_mask = encode_reason_tags(short.reason_tags)
+    medium_mask = encode_reason_tags(medium.reason_tags)
+    global_mask = encode_reason_tags(result.global_risk_tags)
+    return (
+        symbol,
+        result.timestamp,
+        to_epoch_us(result.timestamp),
+        result.price,
+        short.decision,
+        short.confidence,
+        short.executable,
+        short.market_regime,
+        short.trade_quality,
+        short.timeframe_label,
+        short.execution_permission,
+        short_mask,
+        reason_tags_order(short.reason_tags, short_mask),
+        json_dumps(short.key_metrics) if short.key_metrics else None,
+        medium.decision,
+        medium.confidence,
+        medium.executable,
+        medium.market_regime,
+        medium.trade_quality,
+        medium.timeframe_label,
+        medium.execution_permission,
+        medium_mask,
+        reason_tags_order(medium.reason_tags, medium_mask),
+        json_dumps(medium.key_metrics) if medium.key_metrics else None,
+        align.alignment_type,
+        align.is_aligned,
+        align.has_conflict,
+        align.recommended_action,
+        align.recommended_confidence,
+        align.conflict_resolution,
+        align.resolution_reason,
+        align.recommendation_notes,
+        result.risk_exposure_allowed,
+        global_mask,
+        reason_tags_order(result.global_risk_tags, global_mask),
+        result._compute_combined_executable(),
+        created_at
+    )
+
+
 class DualAdvisoryRepository:
     """双周期决策数据访问"""
     
-    def __init__(self, connection):
+    def __init__(self, connection, legacy_full_json: bool = False, query_cache=None):
         """
         初始化Repository
         
         Args:
             connection: DatabaseConnection实例
+            legacy_full_json: 表中是否仍保留旧的 full_json 列
+            query_cache: QueryCache实例（None则不缓存查询结果）
         """
         self.connection = connection
+        self.query_cache = query_cache
+        self.writer = None  # WriterLoop（由 L1DatabaseModular.start_writer 设置）
+        self._sql_insert = _SQL_INSERT_DUAL_LEGACY if legacy_full_json else _SQL_INSERT_DUAL
+    
+    def _invalidate(self, symbol: str):
+        """写入后使该 symbol 的缓存查询结果失效（并入外层事务时推迟到其提交之后）"""
+        if self.query_cache is not None:
+            self.connection.after_commit(lambda: self.query_cache.invalidate(symbol))
     
     def save(self, symbol: str, result) -> int:
         """
@@ -35,57 +162,71 @@ class DualAdvisoryRepository:
             result_id: 插入记录的ID
         """
         try:
-            short = result.short_term
-            medium = result.medium_term
-            align = result.alignment
-            
-            with self.connection.connect() as conn:
+            with self.connection.write() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    INSERT INTO l1_dual_advisory_results (
-                        symbol, timestamp, price,
-                        short_term_decision, short_term_confidence, short_term_executable,
-                        short_term_regime, short_term_quality,
-                        medium_term_decision, medium_term_confidence, medium_term_executable,
-                        medium_term_regime, medium_term_quality,
-                        alignment_type, is_aligned, has_conflict,
-                        recommended_action, recommended_confidence,
-                        full_json, risk_exposure_allowed
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    symbol,
-                    result.timestamp.isoformat(),
-                    result.price,
-                    short.decision.value,
-                    short.confidence.value,
-                    1 if short.executable else 0,
-                    short.market_regime.value,
-                    short.trade_quality.value,
-                    medium.decision.value,
-                    medium.confidence.value,
-                    1 if medium.executable else 0,
-                    medium.market_regime.value,
-                    medium.trade_quality.value,
-                    align.alignment_type.value,
-                    1 if align.is_aligned else 0,
-                    1 if align.has_conflict else 0,
-                    align.recommended_action.value,
-                    align.recommended_confidence.value,
-                    json.dumps(result.to_dict()),
-                    1 if result.risk_exposure_allowed else 0
-                ))
+                cursor.execute(self._sql_insert, _to_row(symbol, result, sqlite_now()))
                 
-                conn.commit()
                 result_id = cursor.lastrowid
-                
-                logger.debug(f"[{symbol}] Saved dual advisory result: id={result_id}")
-                return result_id
+            
+            self._invalidate(symbol)
+            logger.debug(f"[{symbol}] Saved dual advisory result: id={result_id}")
+            return result_id
         
         except Exception as e:
             logger.error(f"Error saving dual advisory result: {e}")
             return 0
     
+    def save_async(self, symbol: str, result) -> Future:
+        """
+        异步保存双周期结论（经后台写线程攒批写入，不返回记录ID）
+        
+        未启动写线程时退化为同步 save
+        
+        Returns:
+            Future: 写入提交后完成；需要确认落盘的调用方可 future.result()
+        """
+        if self.writer is None:
+            self.save(symbol, result)
+            future = Future()
+            future.set_result(None)
+            return future
+        return self.writer.submit('dual_advisory', symbol, result)
+    
+    def save_batch(self, results: List[tuple]) -> int:
+        """
+        批量保存双周期结论（单个事务）
+        
+        Args:
+            results: 元组列表，每个元组为 (symbol, result)
+        
+        Returns:
+            int: 保存的记录数
+        
+        出错时记录日志并重新抛出（同 AdvisoryRepository.save_batch）
+        """
+        try:
+            created_at = sqlite_now()
+            
+            with self.connection.write() as conn:
+                # executemany 直接消费生成器，不先构造整批的行列表
+                conn.executemany(
+                    self._sql_insert,
+                    (_to_row(symbol, result, created_at) for symbol, result in results)
+                )
+            
+            for symbol in {symbol for symbol, _ in results}:
+                self._invalidate(symbol)
+            
+            count = len(results)
+            logger.debug(f"Batch saved {count} dual advisory results")
+            return count
+        
+        except Exception as e:
+            logger.error(f"Error batch saving dual advisory results: {e}")
+            raise
+    
+    @cached()
     def get_history(
         self, 
         symbol: str, 
@@ -101,28 +242,20 @@ class DualAdvisoryRepository:
             limit: 最大返回条数
         
         Returns:
-            历史记录列表（从新到旧）
+            历史记录列表（从新到旧，元素为 LazyDualRow；列表为新对象，元素可能与其他调用方共享）
         """
         try:
-            time_cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
+            time_cutoff = to_epoch_us(datetime.now() - timedelta(hours=hours))
             
-            with self.connection.connect() as conn:
-                conn.row_factory = sqlite3.Row
+            with self.connection.read() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
                 
-                cursor.execute('''
-                    SELECT * FROM l1_dual_advisory_results
-                    WHERE symbol = ? AND timestamp >= ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                ''', (symbol, time_cutoff, limit))
+                cursor.execute(_SQL_SELECT_DUAL_HISTORY, (symbol, time_cutoff, limit))
                 
                 rows = cursor.fetchall()
                 
-                results = []
-                for row in rows:
-                    full_data = json.loads(row['full_json'])
-                    results.append(full_data)
+                results = [LazyDualRow(row) for row in rows]
                 
                 logger.debug(f"[{symbol}] Retrieved {len(results)} dual advisory records ({hours}h)")
                 return results
@@ -131,6 +264,7 @@ class DualAdvisoryRepository:
             logger.error(f"Error getting dual advisory history: {e}")
             return []
     
+    @cached()
     def get_stats(self, symbol: str) -> Dict:
         """
         获取双周期决策统计信息
@@ -139,51 +273,34 @@ class DualAdvisoryRepository:
             symbol: 交易对符号
         
         Returns:
-            统计信息字典
+            统计信息字典（顶层为新对象；嵌套的分布dict可能与其他调用方共享，不应修改）
         """
         try:
-            with self.connection.connect() as conn:
+            with self.connection.read() as conn:
                 cursor = conn.cursor()
                 
-                # 统计1: alignment_type分布
-                cursor.execute('''
-                    SELECT 
-                        alignment_type,
-                        COUNT(*) as count,
-                        COUNT(*) * 100.0 / (SELECT COUNT(*) FROM l1_dual_advisory_results WHERE symbol = ?) as percentage
-                    FROM l1_dual_advisory_results
-                    WHERE symbol = ?
-                    GROUP BY alignment_type
-                    ORDER BY count DESC
-                ''', (symbol, symbol))
+                cursor.execute(_SQL_DUAL_STATS, (symbol,))
+                
+                alignment_counts = {}
+                short_term_stats = {}
+                medium_term_stats = {}
+                for alignment_code, short_code, medium_code, count in cursor.fetchall():
+                    alignment_type = enum_value(AlignmentType, alignment_code)
+                    short_decision = enum_value(Decision, short_code)
+                    medium_decision = enum_value(Decision, medium_code)
+                    alignment_counts[alignment_type] = alignment_counts.get(alignment_type, 0) + count
+                    short_term_stats[short_decision] = short_term_stats.get(short_decision, 0) + count
+                    medium_term_stats[medium_decision] = medium_term_stats.get(medium_decision, 0) + count
                 
+                # alignment_type分布（按数量降序，百分比基于总数）
+                total = sum(alignment_counts.values())
                 alignment_stats = {}
-                for row in cursor.fetchall():
-                    alignment_stats[row[0]] = {
-                        'count': row[1],
-                        'percentage': round(row[2], 2)
+                for alignment_type, count in sorted(alignment_counts.items(), key=lambda item: item[1], reverse=True):
+                    alignment_stats[alignment_type] = {
+                        'count': count,
+                        'percentage': round(count * 100.0 / total, 2)
                     }
                 
-                # 统计2: 短期决策分布
-                cursor.execute('''
-                    SELECT short_term_decision, COUNT(*) as count
-                    FROM l1_dual_advisory_results
-                    WHERE symbol = ?
-                    GROUP BY short_term_decision
-                ''', (symbol,))
-                
-                short_term_stats = {row[0]: row[1] for row in cursor.fetchall()}
-                
-                # 统计3: 中长期决策分布
-                cursor.execute('''
-                    SELECT medium_term_decision, COUNT(*) as count
-                    FROM l1_dual_advisory_results
-                    WHERE symbol = ?
-                    GROUP BY medium_term_decision
-                ''', (symbol,))
-                
-                medium_term_stats = {row[0]: row[1] for row in cursor.fetchall()}
-                
                 return {
                     'symbol': symbol,
                     'alignment_type_distribution': alignment_stats,
@@ -194,3 +311,124 @@ class DualAdvisoryRepository:
         except Exception as e:
             logger.error(f"Error getting dual decision stats: {e}")
             return {}
+    
+    def cleanup_old(self, days: int = 7) -> int:
+        """
+        清理N天前的旧双周期记录
+        
+        Args:
+            days: 保留天数
+        
+        Returns:
+            int: 删除的记录数
+        """
+        try:
+            cutoff_us = to_epoch_us(datetime.now() - timedelta(days=days))
+        
+            with self.connection.write() as conn:
+                deleted_count = conn.execute(_SQL_DELETE_DUAL_BEFORE, (cutoff_us,)).rowcount
+        
+            if deleted_count and self.query_cache is not None:
+                self.connection.after_commit(self.query_cache.clear)
+        
+            logger.info(f"Cleaned up {deleted_count} old dual advisory results (older than {days} days)")
+            return deleted_count
+        
+        except Exception as e:
+            logger.error(f"Error cleaning up dual advisory results: {e}")
+            raise
+
+
+def _timeframe_to_dict(row, prefix: str, timeframe: Timeframe) -> Dict:
+    """由列重建 TimeframeConclusion.to_dict() 结构"""
+    metrics = row[f'{prefix}_metrics']
+    return {
+        'timeframe': timeframe.value,
+        'timeframe_label': row[f'{prefix}_label'],
+        'decision': enum_value(Decision, row[f'{prefix}_decision']),
+        'confidence': enum_value(Confidence, row[f'{prefix}_confidence']),
+        'market_regime': enum_value(MarketRegime, row[f'{prefix}_regime']),
+        'trade_quality': enum_value(TradeQuality, row[f'{prefix}_quality']),
+        'execution_permission': enum_value(ExecutionPermission, row[f'{prefix}_permission']),
+        'executable': bool(row[f'{prefix}_executable']),
+        'reason_tags': load_reason_tag_values(row[f'{prefix}_tags_mask'], row[f'{prefix}_tags']),
+        'key_metrics': json_loads(metrics) if metrics else {}
+    }
+
+
+def _combined_reason_tags(lazy_row) -> List[str]:
+    """合并reason_tags（去重，顺序同 DualTimeframeResult._get_combined_reason_tags）"""
+    return list(dict.fromkeys(
+        lazy_row['short_term']['reason_tags']
+        + lazy_row['medium_term']['reason_tags']
+        + lazy_row['global_risk_tags']
+    ))
+
+
+def _alignment_to_dict(row) -> Dict:
+    """由列重建 AlignmentAnalysis.to_dict() 结构"""
+    return {
+        'is_aligned': bool(row['is_aligned']),
+        'alignment_type': enum_value(AlignmentType, row['alignment_type']),
+        'has_conflict': bool(row['has_conflict']),
+        'conflict_resolution': enum_value(ConflictResolution, row['conflict_resolution']),
+        'resolution_reason': row['resolution_reason'],
+        'recommended_action': enum_value(Decision, row['recommended_action']),
+        'recommended_confidence': enum_value(Confidence, row['recommended_confidence']),
+        'recommendation_notes': row['recommendation_notes']
+    }
+
+
+class LazyDualRow(Mapping):
+    """
+    双周期历史记录（只读映射，键与 DualTimeframeResult.to_dict() 相同）
+    
+    标量字段直接取列值；嵌套结构、reason_tags解码、key_metrics的JSON解析
+    在首次访问对应键时才执行并缓存。只读取少数字段的调用方不付出其余字段的构造成本；
+    需要普通dict（如JSON序列化）时用 dict(row)。
+    """
+    
+    __slots__ = ('_row', '_cache')
+    
+    # 键 → 构造函数（顺序同 DualTimeframeResult.to_dict()）
+    _BUILDERS = {
+        'short_term': lambda self: _timeframe_to_dict(self._row, 'short_term', Timeframe.SHORT_TERM),
+        'medium_term': lambda self: _timeframe_to_dict(self._row, 'medium_term', Timeframe.MEDIUM_TERM),
+        'alignment': lambda self: _alignment_to_dict(self._row),
+        'symbol': lambda self: self._row['symbol'],
+        'timestamp': lambda self: self._row['timestamp'],
+        'price': lambda self: self._row['price'],
+        'risk_exposure_allowed': lambda self: bool(self._row['risk_exposure_allowed']),
+        'global_risk_tags': lambda self: load_reason_tag_values(self._row['global_risk_mask'], self._row['global_risk_tags']),
+        'decision': lambda self: enum_value(Decision, self._row['recommended_action']),
+        'confidence': lambda self: enum_value(Confidence, self._row['recommended_confidence']),
+        'executable': lambda self: bool(self._row['combined_executable']),
+        'reason_tags': _combined_reason_tags,
+        'market_regime': lambda self: enum_value(MarketRegime, self._row['medium_term_regime']),
+    }
+    
+    def __init__(self, row):
+        """
+        Args:
+            row: sqlite3.Row（_SQL_SELECT_DUAL_HISTORY 的列）
+        """
+        self._row = row
+        self._cache = {}
+    
+    def __getitem__(self, key):
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        value = self._BUILDERS[key](self)
+        self._cache[key] = value
+        return value
+    
+    def __iter__(self):
+        return iter(self._BUILDERS)
+    
+    def __len__(self):
+        return len(self._BUILDERS)
+    
+    def __repr__(self):
+        return f"LazyDualRow(symbol={self._row['symbol']!r}, timestamp={self._row['timestamp']!r})"
@@ -2,7 +2,18 @@
 Database Migrations - 数据库迁移和表结构管理
 """
 
+import os
+import sqlite3
 import logging
+import threading
+from typing import Dict, Set
+from datetime import datetime
+from models.enums import (
+    ENUM_STORAGE_CODES, Decision, Confidence, MarketRegime, SystemState, TradeQuality,
+    ExecutionPermission, AlignmentType, ConflictResolution
+)
+from models.reason_tags import ReasonTag
+from .codecs import json_dumps, json_loads, encode_reason_tags, reason_tags_order, to_epoch_us
 
 logger = logging.getLogger(__name__)
 
@@ -10,18 +21,121 @@ logger = logging.getLogger(__name__)
 class DatabaseMigrations:
     """数据库迁移管理"""
     
-    def __init__(self, connection):
+    # 双周期表中取代 full_json 的列（列名, 类型）
+    DUAL_DETAIL_COLUMNS = [
+        ('short_term_label', 'TEXT'),
+        ('short_term_permission', 'TEXT'),
+        ('short_term_tags_mask', 'INTEGER'),
+        ('short_term_tags', 'TEXT'),
+        ('short_term_metrics', 'TEXT'),
+        ('medium_term_label', 'TEXT'),
+        ('medium_term_permission', 'TEXT'),
+        ('medium_term_tags_mask', 'INTEGER'),
+        ('medium_term_tags', 'TEXT'),
+        ('medium_term_metrics', 'TEXT'),
+        ('conflict_resolution', 'TEXT'),
+        ('resolution_reason', 'TEXT'),
+        ('recommendation_notes', 'TEXT'),
+        ('global_risk_mask', 'INTEGER'),
+        ('global_risk_tags', 'TEXT'),
+        ('combined_executable', 'INTEGER'),
+    ]
+    
+    # 枚举列 → 枚举类（TEXT → INTEGER编码迁移）
+    ADVISORY_ENUM_COLUMNS = {
+        'decision': Decision,
+        'confidence': Confidence,
+        'market_regime': MarketRegime,
+        'system_state': SystemState,
+        'trade_quality': TradeQuality,
+        'execution_permission': ExecutionPermission,
+        'signal_decision': Decision,
+    }
+    DUAL_ENUM_COLUMNS = {
+        'short_term_decision': Decision,
+        'short_term_confidence': Confidence,
+        'short_term_regime': MarketRegime,
+        'short_term_quality': TradeQuality,
+        'short_term_permission': ExecutionPermission,
+        'medium_term_decision': Decision,
+        'medium_term_confidence': Confidence,
+        'medium_term_regime': MarketRegime,
+        'medium_term_quality': TradeQuality,
+        'medium_term_permission': ExecutionPermission,
+        'alignment_type': AlignmentType,
+        'recommended_action': Decision,
+        'recommended_confidence': Confidence,
+        'conflict_resolution': ConflictResolution,
+    }
+    
+    # 按TEXT时间戳建立的旧索引（已由 ts_us 索引取代）
+    OBSOLETE_TIMESTAMP_INDEXES = [
+        'idx_l1_symbol_timestamp',
+        'idx_l1_stats',
+        'idx_l1_dual_symbol_timestamp',
+        'idx_l1_steps_symbol_timestamp',
+        'idx_l1_steps_timestamp',
+    ]
+    
+    # 不再需要的索引（只增加写放大），建索引前删除
+    DROPPED_INDEXES = [
+        'idx_l1_symbol_ts_us',      # = idx_l1_stats_ts_us 的前缀 (symbol, ts_us DESC)
+        'idx_l1_created_at',        # 无查询按 created_at 过滤；清理按 ts_us
+        'idx_l1_dual_created_at',
+        'idx_l1_decision',          # 低基数单列索引，无查询按其过滤，可能误导规划器
+        'idx_l1_dual_alignment_type',
+        'idx_l1_steps_advisory',    # = 管道步骤表主键 (advisory_id, step_number) 的前缀
+    ]
+    
+    # 本进程内已完成初始化的数据库：db_path → legacy_full_json
+    _initialized_paths: Dict[str, bool] = {}
+    _initialized_lock = threading.Lock()
+    
+    def __init__(self, connection, drop_legacy_full_json: bool = False):
         """
         初始化迁移管理器
         
         Args:
             connection: DatabaseConnection实例
+            drop_legacy_full_json: 是否删除双周期表中旧的 full_json 列（不可逆，默认保留）
         """
         self.connection = connection
+        self.drop_legacy_full_json = drop_legacy_full_json
+        
+        # init_all_tables 之后：双周期表是否仍有 full_json 列
+        self.legacy_full_json = False
+        
+        # 表名 → 列名集合（每张表只读取一次表结构）
+        self._columns: Dict[str, Set[str]] = {}
     
     def init_all_tables(self):
-        """初始化所有数据库表结构"""
-        with self.connection.connect() as conn:
+        """
+        初始化所有数据库表结构
+        
+        同一进程内每个数据库文件只执行一次（文件被删除后重新执行）；
+        内存数据库每个连接相互独立，不做缓存
+        """
+        db_path = self.connection.db_path
+        cacheable = db_path != ':memory:' and os.path.exists(db_path)
+        
+        with DatabaseMigrations._initialized_lock:
+            if cacheable and db_path in DatabaseMigrations._initialized_paths:
+                legacy_full_json = DatabaseMigrations._initialized_paths[db_path]
+                # 已初始化，除非本次要求删除仍存在的 full_json 列
+                if not (legacy_full_json and self.drop_legacy_full_json):
+                    self.legacy_full_json = legacy_full_json
+                    return
+            
+            self._init_all_tables()
+            
+            if db_path != ':memory:':
+                DatabaseMigrations._initialized_paths[db_path] = self.legacy_full_json
+    
+    def _init_all_tables(self):
+        """建表、迁移、建索引（单个写事务）"""
+        self._configure_database()
+        
+        with self.connection.write() as conn:
             cursor = conn.cursor()
             
             # 创建L1决策结果表
@@ -38,136 +152,261 @@ class DatabaseMigrations:
             self._migrate_add_signal_decision(cursor)
             self._migrate_add_price(cursor)
             self._migrate_add_price_dual(cursor)
+            self._migrate_add_reason_tags_mask(cursor)
+            self._migrate_add_dual_detail_columns(cursor)
+            self._migrate_drop_full_json(cursor)
+            self._migrate_timestamp_to_int(cursor)
+            self._migrate_pipeline_without_rowid(cursor)
+            self._migrate_enums_to_int(
+                cursor, 'l1_advisory_results', self._create_advisory_table, self.ADVISORY_ENUM_COLUMNS
+            )
+            self._migrate_enums_to_int(
+                cursor, 'l1_dual_advisory_results', self._create_dual_advisory_table, self.DUAL_ENUM_COLUMNS
+            )
+            
+            # 单周期冷表（与热表结构相同，按最终表结构创建；之后新增列的迁移须同时作用于两张表）
+            self._create_advisory_table(cursor, table='l1_advisory_results_cold', autoincrement=False)
             
             # 创建索引
             self._create_indexes(cursor)
             
-            conn.commit()
             logger.info("Database tables initialized")
     
-    def _create_advisory_table(self, cursor):
-        """创建L1决策结果表"""
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS l1_advisory_results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+    def _configure_database(self):
+        """
+        设置持久化在数据库文件中的PRAGMA（不能在事务中执行）
+        
+        - 新建数据库启用 auto_vacuum=INCREMENTAL：只能在创建第一张表之前、
+          且须在切换WAL之前设置；已有表的旧库保持原设置（需手动VACUUM才能切换）
+        - journal_mode=WAL：读写互不阻塞，提交只追加WAL文件
+        """
+        with self.connection.autocommit() as conn:
+            if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                logger.info("✅ Enabled incremental auto_vacuum for new database")
+            
+            journal_mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+            if journal_mode != 'wal' and self.connection.db_path != ':memory:':
+                logger.warning(f"WAL not available, using journal_mode={journal_mode}")
+    
+    def optimize(self):
+        """刷新查询规划统计（PRAGMA optimize 只分析统计已过时的表，开销小）"""
+        with self.connection.write() as conn:
+            conn.execute("PRAGMA optimize")
+    
+    def checkpoint(self):
+        """
+        WAL checkpoint(TRUNCATE)：把WAL写回主库并将WAL文件截断为0字节
+        
+        大量删除后WAL会膨胀，自动checkpoint只回写不截断；有读者占用时本次不完成，返回不报错
+        """
+        with self.connection.autocommit() as conn:
+            busy, wal_pages, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        if busy:
+            logger.info(f"WAL checkpoint incomplete ({checkpointed}/{wal_pages} pages), readers active")
+    
+    def maintenance(self, vacuum_pages: int = 1000):
+        """
+        定期维护（长期运行的部署由调度器定时调用）
+        
+        - incremental_vacuum: 回收清理旧记录后留下的空闲页（仅 INCREMENTAL 模式的库生效）
+        - optimize / ANALYZE: 刷新 sqlite_stat1，查询规划器持续选用复合索引
+        - checkpoint: 截断上述操作写入的WAL
+        
+        Args:
+            vacuum_pages: 单次最多回收的页数
+        """
+        with self.connection.write() as conn:
+            conn.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})").fetchall()
+            conn.execute("PRAGMA optimize")
+            conn.execute("ANALYZE")
+        self.checkpoint()
+        
+        logger.info(f"Database maintenance completed (incremental_vacuum={vacuum_pages})")
+    
+    def _table_columns(self, cursor, table: str) -> Set[str]:
+        """
+        读取表的列名集合（按表缓存；迁移中新增/删除列时需同步更新返回的集合）
+        """
+        if table not in self._columns:
+            cursor.execute("SELECT name FROM pragma_table_info(?)", (table,))
+            self._columns[table] = {row[0] for row in cursor.fetchall()}
+        return self._columns[table]
+    
+    def _create_advisory_table(self, cursor, table: str = 'l1_advisory_results', autoincrement: bool = True):
+        """
+        创建L1决策结果表（枚举列存INTEGER编码，见 models.enums.ENUM_STORAGE_CODES）
+        
+        热表保留 AUTOINCREMENT：归档会把热表清空，普通 INTEGER PRIMARY KEY 会从 max(id)+1
+        重新分配，与已移入冷表的 id（及管道步骤的 advisory_id）冲突。
+        冷表的 id 总是由归档显式写入，不需要自增计数（autoincrement=False）
+        """
+        id_column = 'id INTEGER PRIMARY KEY AUTOINCREMENT' if autoincrement else 'id INTEGER PRIMARY KEY'
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                {id_column},
                 symbol TEXT NOT NULL,
                 timestamp TEXT NOT NULL,
-                decision TEXT NOT NULL,
-                confidence TEXT NOT NULL,
-                market_regime TEXT NOT NULL,
-                system_state TEXT NOT NULL,
+                ts_us INTEGER,
+                decision INTEGER NOT NULL,
+                confidence INTEGER NOT NULL,
+                market_regime INTEGER NOT NULL,
+                system_state INTEGER NOT NULL,
                 risk_exposure_allowed INTEGER NOT NULL,
-                trade_quality TEXT NOT NULL,
+                trade_quality INTEGER NOT NULL,
                 reason_tags TEXT NOT NULL,
-                execution_permission TEXT DEFAULT 'allow',
+                reason_tags_mask INTEGER,
+                execution_permission INTEGER DEFAULT 0,
                 executable INTEGER DEFAULT 0,
-                signal_decision TEXT,
+                signal_decision INTEGER,
                 price REAL,
                 created_at TEXT DEFAULT (datetime('now'))
             )
         ''')
     
-    def _create_pipeline_table(self, cursor):
-        """创建管道步骤表"""
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS l1_pipeline_steps (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+    def _create_pipeline_table(self, cursor, table: str = 'l1_pipeline_steps'):
+        """
+        创建管道步骤表
+        
+        WITHOUT ROWID，主键 (advisory_id, step_number)：同一决策的步骤在B树中连续存放，
+        按 advisory_id 读取即主键范围扫描，无需单独的 advisory_id 索引和自增计数
+        """
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
                 advisory_id INTEGER NOT NULL,
-                symbol TEXT NOT NULL,
                 step_number INTEGER NOT NULL,
+                symbol TEXT NOT NULL,
                 step_name TEXT NOT NULL,
                 status TEXT NOT NULL,
                 message TEXT,
                 result TEXT,
                 timestamp TEXT NOT NULL,
+                ts_us INTEGER,
+                PRIMARY KEY (advisory_id, step_number),
                 FOREIGN KEY (advisory_id) REFERENCES l1_advisory_results(id)
-            )
+            ) WITHOUT ROWID
         ''')
     
-    def _create_dual_advisory_table(self, cursor):
-        """创建双周期独立结论表"""
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS l1_dual_advisory_results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+    def _create_dual_advisory_table(self, cursor, table: str = 'l1_dual_advisory_results'):
+        """
+        创建双周期独立结论表（枚举列存INTEGER编码，见 models.enums.ENUM_STORAGE_CODES）
+        
+        id 不加 AUTOINCREMENT（不被其他表引用，无需维护 sqlite_sequence，每次插入少写一页）
+        """
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
                 symbol TEXT NOT NULL,
                 timestamp TEXT NOT NULL,
+                ts_us INTEGER,
                 price REAL,
                 
                 -- 短期结论（5m/15m）
-                short_term_decision TEXT NOT NULL,
-                short_term_confidence TEXT NOT NULL,
+                short_term_decision INTEGER NOT NULL,
+                short_term_confidence INTEGER NOT NULL,
                 short_term_executable INTEGER NOT NULL,
-                short_term_regime TEXT NOT NULL,
-                short_term_quality TEXT NOT NULL,
+                short_term_regime INTEGER NOT NULL,
+                short_term_quality INTEGER NOT NULL,
+                short_term_label TEXT,
+                short_term_permission INTEGER,
+                short_term_tags_mask INTEGER,
+                short_term_tags TEXT,
+                short_term_metrics TEXT,
                 
                 -- 中长期结论（1h/6h）
-                medium_term_decision TEXT NOT NULL,
-                medium_term_confidence TEXT NOT NULL,
+                medium_term_decision INTEGER NOT NULL,
+                medium_term_confidence INTEGER NOT NULL,
                 medium_term_executable INTEGER NOT NULL,
-                medium_term_regime TEXT NOT NULL,
-                medium_term_quality TEXT NOT NULL,
+                medium_term_regime INTEGER NOT NULL,
+                medium_term_quality INTEGER NOT NULL,
+                medium_term_label TEXT,
+                medium_term_permission INTEGER,
+                medium_term_tags_mask INTEGER,
+                medium_term_tags TEXT,
+                medium_term_metrics TEXT,
                 
                 -- 一致性分析
-                alignment_type TEXT NOT NULL,
+                alignment_type INTEGER NOT NULL,
                 is_aligned INTEGER NOT NULL,
                 has_conflict INTEGER NOT NULL,
-                recommended_action TEXT NOT NULL,
-                recommended_confidence TEXT NOT NULL,
-                
-                -- 完整JSON
-                full_json TEXT NOT NULL,
+                recommended_action INTEGER NOT NULL,
+                recommended_confidence INTEGER NOT NULL,
+                conflict_resolution INTEGER,
+                resolution_reason TEXT,
+                recommendation_notes TEXT,
                 
                 -- 元数据
                 risk_exposure_allowed INTEGER NOT NULL,
+                global_risk_mask INTEGER,
+                global_risk_tags TEXT,
+                combined_executable INTEGER,
                 created_at TEXT DEFAULT (datetime('now'))
             )
         ''')
     
     def _create_indexes(self, cursor):
         """创建索引（优化查询性能）"""
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        existing_indexes = {row[0] for row in cursor.fetchall()}
+        
+        for index_name in self.DROPPED_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+        
         # L1 advisory索引
+        # 清理旧记录（ts_us < cutoff）按索引范围删除，代价与删除行数成正比
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_l1_symbol_timestamp 
-            ON l1_advisory_results(symbol, timestamp DESC)
+            CREATE INDEX IF NOT EXISTS idx_l1_ts_us 
+            ON l1_advisory_results(ts_us)
         ''')
+        # 复合覆盖索引：
+        # - get_stats 的 GROUP BY decision, confidence 只扫描索引页
+        # - get_history / get_latest / cleanup 按 (symbol, ts_us) 前缀范围查找
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_l1_created_at 
-            ON l1_advisory_results(created_at DESC)
+            CREATE INDEX IF NOT EXISTS idx_l1_stats_ts_us 
+            ON l1_advisory_results(symbol, ts_us DESC, decision, confidence)
         ''')
+        
+        # L1 advisory冷表索引（与热表相同的查询/清理路径）
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_l1_decision 
-            ON l1_advisory_results(decision)
+            CREATE INDEX IF NOT EXISTS idx_l1_cold_stats_ts_us 
+            ON l1_advisory_results_cold(symbol, ts_us DESC, decision, confidence)
         ''')
-        
-        # Pipeline索引
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_l1_steps_advisory 
-            ON l1_pipeline_steps(advisory_id)
+            CREATE INDEX IF NOT EXISTS idx_l1_cold_ts_us 
+            ON l1_advisory_results_cold(ts_us)
         ''')
+        
+        # Pipeline索引
+        # 清理按 ts_us 范围删除（无查询按 symbol + 时间读取步骤）
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_l1_steps_symbol_timestamp 
-            ON l1_pipeline_steps(symbol, timestamp DESC)
+            CREATE INDEX IF NOT EXISTS idx_l1_steps_ts_us 
+            ON l1_pipeline_steps(ts_us)
         ''')
         
         # Dual advisory索引
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_l1_dual_symbol_timestamp 
-            ON l1_dual_advisory_results(symbol, timestamp DESC)
+            CREATE INDEX IF NOT EXISTS idx_l1_dual_symbol_ts_us 
+            ON l1_dual_advisory_results(symbol, ts_us DESC)
         ''')
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_l1_dual_alignment_type 
-            ON l1_dual_advisory_results(alignment_type)
+            CREATE INDEX IF NOT EXISTS idx_l1_dual_ts_us 
+            ON l1_dual_advisory_results(ts_us)
         ''')
+        # 覆盖索引：双周期 get_stats 的分组统计只扫描索引页
         cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_l1_dual_created_at 
-            ON l1_dual_advisory_results(created_at DESC)
+            CREATE INDEX IF NOT EXISTS idx_l1_dual_stats 
+            ON l1_dual_advisory_results(symbol, alignment_type, short_term_decision, medium_term_decision)
         ''')
+        
+        # 索引有增删时重新收集统计信息（写入sqlite_stat1，供查询规划器选择覆盖索引）
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        if {row[0] for row in cursor.fetchall()} != existing_indexes:
+            cursor.execute('ANALYZE')
     
     def _migrate_add_execution_permission(self, cursor):
         """迁移：添加 execution_permission 字段"""
         try:
-            cursor.execute("PRAGMA table_info(l1_advisory_results)")
-            columns = [row[1] for row in cursor.fetchall()]
+            columns = self._table_columns(cursor, 'l1_advisory_results')
             
             if 'execution_permission' not in columns:
                 logger.info("Migrating: adding execution_permission column")
@@ -182,8 +421,7 @@ class DatabaseMigrations:
     def _migrate_add_signal_decision(self, cursor):
         """迁移：添加 signal_decision 字段"""
         try:
-            cursor.execute("PRAGMA table_info(l1_advisory_results)")
-            columns = [row[1] for row in cursor.fetchall()]
+            columns = self._table_columns(cursor, 'l1_advisory_results')
             
             if 'signal_decision' not in columns:
                 logger.info("Migrating: adding signal_decision column")
@@ -198,8 +436,7 @@ class DatabaseMigrations:
     def _migrate_add_price(self, cursor):
         """迁移：添加 price 字段"""
         try:
-            cursor.execute("PRAGMA table_info(l1_advisory_results)")
-            columns = [row[1] for row in cursor.fetchall()]
+            columns = self._table_columns(cursor, 'l1_advisory_results')
             
             if 'price' not in columns:
                 logger.info("Migrating: adding price column")
@@ -214,8 +451,7 @@ class DatabaseMigrations:
     def _migrate_add_price_dual(self, cursor):
         """迁移：为双周期表添加 price 字段"""
         try:
-            cursor.execute("PRAGMA table_info(l1_dual_advisory_results)")
-            columns = [row[1] for row in cursor.fetchall()]
+            columns = self._table_columns(cursor, 'l1_dual_advisory_results')
             
             if 'price' not in columns:
                 logger.info("Migrating dual: adding price column")
@@ -226,3 +462,306 @@ class DatabaseMigrations:
                 logger.info("✅ Dual migration completed: price added")
         except Exception as e:
             logger.error(f"Error during dual migration: {e}")
+    
+    def _migrate_add_reason_tags_mask(self, cursor):
+        """迁移：添加 reason_tags_mask 字段（reason_tags位掩码，取代JSON文本）"""
+        try:
+            columns = self._table_columns(cursor, 'l1_advisory_results')
+            
+            if 'reason_tags_mask' not in columns:
+                logger.info("Migrating: adding reason_tags_mask column")
+                cursor.execute('''
+                    ALTER TABLE l1_advisory_results 
+                    ADD COLUMN reason_tags_mask INTEGER
+                ''')
+                logger.info("✅ Migration completed: reason_tags_mask added")
+            
+            self._backfill_reason_tags_mask(cursor)
+        except Exception as e:
+            logger.error(f"Error during migration: {e}")
+    
+    def _backfill_reason_tags_mask(self, cursor):
+        """
+        将旧JSON文本 reason_tags 转为位掩码（仅处理尚未转换的行）
+        
+        顺序与按位序号解码相同的行清空JSON，读取时不再逐行解析；顺序不同的行保留JSON
+        （见 codecs.reason_tags_order）；含无法识别标签的行保持原样，读取时仍走JSON兼容路径
+        """
+        cursor.execute('''
+            SELECT id, reason_tags FROM l1_advisory_results
+            WHERE reason_tags_mask IS NULL AND reason_tags != ''
+        ''')
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        
+        updates = []
+        for row_id, reason_tags in rows:
+            try:
+                tags = [ReasonTag(tag) for tag in json_loads(reason_tags)]
+            except ValueError:
+                continue
+            mask = encode_reason_tags(tags)
+            updates.append((mask, reason_tags if reason_tags_order(tags, mask) else '', row_id))
+        
+        cursor.executemany('''
+            UPDATE l1_advisory_results SET reason_tags_mask = ?, reason_tags = ?
+            WHERE id = ?
+        ''', updates)
+        logger.info(f"✅ Migration completed: reason_tags_mask backfilled for {len(updates)}/{len(rows)} rows")
+    
+    def _migrate_add_dual_detail_columns(self, cursor):
+        """迁移：为双周期表添加取代 full_json 的类型化列，并从旧 full_json 回填"""
+        try:
+            columns = self._table_columns(cursor, 'l1_dual_advisory_results')
+            
+            for name, col_type in self.DUAL_DETAIL_COLUMNS:
+                if name not in columns:
+                    logger.info(f"Migrating dual: adding {name} column")
+                    cursor.execute(f'ALTER TABLE l1_dual_advisory_results ADD COLUMN {name} {col_type}')
+                    columns.add(name)
+            
+            self.legacy_full_json = 'full_json' in columns
+            if self.legacy_full_json:
+                self._backfill_dual_detail_columns(cursor)
+                self._backfill_dual_tags_order(cursor)
+        except Exception as e:
+            logger.error(f"Error during dual migration: {e}")
+    
+    def _backfill_dual_detail_columns(self, cursor):
+        """从旧 full_json 回填类型化列（仅处理尚未回填的行）"""
+        cursor.execute('''
+            SELECT id, full_json FROM l1_dual_advisory_results
+            WHERE short_term_tags_mask IS NULL AND full_json != ''
+        ''')
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        
+        logger.info(f"Migrating dual: backfilling {len(rows)} rows from full_json")
+        updates = []
+        for row_id, full_json in rows:
+            data = json_loads(full_json)
+            short = data['short_term']
+            medium = data['medium_term']
+            align = data['alignment']
+            updates.append((
+                short.get('timeframe_label'),
+                short.get('execution_permission', 'allow'),
+                encode_reason_tags(ReasonTag(tag) for tag in short.get('reason_tags', [])),
+                json_dumps(short['key_metrics']) if short.get('key_metrics') else None,
+                medium.get('timeframe_label'),
+                medium.get('execution_permission', 'allow'),
+                encode_reason_tags(ReasonTag(tag) for tag in medium.get('reason_tags', [])),
+                json_dumps(medium['key_metrics']) if medium.get('key_metrics') else None,
+                align.get('conflict_resolution'),
+                align.get('resolution_reason', ''),
+                align.get('recommendation_notes', ''),
+                encode_reason_tags(ReasonTag(tag) for tag in data.get('global_risk_tags', [])),
+                1 if data.get('executable') else 0,
+                row_id
+            ))
+        
+        cursor.executemany('''
+            UPDATE l1_dual_advisory_results SET
+                short_term_label = ?, short_term_permission = ?,
+                short_term_tags_mask = ?, short_term_metrics = ?,
+                medium_term_label = ?, medium_term_permission = ?,
+                medium_term_tags_mask = ?, medium_term_metrics = ?,
+                conflict_resolution = ?, resolution_reason = ?, recommendation_notes = ?,
+                global_risk_mask = ?, combined_executable = ?
+            WHERE id = ?
+        ''', updates)
+        logger.info("✅ Dual migration completed: detail columns backfilled")
+    
+    def _backfill_dual_tags_order(self, cursor):
+        """
+        从旧 full_json 回填各组reason_tags的原始顺序（位掩码只记录集合，见 codecs.reason_tags_order）
+        
+        单独回填：位掩码列可能已在此前的版本中回填，且枚举列已迁移为INTEGER编码
+        """
+        cursor.execute('''
+            SELECT id, full_json FROM l1_dual_advisory_results
+            WHERE short_term_tags IS NULL AND full_json != ''
+        ''')
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        
+        updates = []
+        for row_id, full_json in rows:
+            data = json_loads(full_json)
+            orders = []
+            for values in (
+                data['short_term'].get('reason_tags', []),
+                data['medium_term'].get('reason_tags', []),
+                data.get('global_risk_tags', [])
+            ):
+                tags = [ReasonTag(tag) for tag in values]
+                orders.append(reason_tags_order(tags, encode_reason_tags(tags)))
+            updates.append((*orders, row_id))
+        
+        cursor.executemany('''
+            UPDATE l1_dual_advisory_results SET
+                short_term_tags = ?, medium_term_tags = ?, global_risk_tags = ?
+            WHERE id = ?
+        ''', updates)
+        logger.info(f"✅ Dual migration completed: reason_tags order backfilled ({len(updates)} rows)")
+    
+    def _migrate_drop_full_json(self, cursor):
+        """迁移：删除双周期表中的 full_json 列（需 drop_legacy_full_json=True 且 SQLite >= 3.35）"""
+        if not (self.legacy_full_json and self.drop_legacy_full_json):
+            return
+        
+        if sqlite3.sqlite_version_info < (3, 35, 0):
+            logger.warning(f"SQLite {sqlite3.sqlite_version} does not support DROP COLUMN, keeping full_json")
+            return
+        
+        try:
+            logger.info("Migrating dual: dropping full_json column")
+            cursor.execute('ALTER TABLE l1_dual_advisory_results DROP COLUMN full_json')
+            self._table_columns(cursor, 'l1_dual_advisory_results').discard('full_json')
+            self.legacy_full_json = False
+            logger.info("✅ Dual migration completed: full_json dropped")
+        except Exception as e:
+            logger.error(f"Error during dual migration: {e}")
+    
+    def _migrate_timestamp_to_int(self, cursor):
+        """迁移：添加 ts_us 字段（INTEGER微秒时间戳），回填旧数据并删除TEXT时间戳索引"""
+        for table in ('l1_advisory_results', 'l1_dual_advisory_results', 'l1_pipeline_steps'):
+            try:
+                columns = self._table_columns(cursor, table)
+                
+                if 'ts_us' not in columns:
+                    logger.info(f"Migrating {table}: adding ts_us column")
+                    cursor.execute(f'ALTER TABLE {table} ADD COLUMN ts_us INTEGER')
+                    columns.add('ts_us')
+                
+                if 'id' not in columns:
+                    # 已重建为 WITHOUT ROWID 的管道步骤表（重建前已回填，之后写入均带 ts_us）
+                    continue
+                
+                # 回填（在Python中解析，与写入路径的本地时区解释一致）
+                cursor.execute(f'SELECT id, timestamp FROM {table} WHERE ts_us IS NULL')
+                rows = cursor.fetchall()
+                if rows:
+                    updates = []
+                    for row_id, timestamp in rows:
+                        try:
+                            updates.append((to_epoch_us(datetime.fromisoformat(timestamp)), row_id))
+                        except (TypeError, ValueError):
+                            logger.warning(f"{table} id={row_id}: unparsable timestamp {timestamp!r}")
+                    cursor.executemany(f'UPDATE {table} SET ts_us = ? WHERE id = ?', updates)
+                    logger.info(f"✅ Migration completed: {table}.ts_us backfilled ({len(updates)} rows)")
+            except Exception as e:
+                logger.error(f"Error during migration: {e}")
+        
+        for index_name in self.OBSOLETE_TIMESTAMP_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+    
+    def _migrate_pipeline_without_rowid(self, cursor):
+        """
+        迁移：管道步骤表重建为 WITHOUT ROWID（主键 advisory_id, step_number）
+        
+        旧表有自增 id 列；同一决策下重复的步骤号在新表中保留 id 最大（最后写入）的一条，
+        其余原样移入 l1_pipeline_steps_duplicates 并记录警告，不静默丢弃
+        """
+        table = 'l1_pipeline_steps'
+        if 'id' not in self._table_columns(cursor, table):
+            return
+        
+        new_table = f'{table}_new'
+        duplicates_table = f'{table}_duplicates'
+        columns = ('advisory_id, step_number, symbol, step_name, status, '
+                   'message, result, timestamp, ts_us')
+        latest_ids = f'SELECT MAX(id) FROM {table} GROUP BY advisory_id, step_number'
+        logger.info(f"Migrating {table}: rebuilding as WITHOUT ROWID")
+        cursor.execute('SAVEPOINT migrate_steps')
+        try:
+            cursor.execute(f'DROP TABLE IF EXISTS {new_table}')
+            self._create_pipeline_table(cursor, new_table)
+            cursor.execute(f'SELECT COUNT(*) FROM {table} WHERE id NOT IN ({latest_ids})')
+            duplicate_count = cursor.fetchone()[0]
+            if duplicate_count:
+                cursor.execute(
+                    f'CREATE TABLE {duplicates_table} AS '
+                    f'SELECT * FROM {table} WHERE id NOT IN ({latest_ids})'
+                )
+                logger.warning(
+                    f"{table}: {duplicate_count} rows with duplicate (advisory_id, step_number) "
+                    f"moved to {duplicates_table}"
+                )
+            cursor.execute(
+                f"INSERT INTO {new_table} ({columns}) "
+                f"SELECT {columns} FROM {table} WHERE id IN ({latest_ids})"
+            )
+            cursor.execute(f'DROP TABLE {table}')
+            cursor.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+            cursor.execute('RELEASE migrate_steps')
+            self._columns.pop(table, None)
+            logger.info(f"✅ Migration completed: {table} rebuilt as WITHOUT ROWID")
+        except Exception as e:
+            cursor.execute('ROLLBACK TO migrate_steps')
+            cursor.execute('RELEASE migrate_steps')
+            logger.error(f"Error during migration: {e}")
+    
+    def _migrate_enums_to_int(self, cursor, table: str, create_table, enum_columns: Dict[str, type]):
+        """
+        迁移：枚举列由TEXT改为INTEGER编码（重建表）
+        
+        SQLite无法修改列类型，按官方流程重建：建新表 → CASE映射复制数据 → 删旧表 → 改名。
+        无法识别的旧值（如已移除的枚举成员）原样保留，读取时按 .value 解析。
+        索引随旧表删除，由之后的 _create_indexes 重建。
+        
+        Args:
+            table: 表名
+            create_table: 建表方法（接受 table 参数）
+            enum_columns: 枚举列 → 枚举类
+        """
+        cursor.execute("SELECT name, type FROM pragma_table_info(?)", (table,))
+        column_types = dict(cursor.fetchall())
+        legacy_columns = [
+            name for name, enum_cls in enum_columns.items()
+            if column_types.get(name, '').upper() == 'TEXT'
+        ]
+        if not legacy_columns:
+            return
+        
+        new_table = f'{table}_new'
+        logger.info(f"Migrating {table}: enum columns TEXT -> INTEGER ({len(legacy_columns)} columns)")
+        cursor.execute('SAVEPOINT migrate_enums')
+        try:
+            cursor.execute(f'DROP TABLE IF EXISTS {new_table}')
+            create_table(cursor, new_table)
+            
+            # 旧表中新表结构没有的列（如保留的 full_json）原样带过去
+            cursor.execute("SELECT name FROM pragma_table_info(?)", (new_table,))
+            new_columns = {row[0] for row in cursor.fetchall()}
+            for name, col_type in column_types.items():
+                if name not in new_columns:
+                    cursor.execute(f'ALTER TABLE {new_table} ADD COLUMN {name} {col_type}')
+            
+            select_exprs = []
+            for name in column_types:
+                if name in legacy_columns:
+                    cases = ' '.join(
+                        f"WHEN '{member.value}' THEN {code}"
+                        for member, code in ENUM_STORAGE_CODES[enum_columns[name]].items()
+                    )
+                    select_exprs.append(f'CASE {name} {cases} ELSE {name} END')
+                else:
+                    select_exprs.append(name)
+            
+            cursor.execute(
+                f"INSERT INTO {new_table} ({', '.join(column_types)}) "
+                f"SELECT {', '.join(select_exprs)} FROM {table}"
+            )
+            cursor.execute(f'DROP TABLE {table}')
+            cursor.execute(f'ALTER TABLE {new_table} RENAME TO {table}')
+            cursor.execute('RELEASE migrate_enums')
+            self._columns.pop(table, None)
+            logger.info(f"✅ Migration completed: {table} enum columns converted")
+        except Exception as e:
+            cursor.execute('ROLLBACK TO migrate_enums')
+            cursor.execute('RELEASE migrate_enums')
+            logger.error(f"Error during migration: {e}")
@@ -2,13 +2,50 @@
 Pipeline Repository - 管道步骤数据访问
 """
 
+from functools import lru_cache
+from itertools import chain
 from typing import List
 from datetime import datetime, timedelta
+from .codecs import to_epoch_us
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# ========================================
+# SQL语句（模块级常量，与其他Repository一致）
+# ========================================
+
+_SQL_INSERT_STEPS_HEAD = '''
+    INSERT INTO l1_pipeline_steps 
+    (advisory_id, symbol, step_number, step_name, status, message, result, timestamp, ts_us)
+    VALUES '''
+
+# 单行占位符（9个参数）
+_STEP_ROW_VALUES = '(?, ?, ?, ?, ?, ?, ?, ?, ?)'
+
+# 每条多行INSERT的最大行数（9 × 100 = 900 个参数，低于SQLite默认上限999）
+STEPS_CHUNK_SIZE = 100
+
+_SQL_SELECT_STEPS = '''
+    SELECT step_number, step_name, status, message, result, timestamp
+    FROM l1_pipeline_steps
+    WHERE advisory_id = ?
+    ORDER BY step_number ASC
+'''
+
+_SQL_DELETE_STEPS_BEFORE = '''
+    DELETE FROM l1_pipeline_steps
+    WHERE ts_us < ?
+'''
+
+
+@lru_cache(maxsize=STEPS_CHUNK_SIZE)
+def _insert_steps_sql(row_count: int) -> str:
+    """N行的多行INSERT语句（同一行数返回同一字符串对象，连接的语句缓存命中）"""
+    return _SQL_INSERT_STEPS_HEAD + ', '.join([_STEP_ROW_VALUES] * row_count)
+
+
 class PipelineRepository:
     """管道步骤数据访问"""
     
@@ -28,33 +65,47 @@ class PipelineRepository:
         Args:
             advisory_id: 关联的advisory_result记录ID
             symbol: 交易对符号
-            steps: 管道步骤列表
+            steps: 管道步骤列表（同一决策内步骤号唯一，为表主键的一部分；
+                   未给出 'step' 的步骤按其在列表中的序号（从1开始）编号）
+        
+        Raises:
+            ValueError: 步骤号重复
+            sqlite3.Error: 写入失败（已回滚）
         """
+        now = datetime.now()
+        now_iso = now.isoformat()
+        now_us = to_epoch_us(now)
+        rows = [
+            (
+                advisory_id,
+                symbol,
+                step_info.get('step', ordinal),
+                step_info.get('name', ''),
+                step_info.get('status', ''),
+                step_info.get('message', ''),
+                str(step_info.get('result', '')),
+                now_iso,
+                now_us
+            )
+            for ordinal, step_info in enumerate(steps, 1)
+        ]
+        step_numbers = [row[2] for row in rows]
+        if len(set(step_numbers)) != len(step_numbers):
+            raise ValueError(f"Duplicate step numbers for advisory_id={advisory_id}: {step_numbers}")
+        
         try:
-            with self.connection.connect() as conn:
-                cursor = conn.cursor()
-                
-                for step_info in steps:
-                    cursor.execute('''
-                        INSERT INTO l1_pipeline_steps 
-                        (advisory_id, symbol, step_number, step_name, status, message, result, timestamp)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        advisory_id,
-                        symbol,
-                        step_info.get('step', 0),
-                        step_info.get('name', ''),
-                        step_info.get('status', ''),
-                        step_info.get('message', ''),
-                        str(step_info.get('result', '')),
-                        datetime.now().isoformat()
-                    ))
-                
-                conn.commit()
-                logger.info(f"Saved {len(steps)} pipeline steps for advisory_id={advisory_id}")
+            # 单个写事务（BEGIN IMMEDIATE … COMMIT）内，每块一条多行INSERT
+            with self.connection.write() as conn:
+                for start in range(0, len(rows), STEPS_CHUNK_SIZE):
+                    chunk = rows[start:start + STEPS_CHUNK_SIZE]
+                    conn.execute(_insert_steps_sql(len(chunk)), tuple(chain.from_iterable(chunk)))
+            
+            logger.info(f"Saved {len(steps)} pipeline steps for advisory_id={advisory_id}")
         
         except Exception as e:
+            # 重新抛出：并入外层事务（如 save_advisory_with_steps）时由外层整体回滚
             logger.error(f"Error saving pipeline steps: {e}")
+            raise
     
     def get(self, advisory_id: int) -> List[dict]:
         """
@@ -67,30 +118,20 @@ class PipelineRepository:
             步骤列表
         """
         try:
-            with self.connection.connect() as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute('''
-                    SELECT step_number, step_name, status, message, result, timestamp
-                    FROM l1_pipeline_steps
-                    WHERE advisory_id = ?
-                    ORDER BY step_number ASC
-                ''', (advisory_id,))
-                
-                rows = cursor.fetchall()
-                
-                steps = []
-                for row in rows:
-                    steps.append({
-                        'step': row[0],
-                        'name': row[1],
-                        'status': row[2],
-                        'message': row[3],
-                        'result': row[4],
-                        'timestamp': row[5]
-                    })
-                
-                return steps
+            with self.connection.read() as conn:
+                rows = conn.execute(_SQL_SELECT_STEPS, (advisory_id,)).fetchall()
+            
+            return [
+                {
+                    'step': step,
+                    'name': name,
+                    'status': status,
+                    'message': message,
+                    'result': result,
+                    'timestamp': timestamp
+                }
+                for step, name, status, message, result, timestamp in rows
+            ]
         
         except Exception as e:
             logger.error(f"Error getting pipeline steps: {e}")
@@ -107,22 +148,18 @@ class PipelineRepository:
             int: 删除的记录数
         """
         try:
-            cutoff_time = (datetime.now() - timedelta(days=days)).isoformat()
+            cutoff_time = to_epoch_us(datetime.now() - timedelta(days=days))
             
-            with self.connection.connect() as conn:
+            with self.connection.write() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    DELETE FROM l1_pipeline_steps
-                    WHERE timestamp < ?
-                ''', (cutoff_time,))
+                cursor.execute(_SQL_DELETE_STEPS_BEFORE, (cutoff_time,))
                 
                 deleted_count = cursor.rowcount
-                conn.commit()
                 
                 logger.info(f"Cleaned up {deleted_count} old pipeline steps (older than {days} days)")
                 return deleted_count
         
         except Exception as e:
             logger.error(f"Error cleaning up pipeline steps: {e}")
-            return 0
+            raise
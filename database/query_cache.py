@@ -0,0 +1,151 @@
+"""
+Query Cache - 查询结果缓存
+
+按 symbol 分组的内存TTL缓存：
+- 读方法用 @cached 装饰，命中时不访问数据库
+- 写入某个 symbol 后调用 invalidate(symbol) 使该 symbol 的全部结果失效
+- 每个 symbol 有失效代数：查询开始前记录，结果只在代数未变时写入缓存，
+  避免写入前开始的查询在失效之后把旧结果放回缓存
+"""
+
+import functools
+import inspect
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """缓存条目"""
+    value: Any
+    timestamp: float   # 写入时间（time.monotonic）
+    ttl: float         # 有效期（秒）
+
+    def is_expired(self, now: float) -> bool:
+        """是否已过期"""
+        return now - self.timestamp >= self.ttl
+
+
+class QueryCache:
+    """查询结果缓存（线程安全）"""
+
+    def __init__(self, default_ttl: float = 30):
+        """
+        初始化缓存
+
+        Args:
+            default_ttl: 默认有效期（秒）
+        """
+        self.default_ttl = default_ttl
+        self._lock = threading.RLock()
+        # symbol → {查询键 → CacheEntry}
+        self._entries: Dict[str, Dict[Tuple, CacheEntry]] = {}
+        # symbol → 失效次数；clear() 使全部 symbol 失效（单独计数）
+        self._generations: Dict[str, int] = {}
+        self._clear_count = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol: str, key: Tuple) -> Tuple[bool, Any]:
+        """
+        读取缓存
+
+        Returns:
+            (是否命中, 缓存值)
+        """
+        with self._lock:
+            entry = self._entries.get(symbol, {}).get(key)
+            if entry is None or entry.is_expired(time.monotonic()):
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, entry.value
+
+    def generation(self, symbol: str) -> Tuple[int, int]:
+        """symbol 当前的失效代数（invalidate/clear 后改变）"""
+        with self._lock:
+            return self._clear_count, self._generations.get(symbol, 0)
+
+    def set(self, symbol: str, key: Tuple, value: Any, ttl: Optional[float] = None,
+            generation: Optional[Tuple[int, int]] = None):
+        """
+        写入缓存
+
+        Args:
+            generation: 查询开始前取得的 generation(symbol)；其后已失效则不写入
+        """
+        with self._lock:
+            if generation is not None and generation != (self._clear_count, self._generations.get(symbol, 0)):
+                return
+            self._entries.setdefault(symbol, {})[key] = CacheEntry(
+                value=value,
+                timestamp=time.monotonic(),
+                ttl=self.default_ttl if ttl is None else ttl
+            )
+
+    def invalidate(self, symbol: str):
+        """使某个 symbol 的全部缓存失效"""
+        with self._lock:
+            self._entries.pop(symbol, None)
+            self._generations[symbol] = self._generations.get(symbol, 0) + 1
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._clear_count += 1
+
+    def get_stats(self) -> dict:
+        """缓存统计"""
+        with self._lock:
+            return {
+                'symbols': len(self._entries),
+                'entries': sum(len(entries) for entries in self._entries.values()),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+def cached(ttl: Optional[float] = None):
+    """
+    Repository读方法的结果缓存装饰器
+
+    被装饰方法的第一个参数须为 symbol；Repository 的 query_cache 为 None 时不缓存。
+    空结果（含出错时返回的 [] / {}）不缓存。
+    结果须为 list/dict：缓存与每次返回的都是浅拷贝，调用方增删元素不影响缓存；
+    元素（每行的dict等）在各调用方之间共享，调用方不应修改
+
+    Args:
+        ttl: 有效期（秒），默认使用 QueryCache.default_ttl
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, symbol, *args, **kwargs):
+            cache = self.query_cache
+            if cache is None:
+                return method(self, symbol, *args, **kwargs)
+
+            # 位置参数/关键字参数/默认值归一化为同一个键
+            bound = signature.bind(self, symbol, *args, **kwargs)
+            bound.apply_defaults()
+            key = (type(self).__name__, method.__name__) + tuple(bound.arguments.values())[2:]
+
+            hit, value = cache.get(symbol, key)
+            if hit:
+                return value.copy()
+
+            generation = cache.generation(symbol)
+            value = method(self, symbol, *args, **kwargs)
+            if value:
+                cache.set(symbol, key, value.copy(), ttl, generation)
+            return value
+
+        return wrapper
+    return decorator
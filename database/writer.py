@@ -0,0 +1,207 @@
+"""
+Writer Loop - 后台单写线程
+
+SQLite同一时刻只允许一个写者。多线程并发保存时，与其争抢写锁，
+不如把写请求放入有界队列，由单一后台线程攒批后在一个事务内写入：
+- 队列满时 submit 阻塞（背压）
+- 攒够 flush_size 条或距首条超过 flush_interval 秒即落盘
+- 同类请求合并为一次 save_batch
+- submit 返回 Future，落盘（或失败）后完成，调用方可按需等待
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 停止信号
+_STOP = object()
+
+
+class WriterLoop(threading.Thread):
+    """后台写线程"""
+
+    def __init__(
+        self,
+        connection,
+        repositories: Dict[str, object],
+        max_queue: int = 10000,
+        max_batch: int = 200,
+        flush_size: int = 64,
+        flush_interval: float = 0.05
+    ):
+        """
+        初始化写线程
+
+        Args:
+            connection: DatabaseConnection实例
+            repositories: 请求类型 → Repository（需提供 save_batch(List[(symbol, result)])）
+            max_queue: 队列容量
+            max_batch: 单个事务最多写入的条数
+            flush_size: 攒够该条数立即落盘
+            flush_interval: 首条入队后最长等待时间（秒）
+        """
+        super().__init__(name='l1-db-writer', daemon=True)
+        self.connection = connection
+        self.repositories = repositories
+        self.max_batch = max_batch
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopped = threading.Event()
+
+        # 统计
+        self.batches_written = 0
+        self.items_written = 0
+
+    def submit(self, kind: str, symbol: str, result) -> Future:
+        """
+        提交一条写请求（队列满时阻塞）
+
+        Args:
+            kind: 请求类型（repositories 的键）
+            symbol: 交易对符号
+            result: 决策结果
+
+        Returns:
+            Future: 所在批次提交后完成（结果为None）；写入失败时携带异常
+        """
+        if kind not in self.repositories:
+            raise ValueError(f"Unknown write kind: {kind}")
+        if self._stopped.is_set():
+            raise RuntimeError("WriterLoop is stopped")
+        future = Future()
+        self._queue.put((kind, symbol, result, future))
+        return future
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        等待已提交的请求全部落盘
+
+        Returns:
+            bool: 是否在超时前完成
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """停止写线程（先写完队列中剩余的请求）"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._queue.put(_STOP)
+        self.join(timeout)
+        logger.info(
+            f"WriterLoop stopped: {self.items_written} items in {self.batches_written} batches"
+        )
+
+    def run(self):
+        """主循环：取首条 → 攒批 → 落盘"""
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            stop = self._collect(batch)
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+            if stop:
+                self._queue.task_done()
+                break
+
+        # 停止后写完残留请求（stop() 之后仍可能有并发 submit 已入队）
+        remaining = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining.append(item)
+            else:
+                self._queue.task_done()
+        if remaining:
+            self._write(remaining)
+            for _ in remaining:
+                self._queue.task_done()
+
+    def _collect(self, batch: List[tuple]) -> bool:
+        """
+        在时间窗口内继续攒批
+
+        Returns:
+            bool: 是否收到停止信号
+        """
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return True
+            batch.append(item)
+
+        # 已到落盘条件：把队列中已就绪的请求一并带走（不再等待）
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return True
+            batch.append(item)
+        return False
+
+    def _write(self, batch: List[tuple]):
+        """按类型分组，在一个事务内写入，提交后完成各请求的Future（写入失败的类型不提交任何行）"""
+        grouped: Dict[str, List[tuple]] = {}
+        futures: Dict[str, List[Future]] = {}
+        for kind, symbol, result, future in batch:
+            grouped.setdefault(kind, []).append((symbol, result))
+            futures.setdefault(kind, []).append(future)
+
+        failed: Dict[str, Exception] = {}
+        try:
+            with self.connection.transaction() as conn:
+                for kind, items in grouped.items():
+                    # 每类写入包在一个SAVEPOINT中：save_batch 抛出时撤销该类已写入的块，
+                    # 该类请求携带异常，不中断同一事务中其他类型的写入
+                    conn.execute('SAVEPOINT writer_batch')
+                    try:
+                        self.repositories[kind].save_batch(items)
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO writer_batch')
+                        failed[kind] = e
+                    conn.execute('RELEASE writer_batch')
+            self.batches_written += 1
+            self.items_written += len(batch) - sum(len(grouped[kind]) for kind in failed)
+        except Exception as e:
+            logger.error(f"WriterLoop failed to write batch of {len(batch)}: {e}", exc_info=True)
+            failed = dict.fromkeys(grouped, e)
+
+        for kind, kind_futures in futures.items():
+            error = failed.get(kind)
+            for future in kind_futures:
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
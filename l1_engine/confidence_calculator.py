@@ -6,17 +6,116 @@ L1 Advisory Engine - 置信度计算模块
 2. 执行许可计算
 """
 
-from typing import List, Dict
+from functools import lru_cache
+from typing import List, Dict, FrozenSet, Iterable, Union
 from models.enums import Decision, Confidence, TradeQuality, MarketRegime, ExecutionPermission
-from models.reason_tags import ReasonTag, REASON_TAG_EXECUTABILITY, ExecutabilityLevel
+from models.reason_tags import ReasonTag, REASON_TAG_EXECUTABILITY, REASON_TAG_BITS, ExecutabilityLevel
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 置信度档位（由低到高）及其序号，用于档位比较与提升
+_CONF_ORDER = (Confidence.LOW, Confidence.MEDIUM, Confidence.HIGH, Confidence.ULTRA)
+_CONF_RANK = {confidence: rank for rank, confidence in enumerate(_CONF_ORDER)}
+
+# 配置中的置信度字符串（不区分大小写）→ Confidence
+_STR_TO_CONF = {confidence.name: confidence for confidence in _CONF_ORDER}
+
+# 不参与评分的决策 → 固定置信度
+_DECISION_FAST_PATH = {Decision.NO_TRADE: Confidence.LOW}
+
+# ReasonTag → 位值（位序号见 models.reason_tags.REASON_TAG_BITS，与数据库存储的位掩码一致）
+_TAG_MASK = {tag: 1 << bit for tag, bit in REASON_TAG_BITS.items()}
+_TAG_BY_BIT = {bit: tag for tag, bit in REASON_TAG_BITS.items()}
+
+
+def _mask_of(tags: Iterable[ReasonTag]) -> int:
+    """标签 → 位掩码"""
+    mask = 0
+    for tag in tags:
+        mask |= _TAG_MASK[tag]
+    return mask
+
+
+def _lowest_tag(mask: int) -> ReasonTag:
+    """位掩码中位序号最小的标签（用于日志）"""
+    return _TAG_BY_BIT[(mask & -mask).bit_length() - 1]
+
+
+# 执行许可判定用掩码：按等级分组一次，热路径只做按位与
+_MIN_INTERVAL_MASK = _TAG_MASK[ReasonTag.MIN_INTERVAL_BLOCK]
+_FLIP_COOLDOWN_MASK = _TAG_MASK[ReasonTag.FLIP_COOLDOWN_BLOCK]
+_EXTREME_VOLUME_MASK = _TAG_MASK[ReasonTag.EXTREME_VOLUME]
+_LIQUIDATION_MASK = _TAG_MASK[ReasonTag.LIQUIDATION_PHASE]
+_EXTREME_REGIME_MASK = _TAG_MASK[ReasonTag.EXTREME_REGIME]
+_BLOCK_MASK = _mask_of(
+    tag for tag, level in REASON_TAG_EXECUTABILITY.items()
+    if level is ExecutabilityLevel.BLOCK
+)
+_DEGRADE_MASK = _mask_of(
+    tag for tag, level in REASON_TAG_EXECUTABILITY.items()
+    if level is ExecutabilityLevel.DEGRADE
+)
+
+# 执行许可缓存容量：实际出现的标签组合数量有限，连续周期的标签组合往往不变
+_PERM_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=_PERM_CACHE_SIZE)
+def _execution_permission(mask: int) -> ExecutionPermission:
+    """
+    标签位掩码 → 执行许可（只依赖标签，与配置无关，可按掩码缓存）
+    
+    注意：命中缓存时不会重复输出debug日志
+    """
+    # 优先级0: 频控标签（最高优先级）
+    if mask & _MIN_INTERVAL_MASK:
+        logger.debug("[ExecPerm] DENY: MIN_INTERVAL_BLOCK (频控)")
+        return ExecutionPermission.DENY
+    
+    if mask & _FLIP_COOLDOWN_MASK:
+        logger.debug("[ExecPerm] DENY: FLIP_COOLDOWN_BLOCK (频控)")
+        return ExecutionPermission.DENY
+    
+    # 优先级0.5: EXTREME_VOLUME联立否决检查
+    if mask & _EXTREME_VOLUME_MASK and mask & (_LIQUIDATION_MASK | _EXTREME_REGIME_MASK):
+        logger.debug(
+            "[ExecPerm] DENY: EXTREME_VOLUME + %s (联立否决)",
+            'LIQUIDATION_PHASE' if mask & _LIQUIDATION_MASK else 'EXTREME_REGIME'
+        )
+        return ExecutionPermission.DENY
+    
+    # 优先级1: BLOCK级别标签
+    blocking = mask & _BLOCK_MASK
+    if blocking:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[ExecPerm] DENY: found blocking tag %s", _lowest_tag(blocking).value)
+        return ExecutionPermission.DENY
+    
+    # 优先级2: DEGRADE级别标签
+    degrading = mask & _DEGRADE_MASK
+    if degrading:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[ExecPerm] ALLOW_REDUCED: found degrading tag %s", _lowest_tag(degrading).value)
+        return ExecutionPermission.ALLOW_REDUCED
+    
+    # 优先级3: 全是ALLOW级别
+    logger.debug("[ExecPerm] ALLOW: no blocking or degrading tags")
+    return ExecutionPermission.ALLOW
+
 
 class ConfidenceCalculator:
     """置信度计算器"""
     
+    # 属性固定（均在 __init__/_bind_config 中赋值）：属性访问更快，实例更小
+    __slots__ = (
+        'config',
+        '_decision_scores', '_regime_scores', '_quality_scores', '_strong_bonus',
+        '_ultra_thr', '_high_thr', '_medium_thr',
+        '_uncertain_cap_conf', '_tag_to_cap',
+        '_boosted', '_strong_signal_tags',
+    )
+    
     def __init__(self, config: Dict):
         """
         初始化置信度计算器
@@ -25,6 +124,76 @@ class ConfidenceCalculator:
             config: 完整配置字典
         """
         self.config = config
+        self._bind_config()
+    
+    def _bind_config(self):
+        """
+        解析配置并缓存为实例属性
+        
+        配置在运行期不变，构造时解析一次，热路径不再逐层 dict.get
+        """
+        scoring_config = self.config.get('confidence_scoring', {})
+        
+        # 基础加分
+        decision_score = scoring_config.get('decision_score', 30)
+        self._decision_scores = {
+            Decision.LONG: decision_score,
+            Decision.SHORT: decision_score,
+        }
+        self._regime_scores = {
+            MarketRegime.TREND: scoring_config.get('regime_trend_score', 30),
+            MarketRegime.RANGE: scoring_config.get('regime_range_score', 10),
+            MarketRegime.EXTREME: scoring_config.get('regime_extreme_score', 0),
+        }
+        self._quality_scores = {
+            TradeQuality.GOOD: scoring_config.get('quality_good_score', 30),
+            TradeQuality.UNCERTAIN: scoring_config.get('quality_uncertain_score', 15),
+            TradeQuality.POOR: scoring_config.get('quality_poor_score', 0),
+        }
+        self._strong_bonus = scoring_config.get('strong_signal_bonus', 10)
+        
+        # 档位阈值
+        thresholds = scoring_config.get('thresholds', {})
+        self._ultra_thr = thresholds.get('ultra', 90)
+        self._high_thr = thresholds.get('high', 65)
+        self._medium_thr = thresholds.get('medium', 40)
+        
+        # 硬降级上限（cap字符串解析为Confidence）
+        caps_config = scoring_config.get('caps', {})
+        uncertain_max_str = caps_config.get('uncertain_quality_max', 'MEDIUM')
+        self._uncertain_cap_conf = self._string_to_confidence(uncertain_max_str)
+        reduce_default_max_str = caps_config.get('reduce_default_max', uncertain_max_str)
+        tag_caps = caps_config.get('tag_caps', {})
+        reduce_tags = self.config.get('reason_tag_rules', {}).get('reduce_tags', [])
+        
+        # ReasonTag → cap（tag_caps显式配置优先，否则取reduce_default_max）
+        self._tag_to_cap = {}
+        for tag_value in dict.fromkeys([*reduce_tags, *tag_caps]):
+            try:
+                tag = ReasonTag(tag_value)
+            except ValueError:
+                logger.warning(f"Invalid reduce tag in config: {tag_value}, skipping")
+                continue
+            self._tag_to_cap[tag] = self._string_to_confidence(
+                tag_caps.get(tag_value, reduce_default_max_str)
+            )
+        
+        # 强信号突破
+        boost_config = scoring_config.get('strong_signal_boost', {})
+        boost_levels = boost_config.get('boost_levels', 1) if boost_config.get('enabled', True) else 0
+        # 档位 → 突破后档位（未启用时原样返回）
+        self._boosted = {
+            confidence: self._boost_confidence(confidence, boost_levels)
+            for confidence in _CONF_ORDER
+        }
+        
+        strong_signals = []
+        for tag_value in boost_config.get('required_tags', ['strong_buy_pressure', 'strong_sell_pressure']):
+            try:
+                strong_signals.append(ReasonTag(tag_value))
+            except ValueError:
+                logger.warning(f"Invalid required_tag in config: {tag_value}, skipping")
+        self._strong_signal_tags = frozenset(strong_signals)
     
     def compute_confidence(
         self, 
@@ -50,71 +219,88 @@ class ConfidenceCalculator:
         Returns:
             Confidence: 置信度
         """
+        return self._confidence_for(decision, regime, quality, frozenset(reason_tags))
+    
+    def compute_confidence_batch(
+        self,
+        decisions: Iterable[Decision],
+        regimes: Iterable[MarketRegime],
+        qualities: Iterable[TradeQuality],
+        reason_tags_list: Iterable[List[ReasonTag]]
+    ) -> List[Confidence]:
+        """
+        批量计算置信度（回测回放）
+        
+        逐条结果与 compute_confidence 相同。回放时（决策, 环境, 质量, 标签集合）
+        组合大量重复，每种组合只计算一次
+        
+        Args:
+            decisions: 决策序列
+            regimes: 市场环境序列
+            qualities: 交易质量序列
+            reason_tags_list: 原因标签列表序列
+        
+        Returns:
+            List[Confidence]: 与输入一一对应的置信度
+        """
+        cache = {}
+        results = []
+        for key in zip(decisions, regimes, qualities, map(frozenset, reason_tags_list)):
+            confidence = cache.get(key)
+            if confidence is None:
+                confidence = cache[key] = self._confidence_for(*key)
+            results.append(confidence)
+        return results
+    
+    def _confidence_for(
+        self,
+        decision: Decision,
+        regime: MarketRegime,
+        quality: TradeQuality,
+        tag_set: FrozenSet[ReasonTag]
+    ) -> Confidence:
+        """置信度计算（标签已转为集合）"""
         # NO_TRADE强制LOW
-        if decision == Decision.NO_TRADE:
-            return Confidence.LOW
+        fast = _DECISION_FAST_PATH.get(decision)
+        if fast is not None:
+            return fast
         
         # ===== 第1步：基础加分 =====
-        score = 0
-        scoring_config = self.config.get('confidence_scoring', {})
-        
         # 决策类型分
-        if decision in [Decision.LONG, Decision.SHORT]:
-            score += scoring_config.get('decision_score', 30)
+        score = self._decision_scores.get(decision, 0)
         
         # 市场环境分
-        if regime == MarketRegime.TREND:
-            score += scoring_config.get('regime_trend_score', 30)
-        elif regime == MarketRegime.RANGE:
-            score += scoring_config.get('regime_range_score', 10)
-        elif regime == MarketRegime.EXTREME:
-            score += scoring_config.get('regime_extreme_score', 0)
+        score += self._regime_scores.get(regime, 0)
         
         # 质量分
-        if quality == TradeQuality.GOOD:
-            score += scoring_config.get('quality_good_score', 30)
-        elif quality == TradeQuality.UNCERTAIN:
-            score += scoring_config.get('quality_uncertain_score', 15)
-        elif quality == TradeQuality.POOR:
-            score += scoring_config.get('quality_poor_score', 0)
+        score += self._quality_scores.get(quality, 0)
         
         # 强信号加分
-        boost_config = scoring_config.get('strong_signal_boost', {})
-        required_tag_values = boost_config.get('required_tags', ['strong_buy_pressure', 'strong_sell_pressure'])
-        
-        strong_signals = []
-        for tag_value in required_tag_values:
-            try:
-                strong_signals.append(ReasonTag(tag_value))
-            except ValueError:
-                logger.warning(f"Invalid required_tag in config: {tag_value}, skipping")
-        
-        has_strong_signal = any(tag in reason_tags for tag in strong_signals)
+        has_strong_signal = not tag_set.isdisjoint(self._strong_signal_tags)
         if has_strong_signal:
-            score += scoring_config.get('strong_signal_bonus', 10)
+            score += self._strong_bonus
         
         # 映射到初始档位
-        initial_confidence = self._score_to_confidence(score, scoring_config)
+        initial_confidence = self._score_to_confidence(score)
         
         # ===== 第2步：硬降级上限（caps）=====
         capped_confidence, has_cap = self._apply_confidence_caps(
             confidence=initial_confidence,
             quality=quality,
-            reason_tags=reason_tags
+            tag_set=tag_set
         )
         
         # ===== 第3步：强信号突破（+1档，不突破cap）=====
         cap_limit = capped_confidence if has_cap else Confidence.ULTRA
         final_confidence = self._apply_strong_signal_boost(
             confidence=capped_confidence,
-            reason_tags=reason_tags,
             cap_limit=cap_limit,
             has_strong_signal=has_strong_signal
         )
         
         return final_confidence
     
-    def compute_execution_permission(self, reason_tags: List[ReasonTag]) -> ExecutionPermission:
+    def compute_execution_permission(self, reason_tags: Union[List[ReasonTag], int]) -> ExecutionPermission:
         """
         计算执行许可级别
         
@@ -125,65 +311,23 @@ class ConfidenceCalculator:
         4. 仅ALLOW级别标签 → ALLOW
         
         Args:
-            reason_tags: 原因标签列表
+            reason_tags: 原因标签列表，或其位掩码（与数据库存储的 reason_tags 相同）
         
         Returns:
             ExecutionPermission: 执行许可级别
         """
-        # 优先级0: 频控标签（最高优先级）
-        if ReasonTag.MIN_INTERVAL_BLOCK in reason_tags:
-            logger.debug(f"[ExecPerm] DENY: MIN_INTERVAL_BLOCK (频控)")
-            return ExecutionPermission.DENY
-        
-        if ReasonTag.FLIP_COOLDOWN_BLOCK in reason_tags:
-            logger.debug(f"[ExecPerm] DENY: FLIP_COOLDOWN_BLOCK (频控)")
-            return ExecutionPermission.DENY
-        
-        # 优先级0.5: EXTREME_VOLUME联立否决检查
-        if ReasonTag.EXTREME_VOLUME in reason_tags:
-            has_liquidation = ReasonTag.LIQUIDATION_PHASE in reason_tags
-            has_extreme_regime = ReasonTag.EXTREME_REGIME in reason_tags
-            
-            if has_liquidation or has_extreme_regime:
-                logger.debug(
-                    f"[ExecPerm] DENY: EXTREME_VOLUME + "
-                    f"{'LIQUIDATION_PHASE' if has_liquidation else 'EXTREME_REGIME'} "
-                    f"(联立否决)"
-                )
-                return ExecutionPermission.DENY
-        
-        # 优先级1: 检查BLOCK级别标签
-        for tag in reason_tags:
-            exec_level = REASON_TAG_EXECUTABILITY.get(tag, ExecutabilityLevel.ALLOW)
-            
-            if exec_level == ExecutabilityLevel.BLOCK:
-                logger.debug(f"[ExecPerm] DENY: found blocking tag {tag.value}")
-                return ExecutionPermission.DENY
-        
-        # 优先级2: 检查DEGRADE级别标签
-        for tag in reason_tags:
-            exec_level = REASON_TAG_EXECUTABILITY.get(tag, ExecutabilityLevel.ALLOW)
-            
-            if exec_level == ExecutabilityLevel.DEGRADE:
-                logger.debug(f"[ExecPerm] ALLOW_REDUCED: found degrading tag {tag.value}")
-                return ExecutionPermission.ALLOW_REDUCED
-        
-        # 优先级3: 全是ALLOW级别
-        logger.debug(f"[ExecPerm] ALLOW: no blocking or degrading tags")
-        return ExecutionPermission.ALLOW
+        # 位掩码作为缓存键：重复标签与顺序不影响结果
+        if not isinstance(reason_tags, int):
+            reason_tags = _mask_of(reason_tags)
+        return _execution_permission(reason_tags)
     
-    def _score_to_confidence(self, score: int, scoring_config: dict) -> Confidence:
+    def _score_to_confidence(self, score: int) -> Confidence:
         """将分数映射到置信度档位"""
-        thresholds = scoring_config.get('thresholds', {})
-        ultra_threshold = thresholds.get('ultra', 90)
-        high_threshold = thresholds.get('high', 65)
-        medium_threshold = thresholds.get('medium', 40)
-        
-        if score >= ultra_threshold:
+        if score >= self._ultra_thr:
             return Confidence.ULTRA
-        elif score >= high_threshold:
+        elif score >= self._high_thr:
             return Confidence.HIGH
-        elif score >= medium_threshold:
+        elif score >= self._medium_thr:
             return Confidence.MEDIUM
         else:
             return Confidence.LOW
@@ -192,102 +336,59 @@ class ConfidenceCalculator:
         self,
         confidence: Confidence,
         quality: TradeQuality,
-        reason_tags: List[ReasonTag]
+        tag_set: FrozenSet[ReasonTag]
     ) -> tuple:
-        """应用硬降级上限"""
-        scoring_config = self.config.get('confidence_scoring', {})
-        caps_config = scoring_config.get('caps', {})
-        tag_rules = self.config.get('reason_tag_rules', {})
+        """
+        应用硬降级上限
+        
+        当前置信度与所有适用的上限（UNCERTAIN质量 + reduce_tags）一起取最低档，
+        同档时min保留排在前面的当前置信度，即仅在上限更低时才算被压低
         
-        has_cap = False
+        Returns:
+            tuple: (置信度, 是否被上限压低)
+        """
+        levels = [confidence]
+        levels.extend(self._tag_to_cap[tag] for tag in tag_set if tag in self._tag_to_cap)
+        if quality is TradeQuality.UNCERTAIN:
+            levels.append(self._uncertain_cap_conf)
         
-        # 1. UNCERTAIN质量上限
-        if quality == TradeQuality.UNCERTAIN:
-            max_level_str = caps_config.get('uncertain_quality_max', 'MEDIUM')
-            max_level = self._string_to_confidence(max_level_str)
-            if self._confidence_level(confidence) > self._confidence_level(max_level):
-                logger.debug(f"[Cap] UNCERTAIN quality: {confidence.value} → {max_level.value}")
-                confidence = max_level
-                has_cap = True
+        capped = min(levels, key=_CONF_RANK.__getitem__)
+        if capped is confidence:
+            return confidence, False
         
-        # 2. reduce_tags上限
-        reduce_tags = tag_rules.get('reduce_tags', [])
-        tag_caps = caps_config.get('tag_caps', {})
-        reduce_default_max_str = caps_config.get('reduce_default_max', 
-                                                  caps_config.get('uncertain_quality_max', 'MEDIUM'))
-        
-        for tag in reason_tags:
-            tag_value = tag.value
-            if tag_value in reduce_tags or tag_value in tag_caps:
-                max_level_str = tag_caps.get(tag_value, reduce_default_max_str)
-                max_level = self._string_to_confidence(max_level_str)
-                if self._confidence_level(confidence) > self._confidence_level(max_level):
-                    logger.debug(f"[Cap] Tag {tag_value}: {confidence.value} → {max_level.value}")
-                    confidence = max_level
-                    has_cap = True
-        
-        return confidence, has_cap
+        logger.debug("[Cap] %s → %s", confidence.value, capped.value)
+        return capped, True
     
     def _apply_strong_signal_boost(
         self,
         confidence: Confidence,
-        reason_tags: List[ReasonTag],
         cap_limit: Confidence,
         has_strong_signal: bool
     ) -> Confidence:
         """强信号突破"""
-        boost_config = self.config.get('confidence_scoring', {}).get('strong_signal_boost', {})
-        
-        if not boost_config.get('enabled', True):
-            return confidence
-        
         if not has_strong_signal:
             return confidence
         
-        # 提升1档
-        boost_levels = boost_config.get('boost_levels', 1)
-        boosted = self._boost_confidence(confidence, boost_levels)
+        # 提升1档，不能突破cap
+        boosted = min(self._boosted[confidence], cap_limit, key=_CONF_RANK.__getitem__)
         
-        # 不能突破cap
-        if self._confidence_level(boosted) > self._confidence_level(cap_limit):
-            logger.debug(f"[Boost] Capped at {cap_limit.value}, cannot boost to {boosted.value}")
-            return cap_limit
-        
-        if boosted != confidence:
-            logger.debug(f"[Boost] Strong signal: {confidence.value} → {boosted.value}")
+        if boosted is not confidence:
+            logger.debug("[Boost] Strong signal: %s → %s", confidence.value, boosted.value)
         
         return boosted
     
-    def _boost_confidence(self, confidence: Confidence, levels: int) -> Confidence:
+    @staticmethod
+    def _boost_confidence(confidence: Confidence, levels: int) -> Confidence:
         """提升置信度档位"""
-        order = [Confidence.LOW, Confidence.MEDIUM, Confidence.HIGH, Confidence.ULTRA]
-        try:
-            current_idx = order.index(confidence)
-            new_idx = min(current_idx + levels, len(order) - 1)
-            return order[new_idx]
-        except ValueError:
+        current_idx = _CONF_RANK.get(confidence)
+        if current_idx is None:
             return confidence
+        return _CONF_ORDER[min(current_idx + levels, len(_CONF_ORDER) - 1)]
     
-    def _confidence_level(self, confidence: Confidence) -> int:
-        """置信度档位的数值表示（用于比较）"""
-        order = {
-            Confidence.LOW: 0,
-            Confidence.MEDIUM: 1,
-            Confidence.HIGH: 2,
-            Confidence.ULTRA: 3
-        }
-        return order.get(confidence, 0)
-    
-    def _string_to_confidence(self, s: str) -> Confidence:
-        """字符串转Confidence枚举"""
-        mapping = {
-            'LOW': Confidence.LOW,
-            'MEDIUM': Confidence.MEDIUM,
-            'HIGH': Confidence.HIGH,
-            'ULTRA': Confidence.ULTRA
-        }
-        
-        result = mapping.get(s.upper())
+    @staticmethod
+    def _string_to_confidence(s: str) -> Confidence:
+        """字符串转Confidence枚举（仅在 _bind_config 中调用）"""
+        result = _STR_TO_CONF.get(s.upper())
         if result is None:
             logger.error(
                 f"⚠️ 配置错误: 未知的置信度字符串 '{s}'，"
@@ -8,17 +8,169 @@ L1 配置管理器
 - 默认配置
 """
 
+import copy
+import threading
+from collections import OrderedDict
 import yaml
 import os
 from typing import Dict
 import logging
 
+from models.reason_tags import ReasonTag
+
 logger = logging.getLogger(__name__)
 
+# YAML解析器：优先使用libyaml（C实现），未编译libyaml时回退到纯Python实现
+try:
+    from yaml import CSafeLoader as _YAML_LOADER
+except ImportError:
+    from yaml import SafeLoader as _YAML_LOADER
+
+# 所有有效的ReasonTag值（拼写校验用）
+_VALID_TAGS = frozenset(tag.value for tag in ReasonTag)
+
+# 置信度字符串（大写）→ 档位序号
+_CONF_LEVEL = {'LOW': 0, 'MEDIUM': 1, 'HIGH': 2, 'ULTRA': 3}
+
+# 扁平化阈值表：(扁平键, 配置路径, 默认值)
+_FLAT_SPEC = (
+    # 数据质量（PR-002）
+    ('data_max_staleness_seconds', ('data_quality', 'max_staleness_seconds'), 120),
+    
+    # 市场环境
+    ('extreme_price_change_1h', ('market_regime', 'extreme_price_change_1h'), 0.05),
+    ('trend_price_change_6h', ('market_regime', 'trend_price_change_6h'), 0.03),
+    
+    # 风险准入
+    ('liquidation_price_change', ('risk_exposure', 'liquidation', 'price_change'), 0.05),
+    ('liquidation_oi_drop', ('risk_exposure', 'liquidation', 'oi_drop'), -0.15),
+    ('crowding_funding_abs', ('risk_exposure', 'crowding', 'funding_abs'), 0.001),
+    ('crowding_oi_growth', ('risk_exposure', 'crowding', 'oi_growth'), 0.30),
+    ('extreme_volume_multiplier', ('risk_exposure', 'extreme_volume', 'multiplier'), 10.0),
+    
+    # 交易质量
+    ('absorption_imbalance', ('trade_quality', 'absorption', 'imbalance'), 0.7),
+    ('absorption_volume_ratio', ('trade_quality', 'absorption', 'volume_ratio'), 0.5),
+    ('noisy_funding_volatility', ('trade_quality', 'noise', 'funding_volatility'), 0.0005),
+    ('noisy_funding_abs', ('trade_quality', 'noise', 'funding_abs'), 0.0001),
+    ('rotation_price_threshold', ('trade_quality', 'rotation', 'price_threshold'), 0.02),
+    ('rotation_oi_threshold', ('trade_quality', 'rotation', 'oi_threshold'), 0.05),
+    ('range_weak_imbalance', ('trade_quality', 'range_weak', 'imbalance'), 0.6),
+    ('range_weak_oi', ('trade_quality', 'range_weak', 'oi'), 0.10),
+    
+    # 方向评估
+    ('long_imbalance_trend', ('direction', 'trend', 'long', 'imbalance'), 0.6),
+    ('long_oi_change_trend', ('direction', 'trend', 'long', 'oi_change'), 0.05),
+    ('long_price_change_trend', ('direction', 'trend', 'long', 'price_change'), 0.01),
+    ('short_imbalance_trend', ('direction', 'trend', 'short', 'imbalance'), 0.6),
+    ('short_oi_change_trend', ('direction', 'trend', 'short', 'oi_change'), 0.05),
+    ('short_price_change_trend', ('direction', 'trend', 'short', 'price_change'), 0.01),
+    ('long_imbalance_range', ('direction', 'range', 'long', 'imbalance'), 0.7),
+    ('long_oi_change_range', ('direction', 'range', 'long', 'oi_change'), 0.10),
+    ('short_imbalance_range', ('direction', 'range', 'short', 'imbalance'), 0.7),
+    ('short_oi_change_range', ('direction', 'range', 'short', 'oi_change'), 0.10),
+    
+    # 辅助标签阈值（P0-3）
+    ('aux_oi_growing_threshold', ('auxiliary_tags', 'oi_growing_threshold'), 0.05),
+    ('aux_oi_declining_threshold', ('auxiliary_tags', 'oi_declining_threshold'), -0.05),
+    ('aux_funding_rate_threshold', ('auxiliary_tags', 'funding_rate_threshold'), 0.0005),
+)
+
+# 百分比阈值（应为小数格式）：(点分路径, 配置路径, 名称)
+_PERCENTAGE_THRESHOLDS = tuple(
+    ('.'.join(path), path, name)
+    for path, name in (
+        (('market_regime', 'extreme_price_change_1h'), 'EXTREME价格变化阈值'),
+        (('market_regime', 'trend_price_change_6h'), 'TREND价格变化阈值'),
+        (('risk_exposure', 'liquidation', 'price_change'), '清算价格变化阈值'),
+        (('risk_exposure', 'liquidation', 'oi_drop'), '清算OI下降阈值'),
+        (('risk_exposure', 'crowding', 'oi_growth'), '拥挤OI增长阈值'),
+        (('trade_quality', 'rotation', 'price_threshold'), '轮动价格阈值'),
+        (('trade_quality', 'rotation', 'oi_threshold'), '轮动OI阈值'),
+        (('trade_quality', 'range_weak', 'oi'), '震荡弱信号OI阈值'),
+    )
+)
+
+# 配置路径缺失标记
+_MISSING = object()
+
+
+def _get_path(config: dict, path: tuple):
+    """按路径取嵌套配置值，任一层缺失或不是dict时返回 _MISSING"""
+    value = config
+    for key in path:
+        if not isinstance(value, dict):
+            return _MISSING
+        value = value.get(key, _MISSING)
+    return value
+
+# 已解析配置缓存：绝对路径 → (mtime_ns, size, 配置)
+# 文件未变（mtime与大小均相同）时直接复用，命中时返回深拷贝，调用方修改不影响缓存
+_YAML_CACHE_SIZE = 100
+_yaml_cache: 'OrderedDict[str, tuple]' = OrderedDict()
+_yaml_cache_lock = threading.Lock()
+
+
+def _load_yaml_cached(config_path: str) -> dict:
+    """
+    按文件 mtime+大小 缓存的YAML加载
+    
+    Raises:
+        FileNotFoundError: 文件不存在
+    """
+    key = os.path.abspath(config_path)
+    stat = os.stat(key)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    
+    with _yaml_cache_lock:
+        cached = _yaml_cache.get(key)
+        if cached is not None and cached[0] == signature:
+            _yaml_cache.move_to_end(key)
+            return copy.deepcopy(cached[1])
+    
+    with open(key, 'r', encoding='utf-8') as f:
+        config = yaml.load(f, Loader=_YAML_LOADER)
+    
+    with _yaml_cache_lock:
+        _yaml_cache[key] = (signature, config)
+        _yaml_cache.move_to_end(key)
+        while len(_yaml_cache) > _YAML_CACHE_SIZE:
+            _yaml_cache.popitem(last=False)
+    return copy.deepcopy(config)
+
 
 class ConfigManager:
     """配置管理器"""
     
+    # 共享实例：规范化路径 → ConfigManager（见 get()）
+    _instances: Dict[str, 'ConfigManager'] = {}
+    _instances_lock = threading.Lock()
+    
+    @classmethod
+    def get(cls, config_path: str = None) -> 'ConfigManager':
+        """
+        获取指定配置文件的共享实例（同一进程内每个文件只加载、校验一次）
+        
+        需要独立实例（如测试中修改配置）时直接构造 ConfigManager(config_path)
+        
+        Args:
+            config_path: 配置文件路径，默认为 config/l1_thresholds.yaml
+        
+        Returns:
+            ConfigManager: 共享实例
+        """
+        if config_path is None:
+            config_path = os.path.join('config', 'l1_thresholds.yaml')
+        key = os.path.realpath(config_path)
+        
+        instance = cls._instances.get(key)
+        if instance is None:
+            with cls._instances_lock:
+                instance = cls._instances.get(key)
+                if instance is None:
+                    instance = cls._instances[key] = cls(config_path)
+        return instance
+    
     def __init__(self, config_path: str = None):
         """
         初始化配置管理器
@@ -32,10 +184,7 @@ class ConfigManager:
         self.config = self._load_config(config_path)
         
         # 启动时校验（fail-fast）
-        self._validate_decimal_calibration(self.config)
-        self._validate_threshold_consistency(self.config)
-        self._validate_reason_tag_spelling(self.config)
-        self._validate_confidence_values(self.config)
+        self._validate_all(self.config)
         
         # 扁平化阈值
         self.thresholds = self._flatten_thresholds(self.config)
@@ -51,17 +200,46 @@ class ConfigManager:
             dict: 配置字典
         """
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-            logger.info(f"Loaded config from {config_path}")
+            config = _load_yaml_cached(config_path)
+            logger.info("Loaded config from %s", config_path)
             return config
         except FileNotFoundError:
-            logger.warning(f"Config file not found: {config_path}, using defaults")
+            logger.warning("Config file not found: %s, using defaults", config_path)
             return self._get_default_config()
         except Exception as e:
-            logger.error(f"Error loading config: {e}, using defaults")
+            logger.error("Error loading config: %s, using defaults", e)
             return self._get_default_config()
     
+    def _validate_all(self, config: dict):
+        """
+        启动时校验：依次执行全部校验，汇总所有错误后一次性抛出
+        
+        一次启动即可看到配置中的全部问题，而不是修一个报一个。
+        只检查可选配置段的校验在这些段都不存在时跳过（此时只会用到默认值，必然通过）
+        
+        Args:
+            config: 配置字典
+        
+        Raises:
+            ValueError: 任一校验失败（消息为各校验错误报告的合并）
+        """
+        reports = []
+        for validate, sections in (
+            (self._validate_decimal_calibration, None),
+            (self._validate_threshold_consistency, ('executable_control', 'confidence_scoring')),
+            (self._validate_reason_tag_spelling, ('reason_tag_rules', 'confidence_scoring')),
+            (self._validate_confidence_values, ('executable_control', 'confidence_scoring')),
+        ):
+            if sections is not None and not any(section in config for section in sections):
+                continue
+            try:
+                validate(config)
+            except ValueError as e:
+                reports.append(str(e))
+        
+        if reports:
+            raise ValueError("\n".join(reports))
+    
     def _validate_decimal_calibration(self, config: dict):
         """
         启动时校验：检查配置口径是否为小数格式（防回归）
@@ -76,35 +254,19 @@ class ConfigManager:
         """
         errors = []
         
-        # 定义需要检查的百分比阈值路径（值应 < 1.0）
-        percentage_thresholds = [
-            ('market_regime', 'extreme_price_change_1h', 'EXTREME价格变化阈值'),
-            ('market_regime', 'trend_price_change_6h', 'TREND价格变化阈值'),
-            ('risk_exposure', 'liquidation', 'price_change', '清算价格变化阈值'),
-            ('risk_exposure', 'liquidation', 'oi_drop', '清算OI下降阈值'),
-            ('risk_exposure', 'crowding', 'oi_growth', '拥挤OI增长阈值'),
-            ('trade_quality', 'rotation', 'price_threshold', '轮动价格阈值'),
-            ('trade_quality', 'rotation', 'oi_threshold', '轮动OI阈值'),
-            ('trade_quality', 'range_weak', 'oi', '震荡弱信号OI阈值'),
-        ]
-        
-        # 检查基础百分比阈值
-        for path_parts in percentage_thresholds:
-            *path, last_key, name = path_parts
-            value = config
+        # 检查基础百分比阈值（绝对值应 < 1.0，允许负数，如-0.15）
+        for config_path, path, name in _PERCENTAGE_THRESHOLDS:
+            threshold_value = _get_path(config, path)
+            if threshold_value is _MISSING:
+                # 配置项不存在，跳过
+                continue
             try:
-                for key in path:
-                    value = value[key]
-                threshold_value = value[last_key]
-                
-                # 检查：百分比阈值的绝对值应该 < 1.0（允许负数，如-0.15）
                 if abs(threshold_value) >= 1.0:
-                    config_path = '.'.join(path) + '.' + last_key if path else last_key
                     errors.append(
                         f"❌ {config_path} = {threshold_value} ({name}，疑似百分点格式，应使用小数格式，如 0.05 表示 5%)"
                     )
-            except (KeyError, TypeError):
-                # 配置项不存在，跳过
+            except TypeError:
+                # 非数值，跳过
                 pass
         
         # 检查方向评估阈值（嵌套结构）
@@ -171,8 +333,6 @@ class ConfigManager:
         Raises:
             ValueError: 如果发现门槛一致性问题
         """
-        from models.enums import Confidence
-        
         errors = []
         
         # 获取配置
@@ -187,11 +347,8 @@ class ConfigManager:
         tag_rules = config.get('reason_tag_rules', {})
         reduce_tags = tag_rules.get('reduce_tags', [])
         
-        # 置信度顺序映射
-        confidence_order = {'LOW': 0, 'MEDIUM': 1, 'HIGH': 2, 'ULTRA': 3}
-        
-        min_reduced_level = confidence_order.get(min_reduced_str.upper(), 1)
-        uncertain_max_level = confidence_order.get(uncertain_max_str.upper(), 1)
+        min_reduced_level = _CONF_LEVEL.get(min_reduced_str.upper(), 1)
+        uncertain_max_level = _CONF_LEVEL.get(uncertain_max_str.upper(), 1)
         
         # 检查1: min_confidence_reduced <= uncertain_quality_max
         if min_reduced_level > uncertain_max_level:
@@ -205,7 +362,7 @@ class ConfigManager:
         for tag_name in reduce_tags:
             if tag_name in tag_caps:
                 tag_cap_str = tag_caps[tag_name]
-                tag_cap_level = confidence_order.get(tag_cap_str.upper(), 1)
+                tag_cap_level = _CONF_LEVEL.get(tag_cap_str.upper(), 1)
                 
                 if min_reduced_level > tag_cap_level:
                     errors.append(
@@ -255,10 +412,7 @@ class ConfigManager:
         Raises:
             ValueError: 如果发现无效的ReasonTag名称
         """
-        from models.reason_tags import ReasonTag
-        
-        # 获取所有有效的ReasonTag值
-        valid_tags = {tag.value for tag in ReasonTag}
+        valid_tags = _VALID_TAGS
         
         errors = []
         
@@ -344,7 +498,7 @@ class ConfigManager:
             ValueError: 如果发现无效的Confidence值
         """
         # 有效的Confidence值（大小写不敏感）
-        valid_confidence_values = {'LOW', 'MEDIUM', 'HIGH', 'ULTRA'}
+        valid_confidence_values = _CONF_LEVEL
         
         errors = []
         
@@ -419,54 +573,9 @@ class ConfigManager:
             dict: 扁平化后的阈值字典
         """
         flat = {}
-        
-        # 数据质量（PR-002）
-        dq = config.get('data_quality', {})
-        flat['data_max_staleness_seconds'] = dq.get('max_staleness_seconds', 120)
-        
-        # 市场环境
-        mr = config.get('market_regime', {})
-        flat['extreme_price_change_1h'] = mr.get('extreme_price_change_1h', 0.05)
-        flat['trend_price_change_6h'] = mr.get('trend_price_change_6h', 0.03)
-        
-        # 风险准入
-        re = config.get('risk_exposure', {})
-        flat['liquidation_price_change'] = re.get('liquidation', {}).get('price_change', 0.05)
-        flat['liquidation_oi_drop'] = re.get('liquidation', {}).get('oi_drop', -0.15)
-        flat['crowding_funding_abs'] = re.get('crowding', {}).get('funding_abs', 0.001)
-        flat['crowding_oi_growth'] = re.get('crowding', {}).get('oi_growth', 0.30)
-        flat['extreme_volume_multiplier'] = re.get('extreme_volume', {}).get('multiplier', 10.0)
-        
-        # 交易质量
-        tq = config.get('trade_quality', {})
-        flat['absorption_imbalance'] = tq.get('absorption', {}).get('imbalance', 0.7)
-        flat['absorption_volume_ratio'] = tq.get('absorption', {}).get('volume_ratio', 0.5)
-        flat['noisy_funding_volatility'] = tq.get('noise', {}).get('funding_volatility', 0.0005)
-        flat['noisy_funding_abs'] = tq.get('noise', {}).get('funding_abs', 0.0001)
-        flat['rotation_price_threshold'] = tq.get('rotation', {}).get('price_threshold', 0.02)
-        flat['rotation_oi_threshold'] = tq.get('rotation', {}).get('oi_threshold', 0.05)
-        flat['range_weak_imbalance'] = tq.get('range_weak', {}).get('imbalance', 0.6)
-        flat['range_weak_oi'] = tq.get('range_weak', {}).get('oi', 0.10)
-        
-        # 方向评估
-        d = config.get('direction', {})
-        flat['long_imbalance_trend'] = d.get('trend', {}).get('long', {}).get('imbalance', 0.6)
-        flat['long_oi_change_trend'] = d.get('trend', {}).get('long', {}).get('oi_change', 0.05)
-        flat['long_price_change_trend'] = d.get('trend', {}).get('long', {}).get('price_change', 0.01)
-        flat['short_imbalance_trend'] = d.get('trend', {}).get('short', {}).get('imbalance', 0.6)
-        flat['short_oi_change_trend'] = d.get('trend', {}).get('short', {}).get('oi_change', 0.05)
-        flat['short_price_change_trend'] = d.get('trend', {}).get('short', {}).get('price_change', 0.01)
-        flat['long_imbalance_range'] = d.get('range', {}).get('long', {}).get('imbalance', 0.7)
-        flat['long_oi_change_range'] = d.get('range', {}).get('long', {}).get('oi_change', 0.10)
-        flat['short_imbalance_range'] = d.get('range', {}).get('short', {}).get('imbalance', 0.7)
-        flat['short_oi_change_range'] = d.get('range', {}).get('short', {}).get('oi_change', 0.10)
-        
-        # 辅助标签阈值（P0-3）
-        aux = config.get('auxiliary_tags', {})
-        flat['aux_oi_growing_threshold'] = aux.get('oi_growing_threshold', 0.05)
-        flat['aux_oi_declining_threshold'] = aux.get('oi_declining_threshold', -0.05)
-        flat['aux_funding_rate_threshold'] = aux.get('funding_rate_threshold', 0.0005)
-        
+        for name, path, default in _FLAT_SPEC:
+            value = _get_path(config, path)
+            flat[name] = default if value is _MISSING else value
         return flat
     
     def _get_default_config(self) -> dict:
@@ -521,16 +630,19 @@ class ConfigManager:
         """
         热更新阈值配置
         
+        写时复制：合并为新字典后整体替换引用，已通过 get_thresholds() 取得的
+        快照保持不变，并发读取方不会读到更新了一半的阈值
+        
         Args:
             new_thresholds: 新的阈值字典
         """
-        self.thresholds.update(new_thresholds)
-        logger.info(f"Thresholds updated: {len(new_thresholds)} items")
+        self.thresholds = {**self.thresholds, **new_thresholds}
+        logger.info("Thresholds updated: %d items", len(new_thresholds))
     
     def get_config(self) -> dict:
         """获取完整配置"""
         return self.config
     
     def get_thresholds(self) -> dict:
-        """获取扁平化的阈值"""
+        """获取扁平化的阈值（当前快照，调用方不应修改；更新请用 update_thresholds）"""
         return self.thresholds
@@ -11,7 +11,7 @@ from .enums import Decision, Confidence, TradeQuality, MarketRegime, SystemState
 from .reason_tags import ReasonTag
 
 
-@dataclass
+@dataclass(slots=True)
 class AdvisoryResult:
     """
     L1决策层标准化输出
@@ -26,6 +26,7 @@ class AdvisoryResult:
     注意：
     - L1仅提供决策建议，不包含执行信息（仓位、入场点、止损止盈等）
     - executable字段在P2阶段添加，用于L3执行层判断
+    - 使用 __slots__（slots=True）：不能动态添加字段之外的属性
     """
     
     # ===== 核心决策 =====
@@ -19,7 +19,7 @@ from .enums import (
 from .reason_tags import ReasonTag
 
 
-@dataclass
+@dataclass(slots=True)
 class TimeframeConclusion:
     """
     单个时间周期的交易结论
@@ -81,7 +81,7 @@ class TimeframeConclusion:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class AlignmentAnalysis:
     """
     双周期一致性分析
@@ -132,7 +132,7 @@ class AlignmentAnalysis:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class DualTimeframeResult:
     """
     L1双周期独立结论 - 最终输出
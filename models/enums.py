@@ -5,6 +5,7 @@ L1 Advisory Layer - 枚举定义
 """
 
 from enum import Enum
+from typing import Dict
 
 
 class Decision(Enum):
@@ -137,3 +138,60 @@ class ConflictResolution(Enum):
     FOLLOW_SHORT_TERM = "follow_short_term"
     NO_TRADE = "no_trade"
     FOLLOW_HIGHER_CONFIDENCE = "follow_higher_confidence"
+
+
+# ==========================================
+# 枚举的整数编码（数据库以INTEGER存储枚举列）
+# ==========================================
+# 注意：编码一经分配不可修改或复用，新增成员只能追加新编码
+
+ENUM_STORAGE_CODES: Dict[type, Dict[Enum, int]] = {
+    Decision: {
+        Decision.LONG: 0,
+        Decision.SHORT: 1,
+        Decision.NO_TRADE: 2,
+    },
+    Confidence: {
+        Confidence.ULTRA: 0,
+        Confidence.HIGH: 1,
+        Confidence.MEDIUM: 2,
+        Confidence.LOW: 3,
+    },
+    TradeQuality: {
+        TradeQuality.GOOD: 0,
+        TradeQuality.UNCERTAIN: 1,
+        TradeQuality.POOR: 2,
+    },
+    MarketRegime: {
+        MarketRegime.TREND: 0,
+        MarketRegime.RANGE: 1,
+        MarketRegime.EXTREME: 2,
+    },
+    SystemState: {
+        SystemState.INIT: 0,
+        SystemState.WAIT: 1,
+    },
+    ExecutionPermission: {
+        ExecutionPermission.ALLOW: 0,
+        ExecutionPermission.ALLOW_REDUCED: 1,
+        ExecutionPermission.DENY: 2,
+    },
+    AlignmentType: {
+        AlignmentType.BOTH_LONG: 0,
+        AlignmentType.BOTH_SHORT: 1,
+        AlignmentType.BOTH_NO_TRADE: 2,
+        AlignmentType.CONFLICT_LONG_SHORT: 3,
+        AlignmentType.CONFLICT_SHORT_LONG: 4,
+        AlignmentType.PARTIAL_LONG: 5,
+        AlignmentType.PARTIAL_SHORT: 6,
+        AlignmentType.SHORT_ONLY: 7,
+        AlignmentType.MID_ONLY: 8,
+        AlignmentType.NONE_AVAILABLE: 9,
+    },
+    ConflictResolution: {
+        ConflictResolution.FOLLOW_MEDIUM_TERM: 0,
+        ConflictResolution.FOLLOW_SHORT_TERM: 1,
+        ConflictResolution.NO_TRADE: 2,
+        ConflictResolution.FOLLOW_HIGHER_CONFIDENCE: 3,
+    },
+}
@@ -218,6 +218,54 @@ REASON_TAG_EXECUTABILITY: Dict[ReasonTag, ExecutabilityLevel] = {
 }
 
 
+# ==========================================
+# ReasonTag的位编码（数据库以INTEGER位掩码存储reason_tags）
+# ==========================================
+# 注意：位序号一经分配不可修改或复用，新增标签只能追加到末尾（上限63）
+
+REASON_TAG_BITS: Dict[ReasonTag, int] = {
+    ReasonTag.INVALID_DATA: 0,
+    ReasonTag.DATA_STALE: 1,
+    ReasonTag.DATA_INCOMPLETE: 2,
+    ReasonTag.DATA_INCOMPLETE_LTF: 3,
+    ReasonTag.DATA_INCOMPLETE_MTF: 4,
+    ReasonTag.DATA_GAP_5M: 5,
+    ReasonTag.DATA_GAP_15M: 6,
+    ReasonTag.DATA_GAP_1H: 7,
+    ReasonTag.DATA_GAP_6H: 8,
+    ReasonTag.MTF_DEGRADED_TO_1H: 9,
+    ReasonTag.EXTREME_REGIME: 10,
+    ReasonTag.LIQUIDATION_PHASE: 11,
+    ReasonTag.CROWDING_RISK: 12,
+    ReasonTag.EXTREME_VOLUME: 13,
+    ReasonTag.ABSORPTION_RISK: 14,
+    ReasonTag.NOISY_MARKET: 15,
+    ReasonTag.ROTATION_RISK: 16,
+    ReasonTag.WEAK_SIGNAL_IN_RANGE: 17,
+    ReasonTag.CONFLICTING_SIGNALS: 18,
+    ReasonTag.NO_CLEAR_DIRECTION: 19,
+    ReasonTag.MIN_INTERVAL_BLOCK: 20,
+    ReasonTag.FLIP_COOLDOWN_BLOCK: 21,
+    ReasonTag.HIGH_FUNDING_RATE: 22,
+    ReasonTag.LOW_FUNDING_RATE: 23,
+    ReasonTag.STRONG_BUY_PRESSURE: 24,
+    ReasonTag.STRONG_SELL_PRESSURE: 25,
+    ReasonTag.OI_GROWING: 26,
+    ReasonTag.OI_DECLINING: 27,
+    ReasonTag.SHORT_TERM_TREND: 28,
+    ReasonTag.RANGE_SHORT_TERM_LONG: 29,
+    ReasonTag.RANGE_SHORT_TERM_SHORT: 30,
+    ReasonTag.SHORT_TERM_PRICE_SURGE: 31,
+    ReasonTag.SHORT_TERM_PRICE_DROP: 32,
+    ReasonTag.SHORT_TERM_STRONG_BUY: 33,
+    ReasonTag.SHORT_TERM_STRONG_SELL: 34,
+    ReasonTag.LTF_CONFIRMED: 35,
+    ReasonTag.LTF_PARTIAL_CONFIRM: 36,
+    ReasonTag.LTF_FAILED_CONFIRM: 37,
+    ReasonTag.LTF_CONTEXT_DENIED: 38,
+}
+
+
 def has_blocking_tags(reason_tags: list) -> bool:
     """
     检查是否有阻断性标签（PR-B）
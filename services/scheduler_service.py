@@ -78,10 +78,22 @@ class SchedulerService:
                 name=f'Cleanup old L1 advisory records (every {cleanup_interval}h)'
             )
             
+            # 任务3: 每日数据库维护（回收空闲页、刷新查询规划统计）
+            maintenance_hour = retention_config.get('maintenance_hour', 3)
+            self.scheduler.add_job(
+                func=self._db_maintenance_job,
+                trigger='cron',
+                hour=maintenance_hour,
+                minute=30,
+                id='db_maintenance',
+                name=f'L1 database maintenance (daily at {maintenance_hour}:30)'
+            )
+            
             self.scheduler.start()
             logger.info("⏰ Scheduler started:")
             logger.info(f"  - Periodic advisory update: Every {interval_minutes} minute(s)")
             logger.info(f"  - Cleanup old records: Every {cleanup_interval} hours")
+            logger.info(f"  - Database maintenance: Daily at {maintenance_hour}:30")
             
             return self.scheduler
         
@@ -167,9 +179,19 @@ class SchedulerService:
             logger.error(f"Error in periodic_advisory_update: {e}", exc_info=True)
     
     def _cleanup_old_records_job(self):
-        """定时清理旧记录的任务（保留24小时）"""
+        """定时清理旧记录的任务（保留24小时），并将超出热数据窗口的记录移入冷表"""
         try:
             deleted = self.l1_db.cleanup_old_records(days=1)
             logger.info(f"🗑️  Auto cleanup completed: {deleted} old records deleted")
+            
+            hot_hours = self.config.get('data_retention', {}).get('hot_hours', 6)
+            self.l1_db.archive_old_records(hours=hot_hours)
         except Exception as e:
             logger.error(f"Error in auto cleanup job: {e}", exc_info=True)
+    
+    def _db_maintenance_job(self):
+        """每日数据库维护任务"""
+        try:
+            self.l1_db.maintenance()
+        except Exception as e:
+            logger.error(f"Error in database maintenance job: {e}", exc_info=True)
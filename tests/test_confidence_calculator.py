@@ -0,0 +1,342 @@
+"""
+ConfidenceCalculator 单测
+
+测试覆盖：
+1. 执行许可：频控标签、EXTREME_VOLUME联立否决、BLOCK/DEGRADE/ALLOW映射
+2. 置信度：基础加分与档位映射
+3. 置信度：UNCERTAIN质量上限与 reduce_tags/tag_caps 上限
+4. 置信度：强信号加分与突破（不突破cap）
+5. 批量计算与逐条计算一致
+6. 使用 config/l1_thresholds.yaml 的实际配置
+"""
+
+import os
+
+import yaml
+
+from l1_engine.confidence_calculator import ConfidenceCalculator
+from models.enums import (
+    Decision, Confidence, MarketRegime, TradeQuality, ExecutionPermission
+)
+from models.reason_tags import ReasonTag
+from database.codecs import encode_reason_tags
+
+
+# ============================================
+# Helper函数
+# ============================================
+
+def create_test_config(**caps) -> dict:
+    """创建测试配置（caps 可覆盖）"""
+    caps_config = {
+        'uncertain_quality_max': 'MEDIUM',
+        'reduce_default_max': 'MEDIUM',
+        'tag_caps': {'noisy_market': 'LOW'},
+    }
+    caps_config.update(caps)
+    return {
+        'confidence_scoring': {
+            'decision_score': 30,
+            'regime_trend_score': 30,
+            'regime_range_score': 10,
+            'regime_extreme_score': 0,
+            'quality_good_score': 30,
+            'quality_uncertain_score': 15,
+            'quality_poor_score': 0,
+            'strong_signal_bonus': 10,
+            'thresholds': {'ultra': 90, 'high': 65, 'medium': 40},
+            'caps': caps_config,
+            'strong_signal_boost': {
+                'enabled': True,
+                'boost_levels': 1,
+                'required_tags': ['strong_buy_pressure', 'strong_sell_pressure'],
+            },
+        },
+        'reason_tag_rules': {
+            'reduce_tags': ['noisy_market', 'weak_signal_in_range', 'extreme_volume'],
+        },
+    }
+
+
+def load_yaml_config() -> dict:
+    """加载实际阈值配置"""
+    path = os.path.join(os.path.dirname(__file__), '..', 'config', 'l1_thresholds.yaml')
+    with open(path, encoding='utf-8') as f:
+        return yaml.safe_load(f)
+
+
+# ============================================
+# 执行许可
+# ============================================
+
+def test_permission_allow_without_tags():
+    """无标签或仅ALLOW级别标签 → ALLOW"""
+    calc = ConfidenceCalculator(create_test_config())
+
+    assert calc.compute_execution_permission([]) == ExecutionPermission.ALLOW
+    assert calc.compute_execution_permission(
+        [ReasonTag.STRONG_BUY_PRESSURE]
+    ) == ExecutionPermission.ALLOW
+
+
+def test_permission_frequency_control_denies():
+    """频控标签 → DENY"""
+    calc = ConfidenceCalculator(create_test_config())
+
+    assert calc.compute_execution_permission(
+        [ReasonTag.STRONG_BUY_PRESSURE, ReasonTag.MIN_INTERVAL_BLOCK]
+    ) == ExecutionPermission.DENY
+    assert calc.compute_execution_permission(
+        [ReasonTag.FLIP_COOLDOWN_BLOCK]
+    ) == ExecutionPermission.DENY
+
+
+def test_permission_extreme_volume_alone_degrades():
+    """EXTREME_VOLUME单独出现 → ALLOW_REDUCED"""
+    calc = ConfidenceCalculator(create_test_config())
+
+    assert calc.compute_execution_permission(
+        [ReasonTag.EXTREME_VOLUME]
+    ) == ExecutionPermission.ALLOW_REDUCED
+
+
+def test_permission_extreme_volume_combined_denies():
+    """EXTREME_VOLUME + LIQUIDATION_PHASE/EXTREME_REGIME → DENY（联立否决）"""
+    calc = ConfidenceCalculator(create_test_config())
+
+    assert calc.compute_execution_permission(
+        [ReasonTag.EXTREME_VOLUME, ReasonTag.LIQUIDATION_PHASE]
+    ) == ExecutionPermission.DENY
+    assert calc.compute_execution_permission(
+        [ReasonTag.EXTREME_REGIME, ReasonTag.EXTREME_VOLUME]
+    ) == ExecutionPermission.DENY
+
+
+def test_permission_block_beats_degrade():
+    """BLOCK与DEGRADE同时出现 → DENY（与标签顺序无关）"""
+    calc = ConfidenceCalculator(create_test_config())
+
+    assert calc.compute_execution_permission(
+        [ReasonTag.NOISY_MARKET, ReasonTag.LIQUIDATION_PHASE]
+    ) == ExecutionPermission.DENY
+    assert calc.compute_execution_permission(
+        [ReasonTag.LIQUIDATION_PHASE, ReasonTag.NOISY_MARKET]
+    ) == ExecutionPermission.DENY
+
+
+def test_permission_degrade_with_duplicates():
+    """重复的DEGRADE标签 → ALLOW_REDUCED"""
+    calc = ConfidenceCalculator(create_test_config())
+
+    assert calc.compute_execution_permission(
+        [ReasonTag.NOISY_MARKET, ReasonTag.NOISY_MARKET, ReasonTag.STRONG_SELL_PRESSURE]
+    ) == ExecutionPermission.ALLOW_REDUCED
+
+
+def test_permission_accepts_mask():
+    """位掩码输入与标签列表结果一致"""
+    calc = ConfidenceCalculator(create_test_config())
+    cases = [
+        [],
+        [ReasonTag.STRONG_BUY_PRESSURE],
+        [ReasonTag.NOISY_MARKET],
+        [ReasonTag.EXTREME_VOLUME],
+        [ReasonTag.EXTREME_VOLUME, ReasonTag.EXTREME_REGIME],
+        [ReasonTag.MIN_INTERVAL_BLOCK, ReasonTag.NOISY_MARKET],
+        [ReasonTag.DATA_STALE, ReasonTag.WEAK_SIGNAL_IN_RANGE],
+    ]
+
+    for tags in cases:
+        mask = encode_reason_tags(tags)
+        assert calc.compute_execution_permission(mask) == calc.compute_execution_permission(tags)
+
+
+def test_permission_cached_by_tag_set():
+    """相同标签组合（顺序/重复不同）命中同一缓存项"""
+    from l1_engine.confidence_calculator import _execution_permission
+
+    calc = ConfidenceCalculator(create_test_config())
+    _execution_permission.cache_clear()
+
+    calc.compute_execution_permission([ReasonTag.NOISY_MARKET, ReasonTag.STRONG_BUY_PRESSURE])
+    assert calc.compute_execution_permission(
+        [ReasonTag.STRONG_BUY_PRESSURE, ReasonTag.NOISY_MARKET, ReasonTag.NOISY_MARKET]
+    ) == ExecutionPermission.ALLOW_REDUCED
+
+    info = _execution_permission.cache_info()
+    assert info.misses == 1
+    assert info.hits == 1
+
+
+# ============================================
+# 置信度：基础加分
+# ============================================
+
+def test_confidence_no_trade_is_low():
+    """NO_TRADE强制LOW"""
+    calc = ConfidenceCalculator(create_test_config())
+
+    assert calc.compute_confidence(
+        Decision.NO_TRADE, MarketRegime.TREND, TradeQuality.GOOD, [ReasonTag.STRONG_BUY_PRESSURE]
+    ) == Confidence.LOW
+
+
+def test_confidence_score_levels():
+    """基础分映射到档位：90→ULTRA，70→HIGH，40→MEDIUM，30→LOW"""
+    calc = ConfidenceCalculator(create_test_config())
+
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.TREND, TradeQuality.GOOD, []
+    ) == Confidence.ULTRA
+    assert calc.compute_confidence(
+        Decision.SHORT, MarketRegime.RANGE, TradeQuality.GOOD, []
+    ) == Confidence.HIGH
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.RANGE, TradeQuality.POOR, []
+    ) == Confidence.MEDIUM
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.EXTREME, TradeQuality.POOR, []
+    ) == Confidence.LOW
+
+
+# ============================================
+# 置信度：硬降级上限
+# ============================================
+
+def test_confidence_uncertain_quality_cap():
+    """UNCERTAIN质量：75分（HIGH）被压到MEDIUM"""
+    calc = ConfidenceCalculator(create_test_config())
+
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.TREND, TradeQuality.UNCERTAIN, []
+    ) == Confidence.MEDIUM
+
+
+def test_confidence_tag_caps():
+    """tag_caps优先于reduce_default_max，多个cap取最严"""
+    calc = ConfidenceCalculator(create_test_config())
+
+    # reduce_tags 未单独配置 → reduce_default_max
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.TREND, TradeQuality.GOOD, [ReasonTag.WEAK_SIGNAL_IN_RANGE]
+    ) == Confidence.MEDIUM
+    # tag_caps 显式配置
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.TREND, TradeQuality.GOOD, [ReasonTag.NOISY_MARKET]
+    ) == Confidence.LOW
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.TREND, TradeQuality.GOOD,
+        [ReasonTag.WEAK_SIGNAL_IN_RANGE, ReasonTag.NOISY_MARKET]
+    ) == Confidence.LOW
+
+
+def test_confidence_unknown_cap_string_falls_back_to_low():
+    """未知的cap字符串回退到LOW（最保守）"""
+    calc = ConfidenceCalculator(create_test_config(uncertain_quality_max='BOGUS'))
+
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.TREND, TradeQuality.UNCERTAIN, []
+    ) == Confidence.LOW
+
+
+# ============================================
+# 置信度：强信号
+# ============================================
+
+def test_confidence_strong_signal_boost():
+    """强信号：40+10=50（MEDIUM）→ 突破1档到HIGH"""
+    calc = ConfidenceCalculator(create_test_config())
+
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.RANGE, TradeQuality.POOR, [ReasonTag.STRONG_BUY_PRESSURE]
+    ) == Confidence.HIGH
+
+
+def test_confidence_strong_signal_does_not_break_cap():
+    """强信号突破不超过cap：55+10=65（HIGH）→ cap MEDIUM → 保持MEDIUM"""
+    calc = ConfidenceCalculator(create_test_config())
+
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.RANGE, TradeQuality.UNCERTAIN, [ReasonTag.STRONG_SELL_PRESSURE]
+    ) == Confidence.MEDIUM
+
+
+def test_confidence_strong_signal_boost_with_loose_cap():
+    """上限未压低置信度时不限制突破：50（MEDIUM）、cap HIGH → 突破到HIGH"""
+    calc = ConfidenceCalculator(create_test_config(tag_caps={'noisy_market': 'HIGH'}))
+
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.RANGE, TradeQuality.POOR,
+        [ReasonTag.NOISY_MARKET, ReasonTag.STRONG_BUY_PRESSURE]
+    ) == Confidence.HIGH
+
+
+def test_confidence_strong_signal_boost_disabled():
+    """关闭突破后仅保留加分"""
+    config = create_test_config()
+    config['confidence_scoring']['strong_signal_boost']['enabled'] = False
+    calc = ConfidenceCalculator(config)
+
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.RANGE, TradeQuality.POOR, [ReasonTag.STRONG_BUY_PRESSURE]
+    ) == Confidence.MEDIUM
+
+
+def test_confidence_invalid_required_tag_skipped():
+    """required_tags中的无效标签被跳过，其余标签仍触发强信号"""
+    config = create_test_config()
+    config['confidence_scoring']['strong_signal_boost']['required_tags'] = [
+        'not_a_tag', 'strong_buy_pressure'
+    ]
+    calc = ConfidenceCalculator(config)
+
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.RANGE, TradeQuality.POOR, [ReasonTag.STRONG_BUY_PRESSURE]
+    ) == Confidence.HIGH
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.RANGE, TradeQuality.POOR, [ReasonTag.STRONG_SELL_PRESSURE]
+    ) == Confidence.MEDIUM
+
+
+def test_confidence_batch_matches_scalar():
+    """批量计算与逐条计算结果一致"""
+    calc = ConfidenceCalculator(create_test_config())
+    rows = [
+        (Decision.LONG, MarketRegime.TREND, TradeQuality.GOOD, []),
+        (Decision.NO_TRADE, MarketRegime.TREND, TradeQuality.GOOD, []),
+        (Decision.SHORT, MarketRegime.RANGE, TradeQuality.UNCERTAIN, [ReasonTag.STRONG_SELL_PRESSURE]),
+        (Decision.LONG, MarketRegime.RANGE, TradeQuality.POOR, [ReasonTag.STRONG_BUY_PRESSURE]),
+        (Decision.LONG, MarketRegime.TREND, TradeQuality.GOOD, []),
+        (Decision.LONG, MarketRegime.TREND, TradeQuality.GOOD, [ReasonTag.NOISY_MARKET]),
+    ]
+
+    results = calc.compute_confidence_batch(*zip(*rows))
+
+    assert results == [calc.compute_confidence(*row) for row in rows]
+    assert results == [
+        Confidence.ULTRA, Confidence.LOW, Confidence.MEDIUM,
+        Confidence.HIGH, Confidence.ULTRA, Confidence.LOW,
+    ]
+
+
+# ============================================
+# 实际配置
+# ============================================
+
+def test_yaml_config():
+    """config/l1_thresholds.yaml：UNCERTAIN与reduce_tags上限为HIGH"""
+    calc = ConfidenceCalculator(load_yaml_config())
+
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.TREND, TradeQuality.GOOD, []
+    ) == Confidence.ULTRA
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.TREND, TradeQuality.GOOD, [ReasonTag.EXTREME_VOLUME]
+    ) == Confidence.HIGH
+    assert calc.compute_confidence(
+        Decision.LONG, MarketRegime.TREND, TradeQuality.GOOD,
+        [ReasonTag.STRONG_BUY_PRESSURE, ReasonTag.NOISY_MARKET]
+    ) == Confidence.HIGH
+    assert calc.compute_execution_permission(
+        [ReasonTag.EXTREME_VOLUME]
+    ) == ExecutionPermission.ALLOW_REDUCED
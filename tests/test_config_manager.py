@@ -0,0 +1,124 @@
+"""
+ConfigManager 单测
+
+测试覆盖：
+1. 加载实际配置并扁平化阈值
+2. 文件不存在时回退到默认配置
+3. YAML解析缓存：文件未变时复用，返回的配置互不影响
+4. 文件变化（mtime/大小）后重新解析
+5. 共享实例（ConfigManager.get）
+6. 校验失败时汇总全部错误
+7. 阈值热更新（写时复制）
+"""
+
+import os
+
+import pytest
+
+from l1_engine import config_manager
+from l1_engine.config_manager import ConfigManager
+
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'config', 'l1_thresholds.yaml')
+
+
+# ============================================
+# Helper函数
+# ============================================
+
+def write_config(path, extreme_price_change_1h: float):
+    """写入最小配置文件"""
+    path.write_text(
+        "market_regime:\n"
+        f"  extreme_price_change_1h: {extreme_price_change_1h}\n",
+        encoding='utf-8'
+    )
+
+
+# ============================================
+# 加载
+# ============================================
+
+def test_load_config():
+    """加载实际配置，阈值扁平化"""
+    manager = ConfigManager(CONFIG_PATH)
+
+    assert 'market_regime' in manager.get_config()
+    assert 'extreme_price_change_1h' in manager.get_thresholds()
+
+
+def test_missing_file_uses_defaults(tmp_path):
+    """文件不存在 → 默认配置"""
+    manager = ConfigManager(str(tmp_path / 'missing.yaml'))
+
+    assert manager.get_config()['market_regime']['extreme_price_change_1h'] == 0.05
+
+
+def test_validation_reports_all_errors(tmp_path):
+    """多个校验同时失败时，一次抛出全部错误"""
+    path = tmp_path / 'thresholds.yaml'
+    path.write_text(
+        "market_regime:\n"
+        "  extreme_price_change_1h: 5.0\n"
+        "reason_tag_rules:\n"
+        "  reduce_tags: [noisy_markt]\n",
+        encoding='utf-8'
+    )
+
+    with pytest.raises(ValueError) as exc_info:
+        ConfigManager(str(path))
+
+    assert 'market_regime.extreme_price_change_1h' in str(exc_info.value)
+    assert 'noisy_markt' in str(exc_info.value)
+
+
+def test_update_thresholds_keeps_snapshot():
+    """热更新替换阈值字典，之前取得的快照不变"""
+    manager = ConfigManager(CONFIG_PATH)
+    snapshot = manager.get_thresholds()
+    original = snapshot['extreme_price_change_1h']
+
+    manager.update_thresholds({'extreme_price_change_1h': 0.08})
+
+    assert manager.get_thresholds()['extreme_price_change_1h'] == 0.08
+    assert snapshot['extreme_price_change_1h'] == original
+
+
+# ============================================
+# 缓存
+# ============================================
+
+def test_cached_config_is_independent_copy():
+    """重复加载命中缓存，修改一个实例的配置不影响其他实例"""
+    first = ConfigManager(CONFIG_PATH)
+    first.config['market_regime']['extreme_price_change_1h'] = 0.99
+
+    second = ConfigManager(CONFIG_PATH)
+
+    assert os.path.abspath(CONFIG_PATH) in config_manager._yaml_cache
+    assert second.config['market_regime']['extreme_price_change_1h'] != 0.99
+
+
+def test_reload_after_file_change(tmp_path):
+    """文件内容变化后重新解析"""
+    path = tmp_path / 'thresholds.yaml'
+    write_config(path, 0.05)
+    assert ConfigManager(str(path)).thresholds['extreme_price_change_1h'] == 0.05
+
+    write_config(path, 0.075)
+    assert ConfigManager(str(path)).thresholds['extreme_price_change_1h'] == 0.075
+
+
+# ============================================
+# 共享实例
+# ============================================
+
+def test_get_returns_shared_instance(tmp_path):
+    """同一文件（不同写法的路径）返回同一实例，直接构造不受影响"""
+    path = tmp_path / 'thresholds.yaml'
+    write_config(path, 0.05)
+
+    shared = ConfigManager.get(str(path))
+
+    assert ConfigManager.get(os.path.join(str(tmp_path), '.', 'thresholds.yaml')) is shared
+    assert ConfigManager(str(path)) is not shared
@@ -0,0 +1,1329 @@
+"""
+测试模块化数据库层（database/）
+
+测试内容：
+1. 连接池（读连接复用、写连接提交/回滚）
+2. AdvisoryRepository 保存与查询
+3. DualAdvisoryRepository 保存与查询
+4. 查询结果缓存
+5. PipelineRepository 保存与查询
+6. 后台写线程
+7. asyncio 接口
+8. 数据迁移
+9. 数据保留与维护
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+from database import L1DatabaseModular, QueryCache
+from database.codecs import (
+    encode_reason_tags, decode_reason_tags, decode_reason_tag_values, load_reason_tags, reason_tags_order,
+    to_epoch_us
+)
+from models.advisory_result import AdvisoryResult
+from models.dual_timeframe_result import DualTimeframeResult, TimeframeConclusion, AlignmentAnalysis
+from models.enums import (
+    Decision, Confidence, TradeQuality, MarketRegime, SystemState,
+    ExecutionPermission, Timeframe, AlignmentType
+)
+from models.reason_tags import ReasonTag
+
+
+def make_advisory(decision=Decision.LONG, confidence=Confidence.HIGH, timestamp=None, reason_tags=None):
+    """构造测试用AdvisoryResult"""
+    return AdvisoryResult(
+        decision=decision,
+        confidence=confidence,
+        market_regime=MarketRegime.TREND,
+        system_state=SystemState.WAIT,
+        risk_exposure_allowed=True,
+        trade_quality=TradeQuality.GOOD,
+        reason_tags=reason_tags if reason_tags is not None else [ReasonTag.STRONG_BUY_PRESSURE],
+        timestamp=timestamp or datetime.now(),
+        execution_permission=ExecutionPermission.ALLOW,
+        executable=True,
+        price=50000.0
+    )
+
+
+def make_dual(symbol='BTCUSDT', short_decision=Decision.LONG, medium_decision=Decision.LONG,
+              alignment_type=AlignmentType.BOTH_LONG, timestamp=None):
+    """构造测试用DualTimeframeResult"""
+    short = TimeframeConclusion(
+        timeframe=Timeframe.SHORT_TERM,
+        timeframe_label='5m/15m',
+        decision=short_decision,
+        confidence=Confidence.HIGH,
+        market_regime=MarketRegime.TREND,
+        trade_quality=TradeQuality.GOOD,
+        executable=True,
+        reason_tags=[ReasonTag.SHORT_TERM_STRONG_BUY],
+        key_metrics={'price_change_1h': 0.012}
+    )
+    medium = TimeframeConclusion(
+        timeframe=Timeframe.MEDIUM_TERM,
+        timeframe_label='1h/6h',
+        decision=medium_decision,
+        confidence=Confidence.MEDIUM,
+        market_regime=MarketRegime.RANGE,
+        trade_quality=TradeQuality.UNCERTAIN,
+        execution_permission=ExecutionPermission.ALLOW_REDUCED,
+        reason_tags=[ReasonTag.NOISY_MARKET]
+    )
+    alignment = AlignmentAnalysis(
+        is_aligned=True,
+        alignment_type=alignment_type,
+        has_conflict=False,
+        recommended_action=short_decision,
+        recommended_confidence=Confidence.MEDIUM,
+        recommendation_notes='test'
+    )
+    return DualTimeframeResult(
+        short_term=short,
+        medium_term=medium,
+        alignment=alignment,
+        symbol=symbol,
+        timestamp=timestamp or datetime.now(),
+        price=50000.0
+    )
+
+
+# 绕过Repository直接写入一行（reason_tags为旧JSON格式，无位掩码）
+_SQL_INSERT_RAW = (
+    "INSERT INTO l1_advisory_results "
+    "(symbol, timestamp, ts_us, decision, confidence, market_regime, system_state, "
+    " risk_exposure_allowed, trade_quality, reason_tags) "
+    "VALUES ('BTCUSDT', ?, ?, 'long', 'high', 'trend', 'wait', 1, 'good', '[\"oi_growing\"]')"
+)
+
+
+@pytest.fixture
+def db(tmp_path):
+    """临时数据库"""
+    database = L1DatabaseModular(db_path=str(tmp_path / 'l1_test.db'))
+    yield database
+    database.close()
+
+
+class TestConnectionPool:
+    """测试连接池"""
+
+    def test_read_connection_reused(self, db):
+        """读连接归还后被复用"""
+        with db.connection.read() as conn1:
+            pass
+        with db.connection.read() as conn2:
+            pass
+
+        assert conn1 is conn2
+
+    def test_nested_reads_use_distinct_connections(self, db):
+        """并发借出的读连接互不相同"""
+        with db.connection.read() as conn1:
+            with db.connection.read() as conn2:
+                assert conn1 is not conn2
+
+    def test_read_connection_never_writes(self, db):
+        """读连接不开启事务，且拒绝写入"""
+        db.advisory.save('BTCUSDT', make_advisory())
+
+        with db.connection.read() as conn:
+            conn.execute("SELECT COUNT(*) FROM l1_advisory_results").fetchone()
+            assert not conn.in_transaction
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM l1_advisory_results")
+
+    def test_write_rollback_on_error(self, db):
+        """写事务异常时回滚"""
+        with pytest.raises(RuntimeError):
+            with db.connection.write() as conn:
+                conn.execute(
+                    "INSERT INTO l1_pipeline_steps "
+                    "(advisory_id, symbol, step_number, step_name, status, timestamp) "
+                    "VALUES (1, 'BTCUSDT', 1, 'x', 'ok', '2024-01-01T00:00:00')"
+                )
+                raise RuntimeError('boom')
+
+        assert db.pipeline.get(1) == []
+
+    def test_transaction_spans_multiple_saves(self, db):
+        """transaction内的多次保存整体回滚"""
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db.advisory.save('BTCUSDT', make_advisory())
+                db.advisory.save('BTCUSDT', make_advisory())
+                raise RuntimeError('boom')
+
+        assert db.advisory.get_history('BTCUSDT', hours=1) == []
+
+    def test_transaction_commits_once(self, db):
+        """嵌套写入并入外层事务，退出后提交"""
+        with db.transaction() as conn:
+            db.advisory.save('BTCUSDT', make_advisory())
+            db.advisory.save_batch([('BTCUSDT', make_advisory())])
+            assert conn.in_transaction
+
+        assert not conn.in_transaction
+        assert len(db.advisory.get_history('BTCUSDT', hours=1)) == 2
+
+    def test_concurrent_reads_with_open_write(self, db):
+        """读连接以只读方式打开；写事务进行中其他线程仍可读取已提交数据"""
+        import threading
+
+        db.advisory.save('BTCUSDT', make_advisory())
+        counts = []
+
+        def reader():
+            with db.connection.read() as conn:
+                counts.append(conn.execute("SELECT COUNT(*) FROM l1_advisory_results").fetchone()[0])
+
+        with db.connection.write() as conn:
+            conn.execute("DELETE FROM l1_advisory_results")
+            threads = [threading.Thread(target=reader) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert counts == [1, 1, 1, 1]
+        conn = db.connection.connect(read_only=True)
+        with pytest.raises(sqlite3.OperationalError, match='readonly'):
+            conn.execute("DELETE FROM l1_advisory_results")
+        conn.close()
+
+    def test_writer_connection_long_lived(self, db):
+        """多次写入复用同一个写连接"""
+        with db.connection.write() as conn1:
+            pass
+        db.advisory.save('BTCUSDT', make_advisory())
+        with db.connection.write() as conn2:
+            pass
+
+        assert conn1 is conn2
+
+    def test_wal_and_connection_pragmas(self, db):
+        """数据库为WAL模式，每个连接都设置了连接级PRAGMA"""
+        with db.connection.read() as reader, db.connection.write() as writer:
+            assert reader.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+            for conn in (reader, writer):
+                assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+                assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2
+                assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+                assert conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0] == 1000
+
+    def test_close_releases_connections(self, db):
+        """close后连接池清空"""
+        with db.connection.read():
+            pass
+        db.close()
+
+        assert db.connection._read_pool.empty()
+        assert db.connection._writer_conn is None
+
+
+class TestCodecs:
+    """测试存储编解码"""
+
+    def test_reason_tags_roundtrip(self):
+        """位掩码往返（按位序号排序、去重）"""
+        tags = [ReasonTag.STRONG_BUY_PRESSURE, ReasonTag.NOISY_MARKET, ReasonTag.NOISY_MARKET]
+        mask = encode_reason_tags(tags)
+
+        assert decode_reason_tags(mask) == [ReasonTag.NOISY_MARKET, ReasonTag.STRONG_BUY_PRESSURE]
+
+    def test_decoded_lists_are_independent(self):
+        """解码结果有缓存，但每次返回新列表（调用方修改不污染缓存）"""
+        mask = encode_reason_tags([ReasonTag.NOISY_MARKET])
+        decode_reason_tag_values(mask).append('x')
+        decode_reason_tags(mask).clear()
+
+        assert decode_reason_tag_values(mask) == ['noisy_market']
+        assert decode_reason_tags(mask) == [ReasonTag.NOISY_MARKET]
+
+    def test_all_tags_fit_in_int64(self):
+        """全部标签编码后仍在SQLite INTEGER范围内"""
+        mask = encode_reason_tags(list(ReasonTag))
+
+        assert mask < 2 ** 63
+        assert decode_reason_tags(mask) == list(ReasonTag)
+
+    def test_epoch_us_exact(self):
+        """微秒时间戳整数换算无精度损失"""
+        dt = datetime(2024, 5, 1, 12, 30, 45, 123457)
+
+        assert to_epoch_us(dt) % 1_000_000 == 123457
+        assert to_epoch_us(dt) // 1_000_000 == int(dt.replace(microsecond=0).timestamp())
+
+    def test_adapters_bind_enums_and_datetimes(self, db):
+        """枚举按编码、datetime按isoformat绑定"""
+        dt = datetime(2024, 5, 1, 12, 30, 45, 123457)
+
+        with db.connection.read() as conn:
+            row = conn.execute("SELECT ?, ?, ?", (dt, Decision.NO_TRADE, AlignmentType.MID_ONLY)).fetchone()
+
+        assert row == (dt.isoformat(), 2, 8)
+
+    def test_legacy_json_fallback(self):
+        """位掩码为空时回退解析旧JSON文本"""
+        assert load_reason_tags(None, '["noisy_market"]') == [ReasonTag.NOISY_MARKET]
+        assert load_reason_tags(None, '') == []
+
+    def test_reason_tags_order_preserved(self):
+        """原始顺序与位序号不同时另存JSON，读取时按原始顺序返回"""
+        tags = [ReasonTag.STRONG_BUY_PRESSURE, ReasonTag.NOISY_MARKET]
+        mask = encode_reason_tags(tags)
+        order = reason_tags_order(tags, mask)
+
+        assert reason_tags_order(tags[::-1], mask) == ''
+        assert load_reason_tags(mask, order) == tags
+        assert load_reason_tags(mask, '') == tags[::-1]
+
+
+class TestQueryCache:
+    """测试查询结果缓存"""
+
+    def test_hit_and_invalidate_on_save(self, db):
+        """重复查询命中缓存；保存后该symbol失效"""
+        db.advisory.save('BTCUSDT', make_advisory())
+
+        first = db.advisory.get_stats('BTCUSDT', hours=1)
+        second = db.advisory.get_stats('BTCUSDT', 1)
+        assert second == first
+        assert db.query_cache.hits == 1
+
+        db.advisory.save('BTCUSDT', make_advisory(Decision.SHORT))
+        assert db.advisory.get_stats('BTCUSDT', hours=1)['total'] == 2
+
+    def test_other_symbol_not_invalidated(self, db):
+        """保存其他symbol不影响缓存"""
+        db.dual_advisory.save('BTCUSDT', make_dual())
+        first = db.dual_advisory.get_stats('BTCUSDT')
+
+        db.dual_advisory.save('ETHUSDT', make_dual(symbol='ETHUSDT'))
+
+        assert db.dual_advisory.get_stats('BTCUSDT') == first
+        assert db.query_cache.hits == 1
+
+    def test_empty_result_not_cached(self, db):
+        """空结果不缓存"""
+        assert db.advisory.get_history('BTCUSDT', hours=1) == []
+        with db.connection.write() as conn:
+            conn.execute(_SQL_INSERT_RAW, (datetime.now().isoformat(), to_epoch_us(datetime.now())))
+
+        assert len(db.advisory.get_history('BTCUSDT', hours=1)) == 1
+
+    def test_invalidate_after_outer_commit(self, db):
+        """外层事务未提交时读取（读到并缓存旧结果），提交后失效，再次读取为新结果"""
+        db.advisory.save('BTCUSDT', make_advisory())
+        db.dual_advisory.save('BTCUSDT', make_dual())
+
+        with db.transaction():
+            db.advisory.save('BTCUSDT', make_advisory(Decision.SHORT))
+            db.dual_advisory.save_batch([('BTCUSDT', make_dual())])
+            assert db.advisory.get_stats('BTCUSDT', 1)['total'] == 1
+            assert len(db.dual_advisory.get_history('BTCUSDT')) == 1
+
+        assert db.advisory.get_stats('BTCUSDT', 1)['total'] == 2
+        assert len(db.dual_advisory.get_history('BTCUSDT')) == 2
+
+    def test_stale_read_not_cached_after_concurrent_write(self, db, monkeypatch):
+        """写入前开始的查询在失效之后才完成时，不把旧结果放回缓存"""
+        import threading
+        from database import advisory_repository
+
+        db.advisory.save('BTCUSDT', make_advisory())
+        history_dicts = advisory_repository._history_dicts
+        fetched = threading.Event()
+        release = threading.Event()
+
+        def blocking_history_dicts(rows):
+            fetched.set()
+            release.wait(5)
+            return history_dicts(rows)
+
+        monkeypatch.setattr(advisory_repository, '_history_dicts', blocking_history_dicts)
+        results = []
+        reader = threading.Thread(target=lambda: results.append(db.advisory.get_history('BTCUSDT', hours=1)))
+        reader.start()
+        assert fetched.wait(5)
+
+        db.advisory.save('BTCUSDT', make_advisory(Decision.SHORT))
+        release.set()
+        reader.join(5)
+        monkeypatch.setattr(advisory_repository, '_history_dicts', history_dicts)
+
+        assert len(results[0]) == 1
+        assert len(db.advisory.get_history('BTCUSDT', hours=1)) == 2
+
+    def test_rollback_discards_invalidation(self, db):
+        """外层事务回滚时不执行失效（缓存结果仍与数据库一致）"""
+        db.advisory.save('BTCUSDT', make_advisory())
+        first = db.advisory.get_stats('BTCUSDT', 1)
+
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db.advisory.save('BTCUSDT', make_advisory(Decision.SHORT))
+                raise RuntimeError('abort')
+
+        assert db.advisory.get_stats('BTCUSDT', 1)['total'] == 1
+        assert db.query_cache.hits == 1
+
+    def test_hit_returns_copy(self, db):
+        """命中时返回浅拷贝：调用方修改返回的列表/字典不影响后续命中"""
+        db.advisory.save('BTCUSDT', make_advisory())
+
+        db.advisory.get_history('BTCUSDT', hours=1).clear()
+        db.advisory.get_stats('BTCUSDT', 1)['total'] = 100
+
+        assert len(db.advisory.get_history('BTCUSDT', hours=1)) == 1
+        assert db.advisory.get_stats('BTCUSDT', 1)['total'] == 1
+        assert db.query_cache.hits == 2
+
+    def test_ttl_expiry(self):
+        """过期条目不命中"""
+        cache = QueryCache(default_ttl=0)
+        cache.set('BTCUSDT', ('k',), 1)
+
+        assert cache.get('BTCUSDT', ('k',)) == (False, None)
+
+    def test_disabled(self, tmp_path):
+        """query_cache_ttl=0 时不缓存"""
+        database = L1DatabaseModular(db_path=str(tmp_path / 'nocache.db'), query_cache_ttl=0)
+        database.advisory.save('BTCUSDT', make_advisory())
+
+        assert database.query_cache is None
+        assert database.advisory.get_stats('BTCUSDT', 1) is not database.advisory.get_stats('BTCUSDT', 1)
+        database.close()
+
+
+class TestAdvisoryRepository:
+    """测试单周期决策Repository"""
+
+    def test_save_and_get_latest(self, db):
+        """保存后可读取最新决策"""
+        record_id = db.advisory.save('BTCUSDT', make_advisory())
+        latest = db.advisory.get_latest('BTCUSDT')
+
+        assert record_id > 0
+        assert latest.decision == Decision.LONG
+        assert latest.confidence == Confidence.HIGH
+        assert latest.reason_tags == [ReasonTag.STRONG_BUY_PRESSURE]
+        assert latest.executable is True
+
+    def test_reason_tags_order_preserved(self, db):
+        """reason_tags按原始顺序读回（不按位序号重排）"""
+        tags = [ReasonTag.STRONG_BUY_PRESSURE, ReasonTag.NOISY_MARKET]
+        db.advisory.save('BTCUSDT', make_advisory(reason_tags=tags))
+        db.advisory._latest.clear()
+
+        assert db.advisory.get_latest('BTCUSDT').reason_tags == tags
+        assert db.advisory.get_history('BTCUSDT', hours=1)[0]['reason_tags'] == [
+            'strong_buy_pressure', 'noisy_market'
+        ]
+
+    def test_get_latest_served_from_memory(self, db, monkeypatch):
+        """本进程写入后 get_latest 不访问数据库；冷启动时回退到查询"""
+        result = make_advisory()
+        db.advisory.save('BTCUSDT', result)
+        db.advisory.save('BTCUSDT', make_advisory(Decision.SHORT, timestamp=datetime.now() - timedelta(hours=1)))
+
+        def fail():
+            raise AssertionError('unexpected read')
+        monkeypatch.setattr(db.connection, 'read', fail)
+        assert db.advisory.get_latest('BTCUSDT') is result
+        monkeypatch.undo()
+
+        cold = L1DatabaseModular(db_path=db.db_path)
+        latest = cold.advisory.get_latest('BTCUSDT')
+        cold.close()
+
+        assert latest.decision == Decision.LONG
+        assert latest.timestamp == result.timestamp
+
+    def test_get_latest_ignores_rolled_back_save(self, db):
+        """外层事务回滚的写入不进入内存中的最新决策"""
+        db.advisory.save('BTCUSDT', make_advisory())
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db.advisory.save('BTCUSDT', make_advisory(Decision.SHORT))
+                raise RuntimeError('boom')
+
+        assert db.advisory.get_latest('BTCUSDT').decision == Decision.LONG
+
+    def test_get_latest_decision(self, db):
+        """只取决策值：查询只读覆盖索引；无记录时返回None"""
+        from database.advisory_repository import _SQL_SELECT_LATEST_DECISION
+
+        db.advisory.save('BTCUSDT', make_advisory(Decision.SHORT))
+        cold = L1DatabaseModular(db_path=db.db_path)
+        with cold.connection.read() as conn:
+            plan = conn.execute(
+                'EXPLAIN QUERY PLAN ' + _SQL_SELECT_LATEST_DECISION, ('BTCUSDT', 'BTCUSDT', 1)
+            ).fetchall()
+
+        searches = [row[3] for row in plan if row[3].startswith('SEARCH')]
+        assert len(searches) == 2 and all('COVERING INDEX' in detail for detail in searches)
+        assert db.advisory.get_latest_decision('BTCUSDT') == 'short'
+        assert cold.advisory.get_latest_decision('BTCUSDT') == 'short'
+        assert cold.advisory.get_latest_decision('ETHUSDT') is None
+        cold.close()
+
+    def test_history_and_stats(self, db):
+        """历史与统计"""
+        db.advisory.save('BTCUSDT', make_advisory())
+        db.advisory.save('BTCUSDT', make_advisory(Decision.SHORT, Confidence.MEDIUM))
+        db.advisory.save('BTCUSDT', make_advisory(Decision.NO_TRADE, Confidence.LOW, reason_tags=[]))
+        db.advisory.save('ETHUSDT', make_advisory())
+
+        history = db.advisory.get_history('BTCUSDT', hours=1)
+        stats = db.advisory.get_stats('BTCUSDT', hours=1)
+
+        assert len(history) == 3
+        assert history[0]['decision'] == 'no_trade'
+        assert history[0]['reason_tags'] == []
+        assert history[-1]['reason_tags'] == ['strong_buy_pressure']
+        assert history[-1]['price'] == 50000.0
+        assert history[-1]['risk_exposure_allowed'] is True
+        assert history[-1]['executable'] is True
+        assert stats == {
+            'total': 3, 'long': 1, 'short': 1, 'no_trade': 1,
+            'high_confidence': 1, 'medium_confidence': 1, 'low_confidence': 1
+        }
+
+    def test_stats_use_covering_index(self, db):
+        """统计查询走覆盖索引（不回表）"""
+        from database.advisory_repository import _SQL_STATS
+
+        with db.connection.read() as conn:
+            plan = conn.execute('EXPLAIN QUERY PLAN ' + _SQL_STATS, ('BTCUSDT', 0, 'BTCUSDT', 0)).fetchall()
+
+        searches = [row[3] for row in plan if row[3].startswith('SEARCH')]
+        assert len(searches) == 2
+        assert all('COVERING INDEX' in detail for detail in searches)
+
+    def test_history_pages(self, db):
+        """键集分页：逐页遍历热表与冷表，同一时间戳的记录按id区分，不重不漏"""
+        base = datetime.now() - timedelta(hours=10)
+        db.advisory.save_batch([
+            ('BTCUSDT', make_advisory(timestamp=base + timedelta(hours=i // 2), reason_tags=[]))
+            for i in range(20)
+        ])
+        db.advisory.archive(hours=6)
+
+        pages, cursor = [], None
+        while True:
+            page, cursor = db.advisory.get_history_page('BTCUSDT', hours=24, limit=6, cursor=cursor)
+            pages.append(page)
+            if cursor is None:
+                break
+
+        assert [len(page) for page in pages] == [6, 6, 6, 2]
+        timestamps = [record['timestamp'] for page in pages for record in page]
+        assert timestamps == sorted(timestamps, reverse=True)
+        assert len(timestamps) == 20
+
+    def test_history_with_steps(self, db):
+        """历史决策连同管道步骤一次取回；没有步骤的决策 steps 为空"""
+        old = db.save_advisory_with_steps(
+            'BTCUSDT', make_advisory(timestamp=datetime.now() - timedelta(hours=1)),
+            [{'step': 2, 'name': 'b'}, {'step': 1, 'name': 'a'}]
+        )
+        db.advisory.save('BTCUSDT', make_advisory(Decision.SHORT))
+
+        history = db.advisory.get_history_with_steps('BTCUSDT', hours=2)
+
+        assert [record['decision'] for record in history] == ['short', 'long']
+        assert history[0]['steps'] == []
+        assert history[1]['id'] == old
+        assert [step['name'] for step in history[1]['steps']] == ['a', 'b']
+        assert db.advisory.get_history_with_steps('BTCUSDT', hours=2, limit=1)[0]['decision'] == 'short'
+
+    def test_ids_not_reused_after_archive(self, db):
+        """热表全部归档后新记录的id仍递增；只有热表维护自增计数"""
+        first = db.advisory.save('BTCUSDT', make_advisory(timestamp=datetime.now() - timedelta(hours=2)))
+        db.advisory.archive(hours=1)
+        second = db.advisory.save('BTCUSDT', make_advisory())
+        db.dual_advisory.save('BTCUSDT', make_dual())
+
+        with db.connection.read() as conn:
+            sequences = {row[0] for row in conn.execute("SELECT name FROM sqlite_sequence")}
+
+        assert second > first
+        assert sequences == {'l1_advisory_results'}
+
+    def test_history_shares_stats_index(self, db):
+        """历史查询按复合索引前缀查找，冗余的 (symbol, ts_us) 单独索引已删除"""
+        from database.advisory_repository import _SQL_SELECT_HISTORY
+
+        with db.connection.read() as conn:
+            plan = conn.execute(
+                'EXPLAIN QUERY PLAN ' + _SQL_SELECT_HISTORY, ('BTCUSDT', 0, 10, 'BTCUSDT', 0, 10, 10)
+            ).fetchall()
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+        searches = [row[3] for row in plan if row[3].startswith('SEARCH')]
+        assert 'idx_l1_stats_ts_us' in searches[0]
+        assert 'idx_l1_cold_stats_ts_us' in searches[1]
+        assert 'idx_l1_symbol_ts_us' not in indexes
+
+    def test_no_low_cardinality_indexes(self, db):
+        """不建立低基数单列索引（decision / alignment_type）"""
+        with db.connection.read() as conn:
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+        assert not indexes & {'idx_l1_decision', 'idx_l1_dual_alignment_type'}
+
+    def test_archive_to_cold_table(self, db):
+        """归档后历史/最新/统计仍覆盖冷表中的记录，清理同时作用于冷表"""
+        now = datetime.now()
+        db.advisory.save_batch([
+            ('BTCUSDT', make_advisory(Decision.SHORT, timestamp=now - timedelta(hours=10))),
+            ('BTCUSDT', make_advisory(timestamp=now - timedelta(minutes=5))),
+            ('ETHUSDT', make_advisory(timestamp=now - timedelta(hours=8))),
+            ('ETHUSDT', make_advisory(timestamp=now - timedelta(days=3))),
+        ])
+        db.query_cache.clear()
+        db.advisory._latest.clear()
+
+        archived = db.archive_old_records(hours=6)
+
+        with db.connection.read() as conn:
+            hot = conn.execute("SELECT COUNT(*) FROM l1_advisory_results").fetchone()[0]
+        history = db.advisory.get_history('BTCUSDT', hours=24)
+        assert archived == 3
+        assert hot == 1
+        assert [row['decision'] for row in history] == ['long', 'short']
+        assert db.advisory.get_latest('ETHUSDT').timestamp == now - timedelta(hours=8)
+        assert db.advisory.get_stats('BTCUSDT', hours=24)['total'] == 2
+        assert db.cleanup_old_records(days=1) == 1
+
+    def test_archive_backfills_missing_ts_us(self, db):
+        """缺少 ts_us 的旧行归档前由 timestamp 补齐，按时间正常归档"""
+        old = datetime.now() - timedelta(hours=10)
+        with db.connection.write() as conn:
+            conn.execute(_SQL_INSERT_RAW, (old.isoformat(), None))
+            conn.execute(_SQL_INSERT_RAW, (datetime.now().isoformat(), None))
+
+        assert db.archive_old_records(hours=6) == 1
+
+        with db.connection.read() as conn:
+            cold = conn.execute("SELECT ts_us FROM l1_advisory_results_cold").fetchall()
+            hot = conn.execute("SELECT ts_us FROM l1_advisory_results").fetchall()
+        assert cold == [(to_epoch_us(old),)]
+        assert hot[0][0] is not None
+
+    def test_archive_errors_propagate(self, db, monkeypatch):
+        """归档失败时抛出异常（不返回0掩盖错误），热表数据保持不变"""
+        from database import advisory_repository
+
+        db.advisory.save('BTCUSDT', make_advisory(timestamp=datetime.now() - timedelta(hours=10)))
+        monkeypatch.setattr(advisory_repository, '_SQL_DELETE_BEFORE', 'DELETE FROM missing_table WHERE ts_us < ?')
+
+        with pytest.raises(sqlite3.OperationalError):
+            db.archive_old_records(hours=6)
+
+        with db.connection.read() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM l1_advisory_results_cold").fetchone()[0] == 0
+            assert conn.execute("SELECT COUNT(*) FROM l1_advisory_results").fetchone()[0] == 1
+
+    def test_history_merges_hot_and_cold_by_time(self, db):
+        """归档后补写的较早记录留在热表：历史/分页/最新按时间合并两表，不丢失较新的冷表记录"""
+        now = datetime.now()
+        db.advisory.save_batch([
+            ('BTCUSDT', make_advisory(Decision.SHORT, timestamp=now - timedelta(hours=8))),
+            ('BTCUSDT', make_advisory(Decision.NO_TRADE, timestamp=now - timedelta(hours=9))),
+        ])
+        assert db.archive_old_records(hours=6) == 2
+        db.advisory.save('BTCUSDT', make_advisory(timestamp=now - timedelta(hours=10)))
+        db.query_cache.clear()
+        db.advisory._latest.clear()
+
+        history = db.advisory.get_history('BTCUSDT', hours=24, limit=2)
+        page, cursor = db.advisory.get_history_page('BTCUSDT', hours=24, limit=2)
+        rest, _ = db.advisory.get_history_page('BTCUSDT', hours=24, limit=2, cursor=cursor)
+        with_steps = db.advisory.get_history_with_steps('BTCUSDT', hours=24, limit=2)
+
+        assert [row['decision'] for row in history] == ['short', 'no_trade']
+        assert [row['decision'] for row in page + rest] == ['short', 'no_trade', 'long']
+        assert [row['decision'] for row in with_steps] == ['short', 'no_trade']
+        assert db.advisory.get_latest('BTCUSDT').decision == Decision.SHORT
+        assert db.advisory.get_latest_decision('BTCUSDT') == 'short'
+
+    def test_legacy_json_row_readable(self, db):
+        """位掩码列出现之前写入的JSON行仍可读取"""
+        now = datetime.now()
+        with db.connection.write() as conn:
+            conn.execute(_SQL_INSERT_RAW, (now.isoformat(), to_epoch_us(now)))
+
+        latest = db.advisory.get_latest('BTCUSDT')
+        history = db.advisory.get_history('BTCUSDT', hours=1)
+
+        assert latest.reason_tags == [ReasonTag.OI_GROWING]
+        assert history[0]['reason_tags'] == ['oi_growing']
+
+    def test_save_batch(self, db):
+        """批量保存"""
+        count = db.advisory.save_batch([('BTCUSDT', make_advisory()) for _ in range(5)])
+
+        assert count == 5
+        assert len(db.advisory.get_history('BTCUSDT', hours=1)) == 5
+
+    def test_save_batch_failure_in_transaction(self, db):
+        """外层事务中批量保存中途失败：异常抛出，外层回滚后已写入的块不提交"""
+        results = [('BTCUSDT', make_advisory()) for _ in range(60)]
+        results[55] = ('BTCUSDT', None)
+
+        with pytest.raises(AttributeError):
+            with db.transaction():
+                db.advisory.save_batch(results)
+
+        assert db.advisory.get_history('BTCUSDT', hours=1) == []
+
+    def test_save_batch_multiple_chunks(self, db):
+        """批量保存跨越多个多行INSERT块（含余数），行顺序保持"""
+        base = datetime.now()
+        results = [
+            ('BTCUSDT', make_advisory(timestamp=base.replace(microsecond=i)))
+            for i in range(123)
+        ]
+
+        count = db.advisory.save_batch(results)
+        history = db.advisory.get_history('BTCUSDT', hours=1, limit=500)
+
+        assert count == 123
+        assert len(history) == 123
+        with db.connection.read() as conn:
+            timestamps = [row[0] for row in conn.execute("SELECT timestamp FROM l1_advisory_results ORDER BY id")]
+        assert timestamps == [result.timestamp.isoformat() for _, result in results]
+
+    def test_created_at_bound_per_batch(self, db):
+        """created_at 由应用绑定（格式同 datetime('now')），同一批次共用一个值"""
+        db.advisory.save('BTCUSDT', make_advisory())
+        db.advisory.save_batch([('ETHUSDT', make_advisory()) for _ in range(3)])
+        db.dual_advisory.save('BTCUSDT', make_dual())
+
+        with db.connection.read() as conn:
+            single = conn.execute("SELECT created_at FROM l1_advisory_results WHERE symbol = 'BTCUSDT'").fetchone()[0]
+            batch = {row[0] for row in conn.execute("SELECT created_at FROM l1_advisory_results WHERE symbol = 'ETHUSDT'")}
+            dual = conn.execute("SELECT created_at FROM l1_dual_advisory_results").fetchone()[0]
+            sqlite_format = conn.execute("SELECT datetime(?) = ?", (single, single)).fetchone()[0]
+
+        assert len(batch) == 1
+        assert dual is not None
+        assert sqlite_format == 1
+
+
+class TestDualAdvisoryRepository:
+    """测试双周期决策Repository"""
+
+    def test_save_and_history(self, db):
+        """保存后历史记录与to_dict一致"""
+        result = make_dual()
+        db.dual_advisory.save('BTCUSDT', result)
+
+        history = db.dual_advisory.get_history('BTCUSDT', hours=1)
+
+        assert len(history) == 1
+        assert history[0] == result.to_dict()
+
+    def test_reason_tags_order_preserved(self, db):
+        """各组reason_tags按原始顺序读回（不按位序号重排）"""
+        result = make_dual()
+        result.short_term.reason_tags = [ReasonTag.STRONG_BUY_PRESSURE, ReasonTag.NOISY_MARKET]
+        result.global_risk_tags = [ReasonTag.OI_GROWING, ReasonTag.NOISY_MARKET]
+        db.dual_advisory.save('BTCUSDT', result)
+
+        row = db.dual_advisory.get_history('BTCUSDT', hours=1)[0]
+
+        assert row['short_term']['reason_tags'] == ['strong_buy_pressure', 'noisy_market']
+        assert row['global_risk_tags'] == ['oi_growing', 'noisy_market']
+        assert dict(row) == result.to_dict()
+
+    def test_history_rows_are_lazy(self, db):
+        """只访问标量字段时不构造嵌套结构"""
+        db.dual_advisory.save('BTCUSDT', make_dual())
+
+        row = db.dual_advisory.get_history('BTCUSDT', hours=1)[0]
+
+        assert row['decision'] == 'long'
+        assert row.get('missing') is None
+        assert 'short_term' not in row._cache
+        assert row['reason_tags'] == ['short_term_strong_buy', 'noisy_market']
+        assert 'short_term' in row._cache
+
+    def test_compat_history_returns_dicts(self, db):
+        """兼容API返回普通dict（可JSON序列化）"""
+        result = make_dual()
+        db.save_dual_advisory_result('BTCUSDT', result)
+
+        history = db.get_dual_advisory_history('BTCUSDT', hours=1)
+
+        assert type(history[0]) is dict
+        assert json.loads(json.dumps(history[0])) == result.to_dict()
+
+    def test_stats(self, db):
+        """统计分布"""
+        db.dual_advisory.save('BTCUSDT', make_dual())
+        db.dual_advisory.save('BTCUSDT', make_dual())
+        db.dual_advisory.save('BTCUSDT', make_dual(
+            short_decision=Decision.SHORT, medium_decision=Decision.NO_TRADE,
+            alignment_type=AlignmentType.PARTIAL_SHORT
+        ))
+
+        stats = db.dual_advisory.get_stats('BTCUSDT')
+
+        assert stats['alignment_type_distribution'] == {
+            'both_long': {'count': 2, 'percentage': 66.67},
+            'partial_short': {'count': 1, 'percentage': 33.33},
+        }
+        assert stats['short_term_decision_distribution'] == {'long': 2, 'short': 1}
+        assert stats['medium_term_decision_distribution'] == {'long': 2, 'no_trade': 1}
+
+    def test_stats_use_covering_index(self, db):
+        """统计查询走覆盖索引（不回表）"""
+        from database.dual_advisory_repository import _SQL_DUAL_STATS
+
+        with db.connection.read() as conn:
+            plan = conn.execute('EXPLAIN QUERY PLAN ' + _SQL_DUAL_STATS, ('BTCUSDT',)).fetchall()
+
+        assert 'COVERING INDEX idx_l1_dual_stats' in plan[0][3]
+
+
+# 旧版双周期表结构（含 full_json 列）
+LEGACY_DUAL_DDL = '''
+    CREATE TABLE l1_dual_advisory_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        price REAL,
+        short_term_decision TEXT NOT NULL,
+        short_term_confidence TEXT NOT NULL,
+        short_term_executable INTEGER NOT NULL,
+        short_term_regime TEXT NOT NULL,
+        short_term_quality TEXT NOT NULL,
+        medium_term_decision TEXT NOT NULL,
+        medium_term_confidence TEXT NOT NULL,
+        medium_term_executable INTEGER NOT NULL,
+        medium_term_regime TEXT NOT NULL,
+        medium_term_quality TEXT NOT NULL,
+        alignment_type TEXT NOT NULL,
+        is_aligned INTEGER NOT NULL,
+        has_conflict INTEGER NOT NULL,
+        recommended_action TEXT NOT NULL,
+        recommended_confidence TEXT NOT NULL,
+        full_json TEXT NOT NULL,
+        risk_exposure_allowed INTEGER NOT NULL,
+        created_at TEXT DEFAULT (datetime('now'))
+    )
+'''
+
+
+# 旧版单周期表结构（枚举列为TEXT）
+LEGACY_ADVISORY_DDL = '''
+    CREATE TABLE l1_advisory_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        decision TEXT NOT NULL,
+        confidence TEXT NOT NULL,
+        market_regime TEXT NOT NULL,
+        system_state TEXT NOT NULL,
+        risk_exposure_allowed INTEGER NOT NULL,
+        trade_quality TEXT NOT NULL,
+        reason_tags TEXT NOT NULL,
+        execution_permission TEXT DEFAULT 'allow',
+        executable INTEGER DEFAULT 0,
+        signal_decision TEXT,
+        price REAL,
+        created_at TEXT DEFAULT (datetime('now'))
+    )
+'''
+
+
+class TestPipelineRepository:
+    """测试管道步骤Repository"""
+
+    def test_save_and_get(self, db):
+        """一次保存多个步骤，按步骤号读取"""
+        steps = [{'step': i, 'name': f'step{i}', 'status': 'ok', 'result': {'i': i}} for i in range(1, 6)]
+        db.pipeline.save(1, 'BTCUSDT', steps)
+
+        saved = db.pipeline.get(1)
+
+        assert [step['step'] for step in saved] == [1, 2, 3, 4, 5]
+        assert saved[0]['result'] == "{'i': 1}"
+        assert len({step['timestamp'] for step in saved}) == 1
+
+    def test_save_with_advisory_single_commit(self, db):
+        """决策与管道步骤在同一事务中写入，只提交一次"""
+        statements = []
+        with db.connection.autocommit() as conn:
+            conn.set_trace_callback(statements.append)
+
+        advisory_id = db.save_advisory_with_steps('BTCUSDT', make_advisory(), [{'step': 1, 'name': 'x'}])
+        db.connection._writer_conn.set_trace_callback(None)
+
+        assert statements.count('COMMIT') == 1
+        assert db.pipeline.get(advisory_id)[0]['name'] == 'x'
+
+    def test_save_with_advisory_rolls_back_on_step_failure(self, db):
+        """步骤写入失败时决策记录随同一事务回滚"""
+        steps = [{'step': 1, 'name': 'ok'}, {'step': 2, 'name': None}]  # step_name NOT NULL
+
+        with pytest.raises(sqlite3.IntegrityError):
+            db.save_advisory_with_steps('BTCUSDT', make_advisory(), steps)
+
+        assert db.advisory.get_history('BTCUSDT', hours=1) == []
+        assert db.advisory.get_latest('BTCUSDT') is None
+        with db.connection.read() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM l1_pipeline_steps").fetchone()[0] == 0
+
+    def test_save_multiple_chunks(self, db):
+        """步骤数超过单条多行INSERT上限时分块写入"""
+        steps = [{'step': i, 'name': f'step{i}', 'status': 'ok'} for i in range(250)]
+        db.pipeline.save(2, 'BTCUSDT', steps)
+
+        assert [step['step'] for step in db.pipeline.get(2)] == list(range(250))
+
+    def test_missing_step_numbers_use_ordinals(self, db):
+        """未给出步骤号的步骤按列表序号编号，全部保留"""
+        db.pipeline.save(3, 'BTCUSDT', [{'name': 'a'}, {'name': 'b'}, {'name': 'c'}])
+
+        assert [(step['step'], step['name']) for step in db.pipeline.get(3)] == [(1, 'a'), (2, 'b'), (3, 'c')]
+
+    def test_duplicate_step_numbers_rejected(self, db):
+        """重复步骤号直接报错，不写入任何步骤"""
+        with pytest.raises(ValueError):
+            db.pipeline.save(4, 'BTCUSDT', [{'step': 1, 'name': 'a'}, {'step': 1, 'name': 'b'}])
+
+        assert db.pipeline.get(4) == []
+
+    def test_steps_clustered_by_advisory(self, db):
+        """WITHOUT ROWID 表：按 advisory_id 读取为主键范围扫描，无单独的 advisory_id 索引"""
+        from database.pipeline_repository import _SQL_SELECT_STEPS
+
+        with db.connection.read() as conn:
+            ddl = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'l1_pipeline_steps'").fetchone()[0]
+            plan = conn.execute('EXPLAIN QUERY PLAN ' + _SQL_SELECT_STEPS, (1,)).fetchall()
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+        assert 'WITHOUT ROWID' in ddl
+        assert 'PRIMARY KEY' in plan[0][3]
+        assert 'idx_l1_steps_advisory' not in indexes
+
+    def test_cleanup_by_integer_timestamp(self, db):
+        """清理按 ts_us 整数范围删除，走 ts_us 索引"""
+        db.pipeline.save(1, 'BTCUSDT', [{'step': 1, 'name': 'new'}])
+        old = datetime.now() - timedelta(days=10)
+        with db.connection.write() as conn:
+            conn.execute(
+                "INSERT INTO l1_pipeline_steps "
+                "(advisory_id, symbol, step_number, step_name, status, timestamp, ts_us) "
+                "VALUES (2, 'BTCUSDT', 1, 'old', 'ok', ?, ?)",
+                (old.isoformat(), to_epoch_us(old))
+            )
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN DELETE FROM l1_pipeline_steps WHERE ts_us < ?", (0,)
+            ).fetchall()
+
+        assert 'idx_l1_steps_ts_us' in plan[0][3]
+        assert db.pipeline.cleanup_old(days=7) == 1
+        assert db.pipeline.get(2) == []
+        assert db.pipeline.get(1)[0]['name'] == 'new'
+
+
+class TestWriterLoop:
+    """测试后台写线程"""
+
+    def test_async_saves_are_batched(self, db):
+        """并发提交的请求攒批写入，flush后可读"""
+        writer = db.start_writer(flush_interval=0.2)
+        for _ in range(10):
+            db.advisory.save_async('BTCUSDT', make_advisory())
+            db.dual_advisory.save_async('BTCUSDT', make_dual())
+
+        assert writer.flush(timeout=5)
+        assert len(db.advisory.get_history('BTCUSDT', hours=1)) == 10
+        assert len(db.dual_advisory.get_history('BTCUSDT', hours=1)) == 10
+        assert writer.batches_written < 20
+
+    def test_close_drains_queue(self, db):
+        """关闭时写完队列中剩余请求"""
+        db.start_writer(flush_interval=1.0)
+        db.advisory.save_async('BTCUSDT', make_advisory())
+        path = db.db_path
+        db.close()
+
+        reopened = L1DatabaseModular(db_path=path)
+        assert len(reopened.advisory.get_history('BTCUSDT', hours=1)) == 1
+        reopened.close()
+
+    def test_sync_fallback_without_writer(self, db):
+        """未启动写线程时 save_async 同步写入"""
+        db.dual_advisory.save_async('BTCUSDT', make_dual())
+
+        assert len(db.dual_advisory.get_history('BTCUSDT', hours=1)) == 1
+
+    def test_async_save_returns_future(self, db, monkeypatch):
+        """save_async 返回的Future在批次提交后完成；写入失败的类型携带异常"""
+        db.start_writer(flush_interval=0.2)
+
+        def failing_save_batch(items):
+            raise RuntimeError('write failed')
+
+        monkeypatch.setattr(db.dual_advisory, 'save_batch', failing_save_batch)
+
+        saved = db.advisory.save_async('BTCUSDT', make_advisory())
+        failed = db.dual_advisory.save_async('BTCUSDT', make_dual())
+
+        assert saved.result(timeout=5) is None
+        assert len(db.advisory.get_history('BTCUSDT', hours=1)) == 1
+        with pytest.raises(RuntimeError):
+            failed.result(timeout=5)
+
+    def test_partial_save_batch_failure_not_committed(self, db, monkeypatch):
+        """save_batch 写入若干块后失败：该类型的Future携带异常且无行提交，同批其他类型正常提交"""
+        from database import WriterLoop, advisory_repository
+
+        to_row = advisory_repository._to_row
+        calls = []
+
+        def failing_to_row(symbol, result, created_at):
+            calls.append(symbol)
+            if len(calls) > advisory_repository.BATCH_CHUNK_SIZE:
+                raise ValueError('bad row')
+            return to_row(symbol, result, created_at)
+
+        monkeypatch.setattr(advisory_repository, '_to_row', failing_to_row)
+
+        # 先全部入队再启动，保证同一批次
+        writer = WriterLoop(db.connection, {'advisory': db.advisory, 'dual_advisory': db.dual_advisory})
+        count = advisory_repository.BATCH_CHUNK_SIZE + 10
+        advisory_futures = [writer.submit('advisory', 'BTCUSDT', make_advisory()) for _ in range(count)]
+        dual_future = writer.submit('dual_advisory', 'BTCUSDT', make_dual())
+        writer.start()
+        try:
+            for future in advisory_futures:
+                with pytest.raises(ValueError):
+                    future.result(timeout=5)
+            assert dual_future.result(timeout=5) is None
+        finally:
+            writer.stop()
+
+        assert writer.batches_written == 1
+        assert db.advisory.get_history('BTCUSDT', hours=1) == []
+        assert len(db.dual_advisory.get_history('BTCUSDT', hours=1)) == 1
+
+    def test_dual_save_batch(self, db):
+        """双周期批量保存"""
+        count = db.dual_advisory.save_batch([('BTCUSDT', make_dual()), ('ETHUSDT', make_dual(symbol='ETHUSDT'))])
+
+        assert count == 2
+        assert len(db.dual_advisory.get_history('ETHUSDT', hours=1)) == 1
+
+
+class TestAsyncDatabase:
+    """测试 asyncio 接口"""
+
+    def test_concurrent_saves_and_reads(self, db):
+        """并发提交的写入与读取在线程池中完成，结果与同步接口一致"""
+        import asyncio
+        from database import AsyncL1Database
+
+        async def scenario():
+            adb = AsyncL1Database(db)
+            ids = await asyncio.gather(*(adb.save_advisory_result('BTCUSDT', make_advisory()) for _ in range(10)))
+            advisory_id = await adb.save_advisory_with_steps('ETHUSDT', make_advisory(), [{'step': 1, 'name': 'x'}])
+            history, stats, steps, decision = await asyncio.gather(
+                adb.get_advisory_history('BTCUSDT', hours=1),
+                adb.get_decision_stats('BTCUSDT', hours=1),
+                adb.get_pipeline_steps(advisory_id),
+                adb.get_latest_decision('ETHUSDT')
+            )
+            await adb.close()
+            return ids, history, stats, steps, decision
+
+        ids, history, stats, steps, decision = asyncio.run(scenario())
+
+        assert len(set(ids)) == 10
+        assert len(history) == 10
+        assert stats['total'] == 10
+        assert steps[0]['name'] == 'x'
+        assert decision == 'long'
+
+
+class TestMigrations:
+    """测试表结构迁移"""
+
+    def test_migrations_run_once_per_path(self, db, monkeypatch):
+        """同一数据库文件在进程内只初始化一次"""
+        from database.migrations import DatabaseMigrations
+
+        calls = []
+        monkeypatch.setattr(DatabaseMigrations, '_init_all_tables', lambda self: calls.append(self))
+        second = L1DatabaseModular(db_path=db.db_path)
+        second.close()
+
+        assert calls == []
+
+    def test_pipeline_steps_rebuilt_without_rowid(self, tmp_path):
+        """旧管道步骤表（自增id、TEXT时间戳）重建为 WITHOUT ROWID，数据与 ts_us 保留"""
+        path = str(tmp_path / 'legacy_steps.db')
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE l1_pipeline_steps (id INTEGER PRIMARY KEY AUTOINCREMENT, advisory_id INTEGER NOT NULL, "
+            "symbol TEXT NOT NULL, step_number INTEGER NOT NULL, step_name TEXT NOT NULL, status TEXT NOT NULL, "
+            "message TEXT, result TEXT, timestamp TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX idx_l1_steps_advisory ON l1_pipeline_steps(advisory_id)")
+        conn.executemany(
+            "INSERT INTO l1_pipeline_steps (advisory_id, symbol, step_number, step_name, status, timestamp) "
+            "VALUES (1, 'BTCUSDT', ?, ?, 'ok', '2024-01-01T00:00:00')",
+            [(1, 'a'), (2, 'b'), (2, 'b2')]
+        )
+        conn.commit()
+        conn.close()
+
+        database = L1DatabaseModular(db_path=path)
+        steps = database.pipeline.get(1)
+        with database.connection.read() as conn:
+            ts_us = {row[0] for row in conn.execute("SELECT ts_us FROM l1_pipeline_steps")}
+            duplicates = conn.execute(
+                "SELECT step_number, step_name FROM l1_pipeline_steps_duplicates"
+            ).fetchall()
+        database.close()
+
+        # 重复步骤号保留最后写入的一条，其余移入 duplicates 表
+        assert [(step['step'], step['name']) for step in steps] == [(1, 'a'), (2, 'b2')]
+        assert duplicates == [(2, 'b')]
+        assert ts_us == {to_epoch_us(datetime(2024, 1, 1))}
+
+    @pytest.fixture
+    def legacy_path(self, tmp_path):
+        """含一条旧格式记录的数据库"""
+        path = str(tmp_path / 'legacy.db')
+        result = make_dual()
+        conn = sqlite3.connect(path)
+        conn.execute(LEGACY_DUAL_DDL)
+        conn.execute("CREATE INDEX idx_l1_dual_symbol_timestamp ON l1_dual_advisory_results(symbol, timestamp DESC)")
+        conn.execute(
+            "INSERT INTO l1_dual_advisory_results VALUES "
+            "(NULL, 'BTCUSDT', ?, 50000.0, 'long', 'high', 1, 'trend', 'good', "
+            " 'long', 'medium', 0, 'range', 'uncertain', 'both_long', 1, 0, 'long', 'medium', ?, 1, NULL)",
+            (result.timestamp.isoformat(), json.dumps(result.to_dict()))
+        )
+        conn.commit()
+        conn.close()
+        return path, result
+
+    def test_backfill_keeps_history(self, legacy_path):
+        """旧记录回填后历史不变，新记录仍可写入"""
+        path, result = legacy_path
+        database = L1DatabaseModular(db_path=path)
+
+        database.dual_advisory.save('BTCUSDT', make_dual())
+        history = database.dual_advisory.get_history('BTCUSDT', hours=1)
+        database.close()
+
+        assert len(history) == 2
+        assert history[-1] == result.to_dict()
+
+    def test_ts_us_backfilled(self, legacy_path):
+        """旧记录回填 ts_us，TEXT时间戳索引被替换"""
+        path, result = legacy_path
+        database = L1DatabaseModular(db_path=path)
+
+        with database.connection.read() as conn:
+            ts_us = conn.execute("SELECT ts_us FROM l1_dual_advisory_results").fetchone()[0]
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        database.close()
+
+        assert ts_us == to_epoch_us(result.timestamp)
+        assert 'idx_l1_dual_symbol_ts_us' in indexes
+        assert 'idx_l1_dual_symbol_timestamp' not in indexes
+
+    def test_enum_columns_converted(self, legacy_path):
+        """枚举列改为INTEGER编码，历史与统计不变"""
+        path, result = legacy_path
+        database = L1DatabaseModular(db_path=path)
+
+        with database.connection.read() as conn:
+            row = conn.execute(
+                "SELECT typeof(short_term_decision), alignment_type, full_json != '' "
+                "FROM l1_dual_advisory_results"
+            ).fetchone()
+        stats = database.dual_advisory.get_stats('BTCUSDT')
+        database.close()
+
+        assert row == ('integer', 0, 1)
+        assert stats['alignment_type_distribution'] == {'both_long': {'count': 1, 'percentage': 100.0}}
+
+    def test_advisory_enum_columns_converted(self, tmp_path):
+        """单周期表枚举列迁移，无法识别的旧值原样保留"""
+        path = str(tmp_path / 'legacy_advisory.db')
+        now = datetime.now()
+        conn = sqlite3.connect(path)
+        conn.execute(LEGACY_ADVISORY_DDL)
+        conn.execute(
+            "INSERT INTO l1_advisory_results "
+            "(symbol, timestamp, decision, confidence, market_regime, system_state, "
+            " risk_exposure_allowed, trade_quality, reason_tags, execution_permission, signal_decision) "
+            "VALUES ('BTCUSDT', ?, 'short', 'low', 'range', 'long_active', 0, 'poor', '[]', 'deny', 'short')",
+            (now.isoformat(),)
+        )
+        conn.commit()
+        conn.close()
+
+        database = L1DatabaseModular(db_path=path)
+        with database.connection.read() as conn:
+            row = conn.execute(
+                "SELECT decision, confidence, system_state, execution_permission FROM l1_advisory_results"
+            ).fetchone()
+        history = database.advisory.get_history('BTCUSDT', hours=1)
+        stats = database.advisory.get_stats('BTCUSDT', hours=1)
+        database.close()
+
+        assert row == (1, 3, 'long_active', 2)
+        assert history[0]['decision'] == 'short'
+        assert history[0]['system_state'] == 'long_active'
+        assert history[0]['execution_permission'] == 'deny'
+        assert history[0]['signal_decision'] == 'short'
+        assert stats['short'] == 1 and stats['low_confidence'] == 1
+
+    def test_reason_tags_json_backfilled(self, tmp_path):
+        """旧JSON reason_tags 转为位掩码（顺序与位序号不同的保留JSON）；含未知标签的行保持原样"""
+        path = str(tmp_path / 'legacy_tags.db')
+        now = datetime.now()
+        conn = sqlite3.connect(path)
+        conn.execute(LEGACY_ADVISORY_DDL)
+        for reason_tags in ('["noisy_market", "oi_growing"]', '["oi_growing", "noisy_market"]', '["removed_tag"]'):
+            conn.execute(
+                "INSERT INTO l1_advisory_results "
+                "(symbol, timestamp, decision, confidence, market_regime, system_state, "
+                " risk_exposure_allowed, trade_quality, reason_tags) "
+                "VALUES ('BTCUSDT', ?, 'long', 'high', 'trend', 'wait', 1, 'good', ?)",
+                (now.isoformat(), reason_tags)
+            )
+        conn.commit()
+        conn.close()
+
+        database = L1DatabaseModular(db_path=path)
+        with database.connection.read() as conn:
+            rows = conn.execute("SELECT reason_tags_mask, reason_tags FROM l1_advisory_results ORDER BY id").fetchall()
+        database.close()
+
+        mask = encode_reason_tags([ReasonTag.OI_GROWING, ReasonTag.NOISY_MARKET])
+        assert rows[0] == (mask, '')
+        assert rows[1] == (mask, '["oi_growing", "noisy_market"]')
+        assert rows[2] == (None, '["removed_tag"]')
+        assert load_reason_tags(*rows[1]) == [ReasonTag.OI_GROWING, ReasonTag.NOISY_MARKET]
+
+    def test_drop_full_json(self, legacy_path):
+        """开启开关后删除 full_json 列"""
+        path, result = legacy_path
+        database = L1DatabaseModular(db_path=path, drop_legacy_full_json=True)
+
+        with database.connection.read() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(l1_dual_advisory_results)")]
+        database.dual_advisory.save('BTCUSDT', make_dual())
+        history = database.dual_advisory.get_history('BTCUSDT', hours=1)
+        database.close()
+
+        assert 'full_json' not in columns
+        assert history[-1] == result.to_dict()
+        assert len(history) == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
+
+
+class TestMaintenance:
+    """测试数据保留与定期维护"""
+
+    def test_new_database_uses_incremental_vacuum(self, db):
+        """新建数据库启用 auto_vacuum=INCREMENTAL"""
+        with db.connection.read() as conn:
+            assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+    def test_existing_database_keeps_setting(self, tmp_path):
+        """已有表的旧库不修改 auto_vacuum"""
+        path = str(tmp_path / 'legacy.db')
+        conn = sqlite3.connect(path)
+        conn.execute(LEGACY_ADVISORY_DDL)
+        conn.close()
+
+        database = L1DatabaseModular(db_path=path)
+        with database.connection.read() as conn:
+            mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        database.close()
+
+        assert mode == 0
+
+    def test_cleanup_old_records(self, db):
+        """只删除保留期之前的记录，并使缓存失效"""
+        old = datetime.now() - timedelta(days=3)
+        db.advisory.save('BTCUSDT', make_advisory(timestamp=old))
+        db.advisory.save('BTCUSDT', make_advisory())
+        db.dual_advisory.save('BTCUSDT', make_dual(timestamp=old))
+        db.dual_advisory.save('BTCUSDT', make_dual())
+        assert len(db.advisory.get_history('BTCUSDT', hours=100)) == 2
+
+        deleted = db.cleanup_old_records(days=1)
+
+        assert deleted == 2
+        assert len(db.advisory.get_history('BTCUSDT', hours=100)) == 1
+        assert len(db.dual_advisory.get_history('BTCUSDT', hours=100)) == 1
+
+    def test_cleanup_old_records_atomic(self, db, monkeypatch):
+        """任一表清理失败时整体回滚并抛出，已删除的其他表记录恢复"""
+        from database import pipeline_repository
+
+        old = datetime.now() - timedelta(days=3)
+        db.advisory.save('BTCUSDT', make_advisory(timestamp=old))
+        db.dual_advisory.save('BTCUSDT', make_dual(timestamp=old))
+        monkeypatch.setattr(pipeline_repository, '_SQL_DELETE_STEPS_BEFORE', 'DELETE FROM missing_table WHERE ts_us < ?')
+
+        with pytest.raises(sqlite3.OperationalError):
+            db.cleanup_old_records(days=1)
+
+        assert len(db.advisory.get_history('BTCUSDT', hours=100)) == 1
+        assert len(db.dual_advisory.get_history('BTCUSDT', hours=100)) == 1
+
+    def test_cleanup_uses_index_range(self, db):
+        """清理旧记录按时间索引范围删除（不全表扫描）"""
+        from database.advisory_repository import _SQL_DELETE_BEFORE
+        from database.dual_advisory_repository import _SQL_DELETE_DUAL_BEFORE
+        from database.pipeline_repository import _SQL_DELETE_STEPS_BEFORE
+
+        with db.connection.read() as conn:
+            for sql in (_SQL_DELETE_BEFORE, _SQL_DELETE_DUAL_BEFORE, _SQL_DELETE_STEPS_BEFORE):
+                plan = conn.execute('EXPLAIN QUERY PLAN ' + sql, (0,)).fetchall()
+                assert plan[0][3].startswith('SEARCH')
+
+    def test_maintenance_reclaims_pages(self, db):
+        """清理/维护后WAL被截断；maintenance 回收删除后的空闲页并刷新统计"""
+        old = datetime.now() - timedelta(days=3)
+        db.advisory.save_batch([('BTCUSDT', make_advisory(timestamp=old)) for _ in range(2000)])
+        db.advisory.save('BTCUSDT', make_advisory())
+        db.cleanup_old_records(days=1)
+        assert os.path.getsize(db.db_path + '-wal') == 0
+
+        with db.connection.read() as conn:
+            free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        db.maintenance()
+        with db.connection.read() as conn:
+            free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            has_stats = conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0]
+
+        assert free_before > 0
+        assert free_after < free_before
+        assert has_stats > 0
+        assert os.path.getsize(db.db_path + '-wal') == 0